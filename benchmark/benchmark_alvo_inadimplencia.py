@@ -0,0 +1,82 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.etl_ingestion import calcular_alvo_inadimplencia
+from src.staging import ler_csv
+
+DATA_REFERENCIA = pd.Timestamp('2025-06-30')
+
+
+def gerar_boletos_sinteticos(linhas, seed=42):
+    """Boletos com ~20% não pagos e pagamentos entre 30 dias adiantados e 120 dias atrasados."""
+    rng = np.random.default_rng(seed)
+    base = np.datetime64('2023-07-01')
+    vencimento = base + rng.integers(0, 730, size=linhas).astype('timedelta64[D]')
+    pagamento = vencimento + rng.integers(-30, 120, size=linhas).astype('timedelta64[D]')
+    pagamento = pagamento.astype('datetime64[ns]')
+    pagamento[rng.random(linhas) < 0.2] = np.datetime64('NaT')
+    return pd.DataFrame({
+        'dt_vencimento': pd.to_datetime(vencimento),
+        'dt_pagamento': pd.to_datetime(pagamento),
+    })
+
+
+def alvo_versao_anterior(df_boletos, hoje):
+    """Cópia fiel do cálculo que existia em carregar_boletos (apply linha a linha)."""
+    df_boletos["dias_atraso"] = (df_boletos["dt_pagamento"] - df_boletos["dt_vencimento"]).dt.days
+    mask_nat = df_boletos["dt_pagamento"].isna()
+    df_boletos.loc[mask_nat, "dias_atraso"] = (hoje - df_boletos.loc[mask_nat, "dt_vencimento"]).dt.days
+    df_boletos["dias_atraso"] = df_boletos["dias_atraso"].fillna(0).apply(lambda x: 0 if x < 0 else x).astype(int)
+    df_boletos["alvo_inadimplencia"] = np.where(df_boletos["dias_atraso"] > 0, 1, 0)
+    return df_boletos
+
+
+def cronometrar(nome, fn, df):
+    copia = df.copy()
+    inicio = time.perf_counter()
+    resultado = fn(copia)
+    tempo = time.perf_counter() - inicio
+    memoria = resultado[['dias_atraso', 'alvo_inadimplencia']].memory_usage(index=False).sum() / 1024 ** 2
+    print(f"   {nome:<22} {tempo:8.2f} s | colunas do alvo: {memoria:7.1f} MB")
+    return resultado, tempo
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do cálculo do alvo de inadimplência")
+    parser.add_argument("--linhas", type=int, default=10_000_000)
+    parser.add_argument("--arquivo", type=str, default=None,
+                        help="CSV sintético a gravar/reaproveitar (default: gera só em memória)")
+    parser.add_argument("--real", action="store_true",
+                        help="Usa data/boletos_datas_variadas.csv (via staging Parquet) em vez dos sintéticos")
+    args = parser.parse_args()
+
+    if args.real:
+        inicio = time.perf_counter()
+        df = ler_csv('boletos_datas_variadas.csv', colunas=['dt_vencimento', 'dt_pagamento'])
+        print(f"🧪 [Benchmark] Alvo de inadimplência com {len(df):,} boletos reais "
+              f"(leitura: {time.perf_counter() - inicio:.2f} s)...")
+    elif args.arquivo and os.path.exists(args.arquivo):
+        print(f"🧪 [Benchmark] Alvo de inadimplência com boletos de {args.arquivo}...")
+        df = pd.read_csv(args.arquivo, parse_dates=['dt_vencimento', 'dt_pagamento'])
+    else:
+        print(f"🧪 [Benchmark] Alvo de inadimplência com {args.linhas:,} boletos sintéticos...")
+        df = gerar_boletos_sinteticos(args.linhas)
+        if args.arquivo:
+            df.to_csv(args.arquivo, index=False, date_format='%Y-%m-%d')
+
+    antigo, t_antigo = cronometrar("versão anterior", lambda d: alvo_versao_anterior(d, DATA_REFERENCIA), df)
+    novo, t_novo = cronometrar("vetorizada", lambda d: calcular_alvo_inadimplencia(d, DATA_REFERENCIA), df)
+
+    iguais = (np.array_equal(antigo['dias_atraso'].to_numpy(), novo['dias_atraso'].to_numpy())
+              and np.array_equal(antigo['alvo_inadimplencia'].to_numpy(), novo['alvo_inadimplencia'].to_numpy()))
+    print(f"   Resultados idênticos: {'✅' if iguais else '❌'} | ganho: {t_antigo / t_novo:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.chaves import bytes_para_hex, codificar_ids, hex_para_bytes
+
+
+def gerar_ids(quantidade, rng):
+    """Ids no mesmo formato do CSV: SHA-256 em hex minúsculo (64 chars)."""
+    return bytes_para_hex(rng.integers(0, 256, size=(quantidade, 32), dtype=np.uint8))
+
+
+def memoria_mb(*series):
+    return sum(s.memory_usage(index=False, deep=True) for s in series) / 1024 ** 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark das chaves compactas (hex x bytes x código int32)")
+    parser.add_argument("--boletos", type=int, default=2_000_000)
+    parser.add_argument("--pagadores", type=int, default=50_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    print(f"🧪 [Benchmark] {args.boletos:,} boletos / {args.pagadores:,} pagadores...")
+    pagadores = gerar_ids(args.pagadores, rng)
+    df_boletos = pd.DataFrame({
+        'ID_BOLETO': gerar_ids(args.boletos, rng),
+        'ID_PAGADOR': pagadores[rng.integers(0, args.pagadores, size=args.boletos)],
+    })
+    df_clientes = pd.DataFrame({'ID_PAGADOR': pagadores, 'CLUSTER_ID': rng.integers(0, 4, size=args.pagadores)})
+
+    # Memória das chaves em pandas
+    buffer = hex_para_bytes(df_boletos['ID_PAGADOR'])
+    em_bytes = pd.Series([buffer[i:i + 32] for i in range(0, len(buffer), 32)], dtype=object)
+    (cod_boletos, cod_clientes), _ = codificar_ids(df_boletos['ID_PAGADOR'], df_clientes['ID_PAGADOR'])
+    mem_hex = memoria_mb(df_boletos['ID_PAGADOR'])
+    print(f"   ID_PAGADOR hex:        {mem_hex:8.1f} MB")
+    print(f"   ID_PAGADOR bytes(32):  {memoria_mb(em_bytes):8.1f} MB")
+    print(f"   ID_PAGADOR int32:      {cod_boletos.nbytes / 1024 ** 2:8.1f} MB "
+          f"({mem_hex / (cod_boletos.nbytes / 1024 ** 2):.0f}x menor)")
+
+    # Join boletos x clientes (o mesmo do ml_cluster)
+    inicio = time.perf_counter()
+    ref = df_boletos.merge(df_clientes, on='ID_PAGADOR', how='inner')
+    t_hex = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    (cod_boletos, cod_clientes), _ = codificar_ids(df_boletos['ID_PAGADOR'], df_clientes['ID_PAGADOR'])
+    novo = df_boletos[['ID_BOLETO']].assign(CD_PAGADOR=cod_boletos).merge(
+        df_clientes[['CLUSTER_ID']].assign(CD_PAGADOR=cod_clientes), on='CD_PAGADOR', how='inner')
+    t_cod = time.perf_counter() - inicio
+
+    iguais = ref.sort_values('ID_BOLETO')['CLUSTER_ID'].to_numpy().tolist() == \
+        novo.sort_values('ID_BOLETO')['CLUSTER_ID'].to_numpy().tolist()
+    print(f"   merge hex: {t_hex:.2f} s | merge int32 (com factorize): {t_cod:.2f} s | "
+          f"ganho: {t_hex / t_cod:.1f}x | idênticos: {'✅' if iguais else '❌'}")
+
+    # No Oracle a chave cai de 64 para 32 bytes por id (PK, FKs e seus índices)
+    print(f"   Chaves no banco: VARCHAR2(64) = {args.boletos * 64 / 1024 ** 2:.0f} MB | "
+          f"RAW(32) = {args.boletos * 32 / 1024 ** 2:.0f} MB por coluna de id (sem overhead de bloco)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from xml.sax.saxutils import escape
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Latência simulada por requisição (s): é o que a coleta concorrente sobrepõe
+LATENCIA = float(os.getenv('BF_BENCH_LATENCIA', '0.3'))
+# Termos da busca histórica que respondem "202 Ratelimit" na primeira tentativa
+TERMOS_COM_THROTTLE = {'Colheita', 'Relatório Focus'}
+# Manchete que volta em todos os termos: no resultado final fica só a do primeiro termo
+TITULO_REPETIDO = 'Ibovespa fecha em alta com exterior - g1'
+ITENS_POR_FONTE = 3
+# Datas fixas: as duas execuções têm que devolver exatamente as mesmas tuplas
+PUBLICADO = datetime.now().replace(microsecond=0) - timedelta(hours=2)
+
+
+class FeedFalso(BaseHTTPRequestHandler):
+    """Google News falso: qualquer /rss/search?q=... devolve um RSS com ITENS_POR_FONTE manchetes do g1."""
+
+    def do_GET(self):
+        time.sleep(LATENCIA)
+        busca = parse_qs(urlsplit(self.path).query).get('q', [''])[0]
+        itens = "".join(
+            f"<item><title>{escape(busca)} manchete {i}</title>"
+            f"<link>https://g1.globo.com/{i}?q={escape(busca)}</link>"
+            f"<pubDate>{format_datetime(PUBLICADO - timedelta(hours=i))}</pubDate>"
+            f"<source url=\"https://g1.globo.com\">g1</source></item>"
+            for i in range(ITENS_POR_FONTE))
+        corpo = f"<?xml version=\"1.0\"?><rss version=\"2.0\"><channel>{itens}</channel></rss>".encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/rss+xml; charset=utf-8')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass
+
+
+class BuscaFalsa:
+    """`buscar(termo)` no lugar do DuckDuckGo: itens fixos por termo e throttle na 1ª tentativa dos TERMOS_COM_THROTTLE."""
+
+    def __init__(self):
+        self.data = (PUBLICADO - timedelta(days=3)).strftime('%Y-%m-%dT%H:%M:%S')
+        self._tentados = set()
+        self._lock = threading.Lock()
+
+    def __call__(self, termo):
+        with self._lock:
+            primeira = termo not in self._tentados
+            self._tentados.add(termo)
+        time.sleep(LATENCIA)
+        if primeira and termo in TERMOS_COM_THROTTLE:
+            raise Exception("https://duckduckgo.com/ 202 Ratelimit")
+        itens = [{'title': f"{termo} resultado {i}", 'url': f"https://valor.globo.com/{i}?q={termo}",
+                  'source': 'Valor', 'date': self.data} for i in range(ITENS_POR_FONTE)]
+        itens.append({'title': TITULO_REPETIDO, 'url': 'https://g1.globo.com/ibovespa', 'source': 'g1',
+                      'date': self.data})
+        return itens
+
+
+def medir(nome, coletar):
+    inicio = time.perf_counter()
+    resultado = coletar()
+    duracao = time.perf_counter() - inicio
+    print(f"   ⏱️ {nome:>11}: {len(resultado)} notícias em {duracao:.1f}s")
+    return resultado, duracao
+
+
+def main():
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), FeedFalso)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+
+    # TOPICOS_RSS é montado no import do etl_nlp: o endereço falso tem que estar no ambiente antes.
+    # Backoff curto para o throttle simulado não custar minutos.
+    os.environ['BF_URL_GOOGLE_NEWS'] = f"http://127.0.0.1:{servidor.server_port}"
+    os.environ.setdefault('BF_BACKOFF_MAXIMO', '1')
+    from src import etl_nlp, rate_limiter
+    # Sem o ritmo real dos hosts (ex: DuckDuckGo a 0,5 req/s), que esconderia a diferença entre os modos
+    rate_limiter.LIMITES_HOST[etl_nlp.HOST_DDG] = (20.0, 5)
+    rate_limiter.LIMITES_HOST[f"127.0.0.1:{servidor.server_port}"] = (20.0, 5)
+
+    print(f"🧪 [Benchmark] Coleta de notícias contra servidor local (latência {LATENCIA}s, "
+          f"{etl_nlp.NOTICIAS_WORKERS} workers)...")
+    falhas = []
+    try:
+        print("\n📡 RSS (servidor http local):")
+        rss_seq, t_seq = medir('sequencial', lambda: etl_nlp.carregar_rss_tempo_real(concorrente=False))
+        rss_conc, t_conc = medir('concorrente', lambda: etl_nlp.carregar_rss_tempo_real(concorrente=True))
+        print(f"   🚀 {t_seq / max(t_conc, 1e-9):.1f}x")
+        if not rss_seq:
+            falhas.append("RSS sem notícias")
+        if rss_seq != rss_conc:
+            falhas.append("RSS concorrente difere do sequencial")
+
+        print("\n🕰️ Histórico (busca falsa com throttle):")
+        retries_antes = rate_limiter.metricas_rate_limit().get(etl_nlp.HOST_DDG, {}).get('retries', 0)
+        hist_seq, t_seq = medir('sequencial', lambda: etl_nlp.carregar_historico_completo(
+            buscar=BuscaFalsa(), concorrente=False))
+        hist_conc, t_conc = medir('concorrente', lambda: etl_nlp.carregar_historico_completo(
+            buscar=BuscaFalsa(), concorrente=True))
+        print(f"   🚀 {t_seq / max(t_conc, 1e-9):.1f}x")
+        retries = rate_limiter.metricas_rate_limit()[etl_nlp.HOST_DDG]['retries'] - retries_antes
+
+        termos = [termo for lista in etl_nlp.TERMOS_HISTORICO.values() for termo in lista]
+        esperadas = len(termos) * ITENS_POR_FONTE + 1
+        if hist_seq != hist_conc:
+            falhas.append("histórico concorrente difere do sequencial")
+        if len(hist_seq) != esperadas:
+            falhas.append(f"histórico com {len(hist_seq)} notícias (esperado {esperadas})")
+        repetidas = [n for n in hist_conc if n[1] == TITULO_REPETIDO]
+        if len(repetidas) != 1 or repetidas[0][0] != next(iter(etl_nlp.TERMOS_HISTORICO)):
+            falhas.append("manchete repetida não ficou só com o primeiro termo")
+        if retries != 2 * len(TERMOS_COM_THROTTLE):
+            falhas.append(f"{retries} retries de rate limit (esperado {2 * len(TERMOS_COM_THROTTLE)})")
+    finally:
+        servidor.shutdown()
+
+    if falhas:
+        for falha in falhas:
+            print(f"   ❌ {falha}")
+        sys.exit(1)
+    print("\n✅ Concorrente e sequencial devolvem as mesmas notícias, na mesma ordem.")
+
+
+if __name__ == "__main__":
+    main()
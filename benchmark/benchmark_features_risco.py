@@ -0,0 +1,36 @@
+import os
+import sys
+import time
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.db_connection import conexao
+from src.ml_features import comparar_features, construir_features_risco, ler_tabelas_brutas
+
+
+def main():
+    print("🧪 [Benchmark] Features do risco: V_BF_TREINO_ML_RISCO x pandas (merge_asof)...")
+    with conexao() as conn:
+        if not conn:
+            return
+
+        inicio = time.perf_counter()
+        df_view = pd.read_sql("SELECT * FROM V_BF_TREINO_ML_RISCO", conn)
+        t_view = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        brutas = ler_tabelas_brutas(conn)
+        t_leitura = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    df_pandas = construir_features_risco(*brutas)
+    t_montagem = time.perf_counter() - inicio
+
+    print(f"   view: {t_view:.2f} s | pandas: {t_leitura + t_montagem:.2f} s "
+          f"(leitura {t_leitura:.2f} s + montagem {t_montagem:.2f} s) | {len(df_pandas)} linhas")
+    comparar_features(df_view, df_pandas)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# O que cada ponto de entrada importa ao subir (cada um num interpretador novo, como o usuário roda)
+PONTOS_DE_ENTRADA = {
+    'main (CLI)': 'import main',
+    'gui': 'import src.gui',
+    'ml_only': 'import src.ml_risk, src.ml_cluster',
+    'etl_nlp': 'import src.etl_nlp',
+}
+# Pacotes pesados que não deveriam entrar em quem não precisa deles
+PESADOS = ['torch', 'transformers', 'pysentimiento', 'sklearn', 'duckduckgo_search', 'dateparser', 'requests']
+TOP_N = 8
+
+
+def medir_imports(codigo):
+    """
+    Roda `python -X importtime -c codigo` e devolve {módulo: (tempo cumulativo em ms, nível)}, ou None se falhar.
+    Nível 0 = importado direto pelo código; os demais vieram de dentro de outro import.
+    """
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', codigo],
+                          cwd=RAIZ, capture_output=True, text=True)
+    if proc.returncode != 0:
+        erro = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"código {proc.returncode}"
+        print(f"   ❌ {erro}")
+        return None
+
+    tempos = {}
+    for linha in proc.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if not linha.startswith('import time:') or 'cumulative' in linha:
+            continue
+        _, cumulativo, modulo = linha[len('import time:'):].split('|')
+        nivel = (len(modulo) - len(modulo.lstrip()) - 1) // 2
+        tempos[modulo.strip()] = (int(cumulativo) / 1000, nivel)
+    return tempos
+
+
+def main():
+    print("🧪 [Benchmark] Tempo de import por ponto de entrada (-X importtime)...")
+    for nome, codigo in PONTOS_DE_ENTRADA.items():
+        print(f"\n▶️ {nome}: {codigo}")
+        tempos = medir_imports(codigo)
+        if tempos is None:
+            continue
+
+        # Só os imports de nível 0 somam o total sem contar duas vezes
+        total = sum(t for t, nivel in tempos.values() if nivel == 0)
+        carregados = [p for p in PESADOS if p in tempos]
+        print(f"   total: {total:.0f} ms | {len(tempos)} módulos | pesados: {', '.join(carregados) or 'nenhum'}")
+
+        # Maiores pacotes (sem submódulos, que já estão no cumulativo do pai)
+        pacotes = sorted(((t, m) for m, (t, _) in tempos.items() if '.' not in m), reverse=True)
+        for t, modulo in pacotes[:TOP_N]:
+            print(f"   {t:8.0f} ms  {modulo}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.db_connection import conexao
+from src.etl_nlp import analisar_sentimentos
+from src.sentiment_backends import BACKENDS, criar_backend
+
+# Títulos da T_BF_NOTICIAS usados na comparação (0 = todos)
+AMOSTRA = int(os.getenv('BF_BENCH_AMOSTRA', '2000'))
+# |score| abaixo disso conta como neutro na concordância de rótulo
+LIMIAR_NEUTRO = 0.1
+
+
+def rotulos(scores):
+    scores = np.asarray(scores, dtype=float)
+    return np.where(scores > LIMIAR_NEUTRO, 'POS', np.where(scores < -LIMIAR_NEUTRO, 'NEG', 'NEU'))
+
+
+def comparar(nome, scores, referencia):
+    """Concordância de rótulo, correlação e erro médio absoluto contra a referência."""
+    scores, referencia = np.asarray(scores, dtype=float), np.asarray(referencia, dtype=float)
+    # Títulos cuja inferência falhou (None -> nan) ficam fora da comparação
+    validos = ~np.isnan(scores) & ~np.isnan(referencia)
+    scores, referencia = scores[validos], referencia[validos]
+    concordancia = (rotulos(scores) == rotulos(referencia)).mean() * 100
+    correlacao = np.corrcoef(scores, referencia)[0, 1] if scores.std() and referencia.std() else float('nan')
+    mae = np.abs(scores - referencia).mean()
+    print(f"   {nome:>10}: concordância {concordancia:5.1f}% | correlação {correlacao:5.2f} | MAE {mae:.3f}")
+
+
+def main():
+    print("🧪 [Benchmark] Backends de sentimento nos títulos da T_BF_NOTICIAS...")
+    with conexao() as conn:
+        if not conn:
+            return
+        sql = "SELECT tx_titulo, vl_sentimento FROM T_BF_NOTICIAS WHERE tx_titulo IS NOT NULL ORDER BY id_noticia"
+        if AMOSTRA:
+            sql += f" FETCH FIRST {AMOSTRA} ROWS ONLY"
+        df = pd.read_sql(sql, conn)
+    if df.empty:
+        print("   ⚠️ T_BF_NOTICIAS vazia: rode o ETL de notícias antes.")
+        return
+    titulos = df['TX_TITULO'].tolist()
+    print(f"   {len(titulos)} títulos.\n")
+
+    resultados = {}
+    for nome in BACKENDS:
+        try:
+            inicio = time.perf_counter()
+            backend = criar_backend(nome)
+            t_carga = time.perf_counter() - inicio
+        except Exception as e:
+            print(f"   ❌ {nome}: não carregou ({e})")
+            continue
+
+        inicio = time.perf_counter()
+        resultados[nome] = analisar_sentimentos(titulos, backend)
+        t_inferencia = time.perf_counter() - inicio
+        print(f"   ⏱️ {nome:>10}: carga {t_carga:6.1f}s | inferência {t_inferencia:7.1f}s "
+              f"({len(titulos) / max(t_inferencia, 1e-9):,.0f} títulos/s)")
+        del backend
+
+    # Referência: o BERT float32 (se carregou); os scores gravados no banco entram como mais uma linha
+    if 'bert' in resultados:
+        print("\n📏 Concordância com o bert (float32):")
+        for nome, scores in resultados.items():
+            if nome != 'bert':
+                comparar(nome, scores, resultados['bert'])
+    gravados = df['VL_SENTIMENTO'].fillna(0).to_numpy()
+    print("\n📏 Concordância com o vl_sentimento gravado:")
+    for nome, scores in resultados.items():
+        comparar(nome, scores, gravados)
+
+
+if __name__ == "__main__":
+    main()
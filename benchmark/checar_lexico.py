@@ -0,0 +1,67 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.sentiment_backends import AnalisadorLexico
+
+# Manchete -> sinal esperado do score do léxico (+1 positivo, -1 negativo)
+CASOS = [
+    ("Inflação em alta preocupa o varejo", -1),
+    ("Não há crise no mercado", +1),
+    ("Juros em alta travam o crédito", -1),
+    ("Alta dos juros pressiona o varejo", -1),
+    ("Selic sobe para 15%", -1),
+    ("Copom eleva juros", -1),
+    ("Copom eleva a Selic pela terceira vez", -1),
+    ("Juros altos travam crédito", -1),
+    ("Alta da Selic encarece o crédito", -1),
+    ("Copom corta a Selic", +1),
+    ("Selic cai para 10%", +1),
+    ("Inflação desacelera em setembro", +1),
+    ("Desemprego cai ao menor nível da série", +1),
+    ("Safra não deve ter quebra neste ano", +1),
+    ("Indústria sem sinais de recuperação", -1),
+    ("Sinais de queda na inadimplência", +1),
+    # Inadimplência que não cai é notícia ruim para a carteira
+    ("Não há sinais de queda na inadimplência", -1),
+    ("Não há sinais de melhora no varejo", -1),
+    ("Ibovespa fecha em alta", +1),
+    ("Varejo tem queda nas vendas", -1),
+]
+# (afirmação, negação): a negação tem que alcançar o termo (palavras vazias não gastam a janela)
+# e inverter o score
+NEGACOES = [
+    ("Há crise no mercado", "Não há crise no mercado"),
+    ("Há sinais de queda na inadimplência", "Não há sinais de queda na inadimplência"),
+    ("Sinais de recuperação da indústria", "Sem sinais de recuperação da indústria"),
+    ("Safra deve ter quebra", "Safra não deve ter quebra"),
+]
+
+
+def main():
+    print("🧪 [Checagem] Sinal do léxico de sentimento em manchetes conhecidas...")
+    analisador = AnalisadorLexico()
+    falhas = 0
+    for titulo, sinal in CASOS:
+        score = analisador.pontuar(titulo)
+        ok = score * sinal > 0
+        falhas += not ok
+        print(f"   {'✅' if ok else '❌'} {score:+.3f}  {titulo}")
+
+    print("\n🔁 Negação:")
+    for afirmacao, negacao in NEGACOES:
+        score, score_negado = analisador.pontuar(afirmacao), analisador.pontuar(negacao)
+        ok = score * score_negado < 0
+        falhas += not ok
+        print(f"   {'✅' if ok else '❌'} {score:+.3f} -> {score_negado:+.3f}  {negacao}")
+
+    total = len(CASOS) + len(NEGACOES)
+    if falhas:
+        print(f"\n❌ {falhas} de {total} checagens falharam.")
+        sys.exit(1)
+    print(f"\n✅ {total} checagens com o sinal esperado.")
+
+
+if __name__ == "__main__":
+    main()
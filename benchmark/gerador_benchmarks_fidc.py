@@ -18,23 +18,21 @@ warnings.filterwarnings(
 )
 
 # Importa a sua conexão real com o banco
-from src.db_connection import get_connection
+from src.db_connection import conexao
+from src.ml_features import carregar_treino_risco
 
 plt.style.use('dark_background')
 
 
-def gerar_benchmark_risco():
-    print("🧠 [Benchmark] Conectando ao Oracle para buscar V_BF_TREINO_ML_RISCO...")
-    conn = get_connection()
-    if not conn:
-        print("❌ Erro de conexão com o banco.")
-        return
+def gerar_benchmark_risco(fonte=None):
+    print("🧠 [Benchmark] Conectando ao Oracle para buscar os dados de treino do risco...")
+    with conexao() as conn:
+        if not conn:
+            print("❌ Erro de conexão com o banco.")
+            return
 
-    try:
-        df_treino = pd.read_sql("SELECT * FROM V_BF_TREINO_ML_RISCO", conn)
+        df_treino = carregar_treino_risco(conn, fonte)
         df_treino = df_treino.fillna(0)
-    finally:
-        conn.close()
 
     if df_treino.empty:
         print("⚠️ View de risco vazia.")
@@ -92,16 +90,13 @@ def gerar_benchmark_risco():
 
 def gerar_benchmark_cluster():
     print("\n🧬 [Benchmark] Conectando ao Oracle para buscar V_BF_TREINO_ML_CLUSTER...")
-    conn = get_connection()
-    if not conn:
-        print("❌ Erro de conexão com o banco.")
-        return
+    with conexao() as conn:
+        if not conn:
+            print("❌ Erro de conexão com o banco.")
+            return
 
-    try:
         df_clientes = pd.read_sql("SELECT * FROM V_BF_TREINO_ML_CLUSTER", conn)
         df_clientes = df_clientes.fillna(0)
-    finally:
-        conn.close()
 
     cols_features = ['NR_FREQUENCIA_COMPRA', 'VL_TICKET_MEDIO', 'VL_MEDIO_DIAS_ATRASO']
     X = df_clientes[cols_features]
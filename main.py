@@ -1,18 +1,37 @@
 import argparse
-from src.setup_tables import recriar_banco_dados
+import os
+import threading
+from src.setup_tables import recriar_banco_dados, verificar_indices
+from src.migrations import migrar_schema
 from src.setup_views import atualizar_view_ml, atualizar_view_pbi
-from src.ml_cluster import segmentar_clientes
-from src.ml_risk import calcular_risco_credito
-from src.etl_api import carregar_api
-from src.etl_ingestion import carregar_dados
-from src.etl_nlp import executar_etl_noticias
-from src.gui import run_gui
+from src.db_connection import imprimir_estatisticas_pool
+
+# As etapas pesadas (sklearn, torch/pysentimiento, requests, customtkinter) são importadas
+# só no modo que as usa: um ml_only não carrega o torch, e a GUI abre sem ele.
+# BF_NLP_AQUECER=1 carrega o modelo de sentimento em segundo plano enquanto as outras etapas rodam.
+AQUECER_NLP = os.getenv('BF_NLP_AQUECER', '0') == '1'
+
+
+def aquecer_nlp_em_segundo_plano():
+    def aquecer():
+        from src.etl_nlp import aquecer_modelo
+        aquecer_modelo()
+
+    threading.Thread(target=aquecer, name='aquecer-nlp', daemon=True).start()
 
 
 def run_pipeline(mode='full'):
     print(f"🚀 Executando pipeline no modo: {mode}")
 
     if mode == 'full':
+        from src.etl_api import carregar_api
+        from src.etl_ingestion import carregar_dados
+        from src.etl_nlp import executar_etl_noticias
+        from src.ml_cluster import segmentar_clientes
+        from src.ml_risk import calcular_risco_credito
+        if AQUECER_NLP:
+            aquecer_nlp_em_segundo_plano()
+
         # 1. Infraestrutura
         recriar_banco_dados()
 
@@ -31,20 +50,47 @@ def run_pipeline(mode='full'):
         # 5. Visualização
         atualizar_view_pbi()
 
+    elif mode == 'incremental':
+        # Aplica só o delta dos CSVs (MERGE) e reaproveita os modelos salvos
+        from src.etl_api import carregar_api
+        from src.etl_ingestion import carregar_dados
+        from src.ml_cluster import segmentar_clientes
+        from src.ml_risk import calcular_risco_credito
+        carregar_dados(modo='incremental')
+        carregar_api()
+        atualizar_view_ml()
+        calcular_risco_credito()
+        segmentar_clientes()
+        atualizar_view_pbi()
+
     elif mode == 'ml_only':
         # Usa modelos salvos se existirem
+        from src.ml_cluster import segmentar_clientes
+        from src.ml_risk import calcular_risco_credito
         calcular_risco_credito()
         segmentar_clientes()
         atualizar_view_pbi()
 
     elif mode == 'ml_only_retrain':
         # Força o re-treino dos modelos
+        from src.ml_cluster import segmentar_clientes
+        from src.ml_risk import calcular_risco_credito
         calcular_risco_credito(force_retrain=True)
         segmentar_clientes(force_retrain=True)
         atualizar_view_pbi()
 
+    elif mode == 'migrate':
+        # Atualiza o schema existente sem apagar dados e recria as views sobre ele
+        migrar_schema()
+        atualizar_view_ml()
+        atualizar_view_pbi()
+
+    elif mode == 'indices':
+        # Schema já existente: reporta e cria os índices do plano que estiverem faltando
+        verificar_indices(criar=True)
+
     else:
-        raise ValueError("Modo inválido. Use: full | ml_only | ml_only_retrain")
+        raise ValueError("Modo inválido. Use: full | incremental | ml_only | ml_only_retrain | migrate | indices")
 
 
 if __name__ == "__main__":
@@ -56,7 +102,7 @@ if __name__ == "__main__":
         "-m", "--mode",
         type=str,
         default="full",
-        choices=["full", "ml_only", "ml_only_retrain"],
+        choices=["full", "incremental", "ml_only", "ml_only_retrain", "migrate", "indices"],
         help="Modo de execução do pipeline"
     )
 
@@ -66,6 +112,10 @@ if __name__ == "__main__":
     if args.cli and not args.gui:
         print("--- INICIANDO BÚSSOLA DE FIDCS (SISTEMA INTEGRADO)---")
         run_pipeline(args.mode)
+        imprimir_estatisticas_pool()
         print("🏁--- PROCESSO FINALIZADO COM SUCESSO ---")
     else:
+        from src.gui import run_gui
+        if AQUECER_NLP:
+            aquecer_nlp_em_segundo_plano()
         run_gui()
\ No newline at end of file
@@ -0,0 +1,75 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from src.utils_paths import resource_path
+
+# ================= CONFIGURAÇÕES =================
+# Respostas JSON das APIs externas (BCB / IBGE) ficam em disco, uma por URL.
+CACHE_DIR = os.path.join(resource_path("cache"), "http")
+# Offline: só responde do cache (nenhuma requisição sai), útil em desenvolvimento
+API_OFFLINE = os.getenv('BF_API_OFFLINE', '0') == '1'
+# TTL padrão em segundos; cada série pode pedir o seu (0 = não usa cache)
+TTL_PADRAO = int(os.getenv('BF_CACHE_HTTP_TTL', str(6 * 3600)))
+
+_lock = threading.Lock()
+_stats = {'hits': 0, 'revalidadas': 0, 'baixadas': 0}
+
+
+def _caminho(url):
+    return os.path.join(CACHE_DIR, hashlib.sha256(url.encode('utf-8')).hexdigest() + '.json')
+
+
+def ler(url):
+    """Entrada salva da URL ({'url', 'salvo_em', 'etag', 'last_modified', 'dados'}) ou None."""
+    try:
+        with open(_caminho(url), 'r', encoding='utf-8') as f:
+            entrada = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return entrada if entrada.get('url') == url else None
+
+
+def valida(entrada, ttl):
+    return entrada is not None and ttl > 0 and time.time() - entrada['salvo_em'] < ttl
+
+
+def salvar(url, dados, etag=None, last_modified=None):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    arquivo = _caminho(url)
+    # Nome temporário por thread: duas coletas da mesma URL não se atropelam
+    temporario = f"{arquivo}.{threading.get_ident()}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump({'url': url, 'salvo_em': time.time(), 'etag': etag, 'last_modified': last_modified,
+                   'dados': dados}, f)
+    os.replace(temporario, arquivo)
+
+
+def cabecalhos_condicionais(entrada):
+    """If-None-Match / If-Modified-Since a partir do que o servidor mandou da última vez."""
+    if entrada is None:
+        return {}
+    cabecalhos = {}
+    if entrada.get('etag'):
+        cabecalhos['If-None-Match'] = entrada['etag']
+    if entrada.get('last_modified'):
+        cabecalhos['If-Modified-Since'] = entrada['last_modified']
+    return cabecalhos
+
+
+def registrar(evento):
+    """evento: 'hits' (servido do disco), 'revalidadas' (304) ou 'baixadas' (200)."""
+    with _lock:
+        _stats[evento] += 1
+
+
+def estatisticas_cache():
+    with _lock:
+        return dict(_stats)
+
+
+def imprimir_estatisticas_cache():
+    s = estatisticas_cache()
+    print(f"   🗃️ [Cache HTTP] {s['hits']} do disco | {s['revalidadas']} revalidadas (304) | "
+          f"{s['baixadas']} baixadas{' | OFFLINE' if API_OFFLINE else ''}")
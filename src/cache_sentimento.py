@@ -0,0 +1,103 @@
+import hashlib
+import os
+import sqlite3
+import time
+from src.utils_paths import resource_path
+
+# ================= CONFIGURAÇÕES =================
+# Scores de sentimento já calculados, por título normalizado + versão do modelo.
+# As mesmas manchetes voltam no RSS/DDG de um dia para o outro: só título novo paga inferência.
+ARQUIVO_CACHE = os.path.join(resource_path("cache"), "sentimento.sqlite")
+CACHE_ATIVO = os.getenv('BF_CACHE_SENTIMENTO', '1') == '1'
+# Teto de entradas; acima dele saem as menos usadas recentemente (LRU)
+MAX_ITENS = int(os.getenv('BF_CACHE_SENTIMENTO_MAX', '50000'))
+# SQLite aceita no máximo 999 parâmetros por comando nas versões antigas
+LOTE_SQL = 500
+
+
+def normalizar_titulo(titulo):
+    return " ".join(str(titulo).lower().split())
+
+
+def hash_titulo(titulo):
+    """SHA-256 (hex) do título normalizado: mesma manchete com caixa/espaços diferentes = mesmo hash."""
+    return hashlib.sha256(normalizar_titulo(titulo).encode('utf-8')).hexdigest()
+
+
+class CacheSentimento:
+    """
+    Cache persistente em SQLite. A versão do modelo faz parte da chave: cada backend só lê os
+    próprios scores, e alternar de backend (ex: bert <-> lexico) não apaga o cache do outro.
+    Versões que não são mais usadas saem pelo LRU.
+    Uso: with CacheSentimento(versao) as cache: cache.buscar(titulos) / cache.salvar(titulos, scores)
+    """
+
+    def __init__(self, versao, arquivo=ARQUIVO_CACHE, max_itens=MAX_ITENS):
+        self.versao = versao
+        self.max_itens = max_itens
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.dirname(arquivo), exist_ok=True)
+        self._conn = sqlite3.connect(arquivo)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS sentimento (
+                cd_hash    TEXT NOT NULL,
+                versao     TEXT NOT NULL,
+                score      REAL NOT NULL,
+                ultimo_uso REAL NOT NULL,
+                PRIMARY KEY (cd_hash, versao)
+            )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_sentimento_uso ON sentimento (ultimo_uso)")
+        self._conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.fechar()
+
+    def fechar(self):
+        self._conn.close()
+
+    def buscar(self, titulos):
+        """Lista de scores na ordem dos títulos (None onde não há cache). Renova o uso dos encontrados."""
+        hashes = [hash_titulo(t) for t in titulos]
+        encontrados = {}
+        unicos = list(dict.fromkeys(hashes))
+        for i in range(0, len(unicos), LOTE_SQL):
+            lote = unicos[i:i + LOTE_SQL]
+            marcadores = ",".join("?" * len(lote))
+            encontrados.update(self._conn.execute(
+                f"SELECT cd_hash, score FROM sentimento WHERE versao = ? AND cd_hash IN ({marcadores})",
+                [self.versao, *lote]).fetchall())
+
+        agora = time.time()
+        self._conn.executemany("UPDATE sentimento SET ultimo_uso = ? WHERE cd_hash = ? AND versao = ?",
+                               [(agora, h, self.versao) for h in encontrados])
+        self._conn.commit()
+
+        scores = [encontrados.get(h) for h in hashes]
+        self.hits += sum(s is not None for s in scores)
+        self.misses += sum(s is None for s in scores)
+        return scores
+
+    def salvar(self, titulos, scores):
+        """Grava os scores calculados; None (inferência que falhou) não entra no cache."""
+        agora = time.time()
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO sentimento (cd_hash, versao, score, ultimo_uso) VALUES (?, ?, ?, ?)",
+            [(hash_titulo(t), self.versao, float(s), agora) for t, s in zip(titulos, scores) if s is not None])
+        self._evictar()
+        self._conn.commit()
+
+    def _evictar(self):
+        total = self._conn.execute("SELECT COUNT(*) FROM sentimento").fetchone()[0]
+        excesso = total - self.max_itens
+        if excesso > 0:
+            self._conn.execute("""DELETE FROM sentimento WHERE rowid IN
+                                  (SELECT rowid FROM sentimento ORDER BY ultimo_uso LIMIT ?)""", (excesso,))
+
+    def imprimir_estatisticas(self):
+        total = self.hits + self.misses
+        taxa = self.hits / total * 100 if total else 0.0
+        print(f"   🗃️ [Cache Sentimento] {self.hits} do cache | {self.misses} inferidos | {taxa:.0f}% de acerto")
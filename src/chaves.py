@@ -0,0 +1,82 @@
+import os
+import numpy as np
+import pandas as pd
+
+# ================= CONFIGURAÇÕES =================
+# Os ids (id_boleto, id_pagador, id_beneficiario, id_empresa) são SHA-256 em hex.
+# Com BF_CHAVES_COMPACTAS=1 o banco guarda os 32 bytes (RAW(32)) em vez dos 64 chars,
+# o que corta pela metade as chaves das PKs/FKs e dos índices.
+# Trocar o modo exige recriar as tabelas (setup).
+CHAVES_COMPACTAS = os.getenv('BF_CHAVES_COMPACTAS', '0') == '1'
+TIPO_ID = 'RAW(32)' if CHAVES_COMPACTAS else 'VARCHAR2(64)'
+
+_HEX = np.frombuffer(b'0123456789abcdef', dtype=np.uint8)
+
+
+# ==============================================================================
+# HEX <-> BYTES
+# ==============================================================================
+def hex_para_bytes(serie):
+    """Converte uma série de hex de 64 chars num buffer contíguo de n * 32 bytes (ou None se inválida)."""
+    valores = serie.to_numpy(dtype=object)
+    if len(valores) == 0:
+        return b''
+    try:
+        buffer = bytes.fromhex(''.join(valores))
+    except (TypeError, ValueError):
+        return None
+    return buffer if len(buffer) == 32 * len(valores) else None
+
+
+def bytes_para_hex(matriz):
+    """Matriz (n, 32) de uint8 -> array de strings hex minúsculas de 64 chars, sem laço em Python."""
+    n = matriz.shape[0]
+    saida = np.empty((n, 64), dtype=np.uint8)
+    saida[:, 0::2] = _HEX[matriz >> 4]
+    saida[:, 1::2] = _HEX[matriz & 0x0F]
+    return saida.view('S64').ravel().astype(str)
+
+
+# ==============================================================================
+# FRONTEIRAS (ingestão -> banco, banco -> exportação)
+# ==============================================================================
+def ids_para_banco(df, colunas):
+    """
+    Na ingestão: devolve o DataFrame com as colunas de id no formato da tabela.
+    No modo compacto, cada id vira um bytes de 32 posições (bind RAW); senão, nada muda.
+    """
+    if not CHAVES_COMPACTAS:
+        return df
+    df = df.copy()
+    for col in colunas:
+        buffer = hex_para_bytes(df[col])
+        if buffer is None:
+            raise ValueError(f"Coluna {col} tem ids fora do padrão SHA-256 hex.")
+        df[col] = [buffer[i:i + 32] for i in range(0, len(buffer), 32)]
+    return df
+
+
+def id_exportado(expressao):
+    """Na exportação (views de consumo): expressão SQL que sempre entrega o id em hex minúsculo."""
+    return f"LOWER(RAWTOHEX({expressao}))" if CHAVES_COMPACTAS else expressao
+
+
+def id_importado(expressao):
+    """Inverso do id_exportado: id em hex (de uma tabela de consumo) no formato das tabelas base."""
+    return f"HEXTORAW({expressao})" if CHAVES_COMPACTAS else expressao
+
+
+# ==============================================================================
+# CHAVES SUBSTITUTAS (pandas)
+# ==============================================================================
+def codificar_ids(*series):
+    """
+    Troca ids (hex ou bytes) por códigos int32 de um mesmo dicionário para todas as séries,
+    para que joins/agrupamentos em pandas comparem inteiros em vez de strings de 64 chars.
+    Retorna (lista de arrays de códigos, array com os ids originais de cada código).
+    """
+    tamanhos = [len(s) for s in series]
+    codigos, dicionario = pd.factorize(pd.concat([pd.Series(s, dtype=object) for s in series], ignore_index=True))
+    codigos = codigos.astype(np.int32)
+    limites = np.cumsum([0] + tamanhos)
+    return [codigos[limites[i]:limites[i + 1]] for i in range(len(series))], np.asarray(dicionario, dtype=object)
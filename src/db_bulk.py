@@ -0,0 +1,159 @@
+import os
+import pandas as pd
+import oracledb
+
+# Arrow é opcional: sem pyarrow caímos direto no executemany em lotes
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# ================= CONFIGURAÇÕES =================
+BATCH_PADRAO = int(os.getenv('BF_BULK_BATCH', '5000'))
+# Direct path ignora triggers e trava a tabela durante a carga: só liga se pedir
+CARGA_DIRETA = os.getenv('BF_CARGA_DIRETA', '0') == '1'
+MAX_ERROS_EXIBIDOS = 5
+
+
+def _versao_oracledb():
+    try:
+        return tuple(int(p) for p in oracledb.__version__.split('.')[:2])
+    except Exception:
+        return (0, 0)
+
+
+def suporta_arrow():
+    """executemany() aceita DataFrames Arrow a partir do python-oracledb 3.1."""
+    return pa is not None and _versao_oracledb() >= (3, 1)
+
+
+def suporta_carga_direta(conn):
+    return hasattr(conn, 'direct_path_load')
+
+
+def _coluna_de_bytes(serie):
+    valores = serie.dropna()
+    return not valores.empty and isinstance(valores.iloc[0], bytes)
+
+
+def tipos_por_dtype(df):
+    """
+    Deduz os tipos do setinputsizes a partir dos dtypes, para o driver não
+    precisar adivinhar (e re-alocar buffers) a cada lote:
+      - texto  -> tamanho máximo da coluna
+      - bytes  -> DB_TYPE_RAW (ids compactos)
+      - data   -> DB_TYPE_DATE
+      - número -> DB_TYPE_NUMBER
+    """
+    tipos = []
+    for col in df.columns:
+        serie = df[col]
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            tipos.append(oracledb.DB_TYPE_DATE)
+        elif pd.api.types.is_bool_dtype(serie) or pd.api.types.is_numeric_dtype(serie):
+            tipos.append(oracledb.DB_TYPE_NUMBER)
+        elif _coluna_de_bytes(serie):
+            tipos.append(oracledb.DB_TYPE_RAW)
+        else:
+            try:
+                tamanho = serie.str.len().max()
+            except AttributeError:
+                tamanho = None
+            tipos.append(int(tamanho) if pd.notna(tamanho) and tamanho > 0 else None)
+    return tipos
+
+
+def _lote_para_tuplas(lote):
+    # Só o lote atual vira objeto Python; NaN/NaT viram None (NULL no Oracle)
+    return lote.astype(object).where(pd.notnull(lote), None).values.tolist()
+
+
+def _registrar_erros(cursor, inicio, erros):
+    for erro in cursor.getbatcherrors():
+        erros.append((inicio + erro.offset, erro.message))
+
+
+def _reportar(descricao, erros, metodo):
+    if erros:
+        print(f"      ⚠️ {descricao}: {len(erros)} linha(s) rejeitada(s) pelo banco ({metodo}).")
+        for offset, mensagem in erros[:MAX_ERROS_EXIBIDOS]:
+            print(f"         linha {offset}: {mensagem}")
+        if len(erros) > MAX_ERROS_EXIBIDOS:
+            print(f"         ... e mais {len(erros) - MAX_ERROS_EXIBIDOS}.")
+
+
+def executar_em_lotes(conn, sql, df, tipos=None, batch_size=BATCH_PADRAO, descricao="Carga"):
+    """
+    Executa um DML com binds posicionais (:1, :2, ...) para cada linha do DataFrame.
+    A ordem das colunas do DataFrame deve ser a mesma dos binds.
+
+    - Usa ingestão Arrow (sem tuplas Python) quando o driver suporta e `tipos` não foi passado:
+      os tipos dos binds saem do schema que o pa.Table.from_pandas deduz dos dtypes.
+    - Senão (driver antigo, sem pyarrow ou com `tipos` explícitos), executemany em lotes com
+      setinputsizes(*tipos) (ou tipos_por_dtype(df), se `tipos` for None). Quem precisa de um tipo
+      específico num bind (ex: coluna toda nula, VARCHAR2 com tamanho fixo) passa `tipos`.
+    - Sempre com batcherrors=True: uma linha ruim não derruba o lote; os erros são
+      reportados e devolvidos para quem chamou decidir entre commit e rollback.
+
+    Retorna (linhas_gravadas, erros), onde erros = [(posição_no_df, mensagem), ...].
+    """
+    if df is None or df.empty:
+        return 0, []
+
+    cursor = conn.cursor()
+    erros = []
+
+    if tipos is None and suporta_arrow():
+        metodo = "arrow"
+        tabela = pa.Table.from_pandas(df, preserve_index=False)
+        for inicio in range(0, tabela.num_rows, batch_size):
+            cursor.executemany(sql, tabela.slice(inicio, batch_size), batcherrors=True)
+            _registrar_erros(cursor, inicio, erros)
+    else:
+        metodo = "executemany"
+        cursor.setinputsizes(*(tipos if tipos is not None else tipos_por_dtype(df)))
+        for inicio in range(0, len(df), batch_size):
+            lote = df.iloc[inicio:inicio + batch_size]
+            cursor.executemany(sql, _lote_para_tuplas(lote), batcherrors=True)
+            _registrar_erros(cursor, inicio, erros)
+
+    _reportar(descricao, erros, metodo)
+    return len(df) - len(erros), erros
+
+
+def inserir_dataframe(conn, tabela, colunas, df, tipos=None, batch_size=BATCH_PADRAO, direto=None,
+                      descricao=None):
+    """
+    INSERT simples de um DataFrame numa tabela. `colunas` são as colunas da tabela,
+    na mesma ordem das colunas do DataFrame. `tipos` segue o executar_em_lotes (força o executemany).
+
+    Com direto=True (ou BF_CARGA_DIRETA=1) e driver compatível, usa a carga em
+    caminho direto do python-oracledb; se ela falhar, desfaz só ela (savepoint) e cai no
+    executar_em_lotes. O resto da transação de quem chamou (ex: DELETE antes da carga) continua aberto.
+    """
+    descricao = descricao or tabela
+    direto = CARGA_DIRETA if direto is None else direto
+
+    if df is None or df.empty:
+        return 0, []
+
+    if direto and suporta_carga_direta(conn):
+        cursor = conn.cursor()
+        cursor.execute("SAVEPOINT SP_BF_CARGA_DIRETA")
+        try:
+            conn.direct_path_load(
+                schema_name=conn.username.upper(),
+                table_name=tabela,
+                column_names=list(colunas),
+                data=_lote_para_tuplas(df) if pa is None else pa.Table.from_pandas(df, preserve_index=False),
+                batch_size=batch_size,
+            )
+            return len(df), []
+        except Exception as e:
+            print(f"      ⚠️ Carga direta indisponível para {tabela} ({e}). Usando executemany.")
+            # Se nem o savepoint puder ser desfeito, o erro sobe para quem chamou decidir
+            cursor.execute("ROLLBACK TO SAVEPOINT SP_BF_CARGA_DIRETA")
+
+    binds = ", ".join(f":{i}" for i in range(1, len(colunas) + 1))
+    sql = f"INSERT INTO {tabela} ({', '.join(colunas)}) VALUES ({binds})"
+    return executar_em_lotes(conn, sql, df, tipos=tipos, batch_size=batch_size, descricao=descricao)
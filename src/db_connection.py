@@ -1,4 +1,8 @@
 import os
+import threading
+import time
+from contextlib import contextmanager
+
 import oracledb
 
 # Tenta carregar .env, mas não quebra se não existir (pois usamos GUI)
@@ -8,33 +12,169 @@ try:
 except ImportError:
     pass
 
-def get_connection():
+# ================= CONFIGURAÇÕES DO POOL =================
+# Todos os valores podem ser sobrescritos por variáveis de ambiente (.env)
+POOL_MIN = int(os.getenv('ORACLE_POOL_MIN', '1'))
+POOL_MAX = int(os.getenv('ORACLE_POOL_MAX', '4'))
+POOL_INCREMENT = int(os.getenv('ORACLE_POOL_INCREMENT', '1'))
+POOL_STMT_CACHE = int(os.getenv('ORACLE_STMT_CACHE', '50'))
+POOL_TIMEOUT_ESPERA = int(os.getenv('ORACLE_POOL_WAIT_TIMEOUT', '60000'))  # ms
+
+# Pool único por processo. A chave guarda as credenciais usadas para criá-lo:
+# se a GUI trocar usuário/DSN, o pool antigo é fechado e outro é criado.
+_pool = None
+_pool_chave = None
+_pool_lock = threading.Lock()
+
+_stats_lock = threading.Lock()
+_stats = {
+    'aquisicoes': 0,
+    'falhas': 0,
+    'espera_total_s': 0.0,
+    'espera_max_s': 0.0,
+}
+
+
+def _credenciais():
+    # A GUI preenche estas variáveis em tempo de execução
+    return os.getenv('ORACLE_USER'), os.getenv('ORACLE_PASSWORD'), os.getenv('ORACLE_DSN')
+
+
+def get_pool():
     """
-    Abre uma NOVA conexão usando as credenciais injetadas pela GUI (os.environ).
-    IMPORTANTE: Quem chamar esta função DEVE fechar a conexão usando conn.close().
+    Retorna o pool de sessões do processo, criando-o na primeira chamada.
+    Retorna None se as credenciais ainda não foram informadas.
     """
+    global _pool, _pool_chave
+
+    user, password, dsn = _credenciais()
+    if not user or not password or not dsn:
+        return None
+
+    chave = (user, password, dsn)
+    with _pool_lock:
+        if _pool is not None and _pool_chave == chave:
+            return _pool
+
+        if _pool is not None:
+            # Credenciais mudaram (ex: usuário trocou na GUI)
+            _fechar_pool_sem_lock()
+
+        _pool = oracledb.create_pool(
+            user=user,
+            password=password,
+            dsn=dsn,
+            min=POOL_MIN,
+            max=POOL_MAX,
+            increment=POOL_INCREMENT,
+            stmtcachesize=POOL_STMT_CACHE,
+            getmode=oracledb.POOL_GETMODE_TIMEDWAIT,
+            wait_timeout=POOL_TIMEOUT_ESPERA,
+        )
+        _pool_chave = chave
+        print(f"🔌 Pool Oracle criado (min={POOL_MIN}, max={POOL_MAX}, incremento={POOL_INCREMENT}).")
+        return _pool
+
+
+def _fechar_pool_sem_lock():
+    global _pool, _pool_chave
     try:
-        # A GUI preenche estas variáveis em tempo de execução
-        user = os.getenv('ORACLE_USER')
-        password = os.getenv('ORACLE_PASSWORD')
-        dsn = os.getenv('ORACLE_DSN')
+        _pool.close(force=True)
+    except Exception:
+        pass
+    _pool = None
+    _pool_chave = None
 
-        if not user or not password or not dsn:
+
+def fechar_pool():
+    """Fecha o pool (ex: ao encerrar a aplicação)."""
+    with _pool_lock:
+        if _pool is not None:
+            _fechar_pool_sem_lock()
+
+
+def get_connection():
+    """
+    Pega uma sessão do pool usando as credenciais injetadas pela GUI (os.environ).
+    IMPORTANTE: Quem chamar esta função DEVE fechar a conexão usando conn.close()
+    (no pool, close() apenas devolve a sessão). Prefira o context manager conexao().
+    """
+    try:
+        pool = get_pool()
+        if pool is None:
             # Silencia o erro se for apenas uma verificação de import,
             # mas avisa se for tentativa real de conexão.
             return None
 
-        connection = oracledb.connect(
-            user=user,
-            password=password,
-            dsn=dsn
-        )
+        inicio = time.perf_counter()
+        connection = pool.acquire()
+        espera = time.perf_counter() - inicio
+
+        with _stats_lock:
+            _stats['aquisicoes'] += 1
+            _stats['espera_total_s'] += espera
+            _stats['espera_max_s'] = max(_stats['espera_max_s'], espera)
         return connection
 
     except oracledb.DatabaseError as e:
+        with _stats_lock:
+            _stats['falhas'] += 1
         error, = e.args
         print(f"❌ Erro Oracle ORA-{error.code}: {error.message}")
         return None
     except Exception as e:
+        with _stats_lock:
+            _stats['falhas'] += 1
         print(f"❌ Erro genérico de conexão: {e}")
-        return None
\ No newline at end of file
+        return None
+
+
+@contextmanager
+def conexao():
+    """
+    Context manager para uso nos módulos de ETL/ML:
+
+        with conexao() as conn:
+            if not conn: return
+            ...
+
+    A sessão volta para o pool ao sair do bloco, mesmo em caso de erro.
+    """
+    conn = get_connection()
+    try:
+        yield conn
+    finally:
+        if conn:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
+def estatisticas_pool():
+    """
+    Retorna um dicionário com os números do pool para ajudar no dimensionamento
+    (aquisições, tempo de espera, sessões ocupadas/abertas).
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+
+    stats['espera_media_s'] = stats['espera_total_s'] / stats['aquisicoes'] if stats['aquisicoes'] else 0.0
+
+    pool = _pool
+    if pool is not None:
+        stats['sessoes_ocupadas'] = pool.busy
+        stats['sessoes_abertas'] = pool.opened
+        stats['pool_min'] = pool.min
+        stats['pool_max'] = pool.max
+    else:
+        stats['sessoes_ocupadas'] = 0
+        stats['sessoes_abertas'] = 0
+    return stats
+
+
+def imprimir_estatisticas_pool():
+    s = estatisticas_pool()
+    print(f"📈 Pool Oracle: {s['aquisicoes']} aquisições | {s['falhas']} falhas | "
+          f"espera média {s['espera_media_s'] * 1000:.1f} ms (máx {s['espera_max_s'] * 1000:.1f} ms) | "
+          f"ocupadas {s['sessoes_ocupadas']}/{s['sessoes_abertas']} abertas")
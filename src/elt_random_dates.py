@@ -1,90 +1,171 @@
+import hashlib
+import json
 import numpy as np
 import os
 import pandas as pd
 from datetime import datetime, timedelta
+from src.staging import ler_csv_em_blocos
 
 # ================= CONFIGURAÇÕES =================
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_DIR = os.path.join(BASE_DIR, 'data')
+CACHE_DIR = os.path.join(BASE_DIR, 'cache')
 ARQUIVO_ENTRADA = 'boletos.csv'
 ARQUIVO_SAIDA = 'boletos_datas_variadas.csv'
+# Guarda hash da entrada + seed + janela da última geração do ARQUIVO_SAIDA
+ARQUIVO_META = os.path.join(CACHE_DIR, 'variar_datas_meta.json')
 
-# Janela de Tempo para Espalhar (Ex: Últimos 2 anos até hoje)
-# Usamos datetime completo para compatibilidade com Pandas
-DATA_FIM = datetime.now()
-DATA_INICIO = DATA_FIM - timedelta(days=730)
+# Janela de Tempo para Espalhar (Ex: Últimos 2 anos até a data de fim)
+# A data de fim é ancorada: fixada na primeira geração e guardada no ARQUIVO_META. Se andasse com o
+# relógio, as datas mudariam todo dia, e com elas os checksums da ingestão incremental (que regravaria
+# a carteira inteira). BF_DATAS_FIM=AAAA-MM-DD move a janela de propósito (e vira a nova âncora).
+DIAS_JANELA = 730
+DATA_FIM_FIXA = os.getenv('BF_DATAS_FIM')
+
+# Colunas esperadas
+COLUNAS_DATAS = ['dt_emissao', 'dt_vencimento', 'dt_pagamento']
+CHUNK_PADRAO = 100000
 
 
 # =================================================
 
-def variar_datas_apenas(seed=None):
-    # --- TRAVA DE SEGURANÇA (SEED) ---
-    if seed is not None:
-        np.random.seed(seed)
+def hash_arquivo(caminho, tamanho_bloco=1024 * 1024):
+    """SHA-256 do arquivo lido em blocos (não carrega o arquivo inteiro)."""
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b''):
+            h.update(bloco)
+    return h.hexdigest()
 
-    print(f"📂 Lendo original: {ARQUIVO_ENTRADA}...")
-    arquivo_entrada = os.path.join(DATA_DIR, ARQUIVO_ENTRADA)
 
-    # 1. Leitura Robustez (Tenta vírgula, se falhar tenta ponto e vírgula)
+def _ler_meta():
     try:
-        df = pd.read_csv(arquivo_entrada, sep=',')
-        if len(df.columns) < 2:
-            df = pd.read_csv(arquivo_entrada, sep=';')
-    except Exception as e:
-        print(f"❌ Erro na leitura: {e}")
-        return
-
-    print(f"   Processando {len(df)} boletos...")
-
-    # Colunas esperadas
-    COLUNAS_DATAS = ['dt_emissao', 'dt_vencimento', 'dt_pagamento']
-
-    # Validação de Colunas
-    faltantes = [c for c in COLUNAS_DATAS if c not in df.columns]
-    if faltantes:
-        print(f"❌ Erro: Colunas obrigatórias ausentes: {faltantes}")
-        return
-
-    # Converter para datetime do Pandas
-    for col in COLUNAS_DATAS:
-        df[col] = pd.to_datetime(df[col], errors='coerce')
+        with open(ARQUIVO_META, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def _gravar_meta(meta):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(ARQUIVO_META, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+
+
+def janela_datas():
+    """
+    (data_inicio, data_fim) da variação. O fim vem do BF_DATAS_FIM ou da âncora no ARQUIVO_META;
+    na primeira vez é hoje, e já fica gravado como âncora.
+    """
+    if DATA_FIM_FIXA:
+        data_fim = datetime.strptime(DATA_FIM_FIXA, '%Y-%m-%d')
+    else:
+        meta = _ler_meta()
+        if 'data_fim' in meta:
+            data_fim = datetime.strptime(meta['data_fim'], '%Y-%m-%d')
+        else:
+            data_fim = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+            _gravar_meta({**meta, 'data_fim': data_fim.strftime('%Y-%m-%d')})
+    return data_fim - timedelta(days=DIAS_JANELA), data_fim
+
+
+def variar_datas_bloco(df, rng, data_inicio=None, data_fim=None):
+    """
+    Espalha os vencimentos de um bloco na janela [data_inicio, data_fim) mantendo os
+    deltas originais (emissão -> vencimento -> pagamento). Tudo vetorizado em datetime64.
+    `rng` é um numpy.random.Generator: blocos consecutivos com o mesmo gerador produzem
+    o mesmo resultado que o arquivo inteiro de uma vez. Sem janela, usa a ancorada (janela_datas).
+    """
+    if data_inicio is None or data_fim is None:
+        data_inicio, data_fim = janela_datas()
+
+    datas = {col: pd.to_datetime(df[col], errors='coerce') for col in COLUNAS_DATAS}
 
-    # 2. Calcular Deltas (Diferença entre as datas originais)
     # dias_para_pagar: Positivo = Atraso, Negativo = Adiantado, NaT = Não pago
-    df['dias_para_pagar'] = df['dt_pagamento'] - df['dt_vencimento']
-    df['dias_emissao_antes'] = df['dt_vencimento'] - df['dt_emissao']
+    dias_para_pagar = datas['dt_pagamento'] - datas['dt_vencimento']
+    dias_emissao_antes = datas['dt_vencimento'] - datas['dt_emissao']
 
-    # 3. Gerar Novas Datas de Vencimento (Aleatórias no período)
-    dias_totais = (DATA_FIM - DATA_INICIO).days
+    # Novos vencimentos em dias inteiros (o CSV sempre guardou só a data)
+    dias_totais = (data_fim - data_inicio).days
+    inicio = np.datetime64(data_inicio.date(), 'D')
+    novos_vencimentos = inicio + rng.integers(0, dias_totais, size=len(df)).astype('timedelta64[D]')
 
-    # Gera vetor de dias aleatórios
-    random_days = np.random.randint(0, dias_totais, size=len(df))
-
-    # Cria nova série de vencimentos convertendo para datetime64[ns]
-    # Isso é crucial para a soma subsequente funcionar corretamente
-    novos_vencimentos = [DATA_INICIO + timedelta(days=int(d)) for d in random_days]
     df['dt_vencimento'] = pd.to_datetime(novos_vencimentos)
+    df['dt_pagamento'] = df['dt_vencimento'] + dias_para_pagar
+    df['dt_emissao'] = df['dt_vencimento'] - dias_emissao_antes
+    return df
+
+
+def variar_datas_em_blocos(seed=None, chunksize=CHUNK_PADRAO):
+    """
+    Lê o boletos.csv em blocos (via staging Parquet) e devolve cada bloco já com as
+    datas espalhadas (colunas de data como datetime64), sem gravar CSV intermediário.
+    Para a mesma seed (e a mesma âncora da janela), o resultado é idêntico ao do variar_datas_apenas()
+    e não muda de um dia para o outro.
+    """
+    rng = np.random.default_rng(seed)
+    data_inicio, data_fim = janela_datas()
+
+    for bloco in ler_csv_em_blocos(ARQUIVO_ENTRADA, chunksize=chunksize):
+        # Validação de Colunas
+        faltantes = [c for c in COLUNAS_DATAS if c not in bloco.columns]
+        if faltantes:
+            raise ValueError(f"Colunas obrigatórias ausentes: {faltantes}")
+        yield variar_datas_bloco(bloco, rng, data_inicio, data_fim)
+
+
+def _meta_atual(seed):
+    data_inicio, data_fim = janela_datas()
+    return {
+        'hash_entrada': hash_arquivo(os.path.join(DATA_DIR, ARQUIVO_ENTRADA)),
+        'seed': seed,
+        'data_inicio': data_inicio.strftime('%Y-%m-%d'),
+        'data_fim': data_fim.strftime('%Y-%m-%d'),
+    }
+
+
+def _saida_atualizada(meta):
+    if not os.path.exists(os.path.join(DATA_DIR, ARQUIVO_SAIDA)):
+        return False
+    return _ler_meta() == meta
+
+
+def variar_datas_apenas(seed=None, chunksize=CHUNK_PADRAO):
+    """
+    Gera o boletos_datas_variadas.csv. Com seed definida, só regera quando o boletos.csv,
+    a seed ou a janela de datas mudarem; sem seed, sempre regera (resultado aleatório).
+    """
+    arquivo_entrada = os.path.join(DATA_DIR, ARQUIVO_ENTRADA)
+    if not os.path.exists(arquivo_entrada):
+        print(f"❌ Erro na leitura: arquivo não encontrado {arquivo_entrada}")
+        return
 
-    # 4. Recalcular Emissão e Pagamento usando os deltas originais
-    # Pandas gerencia automaticamente a soma de Data + Timedelta
-    df['dt_pagamento'] = df['dt_vencimento'] + df['dias_para_pagar']
-    df['dt_emissao'] = df['dt_vencimento'] - df['dias_emissao_antes']
+    meta = _meta_atual(seed) if seed is not None else None
+    if meta is not None and _saida_atualizada(meta):
+        print(f"✅ {ARQUIVO_SAIDA} já está atualizado (mesma entrada, seed e janela). Nada a fazer.")
+        return
 
-    # 5. Limpeza e Formatação
-    # Remove colunas auxiliares
-    df.drop(columns=['dias_para_pagar', 'dias_emissao_antes'], inplace=True)
+    print(f"📂 Lendo original: {ARQUIVO_ENTRADA}...")
+    arquivo_saida = os.path.join(DATA_DIR, ARQUIVO_SAIDA)
+    temporario = arquivo_saida + '.tmp'
+    total = 0
 
-    # Formata para YYYY-MM-DD (Padrão Banco de Dados)
-    for col in COLUNAS_DATAS:
-        # .dt.strftime converte para string formatada
-        # fillna('') garante que datas nulas (NaT) fiquem vazias no CSV, não 'NaT'
-        df[col] = df[col].dt.strftime('%Y-%m-%d').fillna('')
+    try:
+        for i, bloco in enumerate(variar_datas_em_blocos(seed, chunksize)):
+            # date_format grava só YYYY-MM-DD (Padrão Banco de Dados); NaT vira vazio
+            bloco.to_csv(temporario, sep=',', index=False, header=(i == 0), mode='w' if i == 0 else 'a',
+                         date_format='%Y-%m-%d')
+            total += len(bloco)
+    except Exception as e:
+        print(f"❌ Erro: {e}")
+        if os.path.exists(temporario): os.remove(temporario)
+        return
 
-    # 6. Salvar
     print(f"💾 Salvando {ARQUIVO_SAIDA}...")
-    arquivo_saida = os.path.join(DATA_DIR, ARQUIVO_SAIDA)
+    os.replace(temporario, arquivo_saida)
 
-    # index=False para não criar coluna de índice extra
-    df.to_csv(arquivo_saida, sep=',', index=False)
+    if meta is not None:
+        _gravar_meta(meta)
 
-    print(f"✅ FEITO! As datas dos {len(df)} boletos foram espalhadas entre {DATA_INICIO.year} e {DATA_FIM.year}.")
\ No newline at end of file
+    data_inicio, data_fim = janela_datas()
+    print(f"✅ FEITO! As datas dos {total} boletos foram espalhadas entre {data_inicio:%Y-%m-%d} e {data_fim:%Y-%m-%d}.")
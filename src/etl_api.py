@@ -1,14 +1,53 @@
+import os
 import requests
 import pandas as pd
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from src.db_connection import get_connection
-import random
+from functools import partial
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlsplit
+from src import cache_http, rate_limiter
+from src.rate_limiter import ErroTransitorio
+from src.db_connection import conexao
+from src.db_bulk import executar_em_lotes
+from src.setup_views import atualizar_features_macro
 import time
 
-# Filtrando pelos dados dos últimos dois anos
+# Endereços base das APIs (sobrescrevíveis, ex: servidor stub local em testes)
+URL_BCB = os.getenv('BF_URL_BCB', 'https://api.bcb.gov.br').rstrip('/')
+URL_SIDRA = os.getenv('BF_URL_SIDRA', 'https://apisidra.ibge.gov.br').rstrip('/')
+
+# Coleta concorrente: as séries são buscadas em paralelo, com no máximo
+# CONEXOES_POR_HOST requisições simultâneas no mesmo servidor (BCB / IBGE)
+API_CONCORRENTE = os.getenv('BF_API_CONCORRENTE', '1') == '1'
+CONEXOES_POR_HOST = int(os.getenv('BF_API_CONEXOES_HOST', '3'))
+
+# Validade do cache em disco por tipo de série (segundos): diária muda todo dia útil,
+# mensal/trimestral só quando o órgão publica
+TTL_SERIE_DIARIA = 6 * 3600
+TTL_SERIE_MENSAL = 24 * 3600
+
+# Uma Session (pool de conexões keep-alive) e um semáforo por host
+_sessoes = {}
+_semaforos = {}
+_hosts_lock = threading.Lock()
+
+# Filtrando pelos dados dos últimos dois anos (janela usada quando o indicador ainda não está no banco)
 data_inicial = (pd.to_datetime(datetime.now()) - pd.DateOffset(years=2)).strftime('%d/%m/%Y')
 data_final = datetime.now().strftime('%d/%m/%Y')
 
+# Upsert pela chave natural (indicador, UF, data): só grava o que é novo ou mudou (revisões)
+SQL_MERGE_MACRO = """
+    MERGE INTO T_BF_MACRO_ECONOMIA t
+    USING (SELECT :1 AS sg_uf, :2 AS dt_referencia, :3 AS nm_indicador, :4 AS vl_indicador FROM dual) s
+    ON (t.nm_indicador = s.nm_indicador AND t.sg_uf = s.sg_uf AND t.dt_referencia = s.dt_referencia)
+    WHEN MATCHED THEN UPDATE SET t.vl_indicador = s.vl_indicador
+        WHERE t.vl_indicador <> s.vl_indicador
+    WHEN NOT MATCHED THEN INSERT (sg_uf, dt_referencia, nm_indicador, vl_indicador)
+        VALUES (s.sg_uf, s.dt_referencia, s.nm_indicador, s.vl_indicador)
+"""
+
 # Parâmetros úteis para padronizarmos os nossos dados
 meses_pt = {
     'janeiro': '01', 'fevereiro': '02', 'março': '03', 'abril': '04', 'maio': '05', 'junho': '06',
@@ -27,11 +66,13 @@ mapa_uf = {
         'Sergipe': 'SE', 'Tocantins': 'TO'
 }
 
-def retry_call(fn, *, max_attempts=5, base_sleep=3, jitter=2, fail_msg="Falha após retries"):
+def retry_call(fn, *, max_attempts=5, base_sleep=3, jitter=2, fail_msg="Falha após retries", host="local"):
     """
     Executa uma função com tentativas e backoff.
     - Não deixa o código ficar em loop infinito.
     - Evita 'estado inválido' por falhas transitórias (429, timeout, etc.).
+    - Se o erro trouxer retry_after (Retry-After do servidor), dorme isso (até BACKOFF_MAXIMO);
+      senão, backoff exponencial com jitter (rate_limiter.calcular_backoff).
     """
     last_exc = None
     for attempt in range(1, max_attempts + 1):
@@ -39,39 +80,90 @@ def retry_call(fn, *, max_attempts=5, base_sleep=3, jitter=2, fail_msg="Falha ap
             return fn()
         except Exception as e:
             last_exc = e
-            sleep_s = base_sleep * attempt + random.uniform(0, jitter)
-            print(f"⚠️ Tentativa {attempt}/{max_attempts} falhou: {e} | dormindo {sleep_s:.1f}s")
-            time.sleep(sleep_s)
+            if attempt == max_attempts:
+                break
+            sleep_s = rate_limiter.dormir_backoff(host, attempt, base_sleep, jitter,
+                                                  retry_after=getattr(e, 'retry_after', None))
+            print(f"⚠️ Tentativa {attempt}/{max_attempts} falhou: {e} | dormiu {sleep_s:.1f}s")
 
     raise RuntimeError(f"{fail_msg}. Último erro: {last_exc}")
 
-def get_json_with_retry(url, *, timeout=20, headers=None):
+def _host(url):
+    return urlsplit(url).netloc
+
+
+def _sessao(url):
+    """Session compartilhada do host da URL (reaproveita conexões TCP/TLS entre as séries)."""
+    host = _host(url)
+    with _hosts_lock:
+        if host not in _sessoes:
+            sessao = requests.Session()
+            adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=CONEXOES_POR_HOST)
+            sessao.mount('http://', adaptador)
+            sessao.mount('https://', adaptador)
+            _sessoes[host] = sessao
+            _semaforos[host] = threading.BoundedSemaphore(CONEXOES_POR_HOST)
+        return _sessoes[host], _semaforos[host]
+
+
+def get_json_with_retry(url, *, timeout=20, headers=None, ttl=cache_http.TTL_PADRAO):
     """
     Faz GET e retorna JSON com retry/backoff.
     Trata 429 e falhas temporárias de rede.
+    Passa antes pelo cache em disco (cache_http): dentro do `ttl` não sai requisição;
+    vencido, revalida com ETag/Last-Modified (304 = reaproveita o JSON salvo).
+    Com BF_API_OFFLINE=1 só responde do cache. ttl=0 ignora o cache.
     """
-    headers = headers or {"User-Agent": "Mozilla/5.0"}
+    entrada = cache_http.ler(url) if ttl > 0 else None
+    if entrada is not None and (cache_http.API_OFFLINE or cache_http.valida(entrada, ttl)):
+        cache_http.registrar('hits')
+        return entrada['dados']
+    if cache_http.API_OFFLINE:
+        raise RuntimeError(f"Modo offline e sem cache para: {url}")
 
-    def _do():
-        resp = requests.get(url, timeout=timeout, headers=headers)
+    headers = dict(headers or {"User-Agent": "Mozilla/5.0"})
+    headers.update(cache_http.cabecalhos_condicionais(entrada))
+
+    sessao, semaforo = _sessao(url)
 
+    def _do():
+        # Ficha do token bucket do host, depois o semáforo (só durante a requisição:
+        # o sono do retry não ocupa vaga do host)
+        rate_limiter.aguardar_vez(url)
+        with semaforo:
+            resp = sessao.get(url, timeout=timeout, headers=headers)
+
+        if resp.status_code == 304 and entrada is not None:
+            cache_http.registrar('revalidadas')
+            cache_http.salvar(url, entrada['dados'], resp.headers.get('ETag', entrada.get('etag')),
+                              resp.headers.get('Last-Modified', entrada.get('last_modified')))
+            return entrada['dados']
+
+        # Retry-After vale tanto para 429 quanto para 503; sem ele, fica o backoff exponencial
+        retry_after = rate_limiter.ler_retry_after(resp.headers.get("Retry-After"))
         if resp.status_code == 429:
-            retry_after = resp.headers.get("Retry-After")
-            if retry_after:
-                wait = float(retry_after)
-            else:
-                wait = 15  # fallback
-            raise RuntimeError(f"429 Too Many Requests; retry_after={wait}")
+            rate_limiter.registrar(url, 'throttles')
+            raise ErroTransitorio(f"429 Too Many Requests; retry_after={retry_after}", retry_after)
 
         if 500 <= resp.status_code <= 599:
-            raise RuntimeError(f"{resp.status_code} Server Error")
+            raise ErroTransitorio(f"{resp.status_code} Server Error", retry_after)
 
         resp.raise_for_status()
-        return resp.json()
+        dados = resp.json()
+        cache_http.registrar('baixadas')
+        if ttl > 0:
+            cache_http.salvar(url, dados, resp.headers.get('ETag'), resp.headers.get('Last-Modified'))
+        return dados
+
+    return retry_call(_do, max_attempts=6, base_sleep=2, jitter=1, fail_msg=f"Falha ao consultar: {url}",
+                      host=_host(url))
 
-    return retry_call(_do, max_attempts=6, base_sleep=4, jitter=3, fail_msg=f"Falha ao consultar: {url}")
+def _data_inicial(desde):
+    """Início da consulta no BCB: a última data já gravada (reconsulta o último ponto) ou a janela padrão."""
+    return data_inicial if desde is None else pd.Timestamp(desde).strftime('%d/%m/%Y')
 
-def get_selic():
+
+def get_selic(desde=None):
     """
     Busca a Taxa Selic Diária (Série 11) diretamente do Banco Central.
     Correção: Adicionado filtro de dataInicial para respeitar o limite de 10 anos da API.
@@ -79,11 +171,11 @@ def get_selic():
     print("   🌐 [API] Consultando Selic no Banco Central...")
 
     # URL Oficial com filtro de Data (Obrigatório para séries diárias)
-    url = f"https://api.bcb.gov.br/dados/serie/bcdata.sgs.11/dados?formato=json&dataInicial={data_inicial}&dataFinal={data_final}"
+    url = f"{URL_BCB}/dados/serie/bcdata.sgs.11/dados?formato=json&dataInicial={_data_inicial(desde)}&dataFinal={data_final}"
 
     try:
         # Fazendo a requisição
-        dados = get_json_with_retry(url, timeout=15)
+        dados = get_json_with_retry(url, timeout=15, ttl=TTL_SERIE_DIARIA)
         df_selic = pd.DataFrame(dados)
 
         # Limpeza
@@ -106,7 +198,7 @@ def get_selic():
         return pd.DataFrame()
 
 
-def get_dolar():
+def get_dolar(desde=None):
     """
     Busca a Cotação do Dólar (Série 3698 - Média Mensal) do Banco Central.
     Substitui o arquivo: PTAX.csv
@@ -114,11 +206,11 @@ def get_dolar():
     print("   🌐 [API] Consultando Dólar (PTAX) no Banco Central...")
     # Série 3698 = Dólar (Venda) - Média Mensal
     # URL com filtro de data (usamos o mesmo padrão da Selic)
-    url = f"https://api.bcb.gov.br/dados/serie/bcdata.sgs.3698/dados?formato=json&dataInicial={data_inicial}&dataFinal={data_final}"
+    url = f"{URL_BCB}/dados/serie/bcdata.sgs.3698/dados?formato=json&dataInicial={_data_inicial(desde)}&dataFinal={data_final}"
 
     try:
         # Transferindo dados para o DataFrame
-        dados = get_json_with_retry(url, timeout=15)
+        dados = get_json_with_retry(url, timeout=15, ttl=TTL_SERIE_MENSAL)
         df_ptax = pd.DataFrame(dados)
 
         # Limpeza
@@ -139,7 +231,7 @@ def get_dolar():
         return pd.DataFrame()
 
 
-def get_ipca():
+def get_ipca(desde=None):
     """
     Busca o IPCA Mensal (Série 433) do Banco Central.
     Substitui o arquivo: IPCA.csv
@@ -147,10 +239,10 @@ def get_ipca():
     print("   🌐 [API] Consultando IPCA (Inflação) no Banco Central...")
 
     # Série 433 = IPCA Mensal (%)
-    url = f"https://api.bcb.gov.br/dados/serie/bcdata.sgs.433/dados?formato=json&dataInicial={data_inicial}&dataFinal={data_final}"
+    url = f"{URL_BCB}/dados/serie/bcdata.sgs.433/dados?formato=json&dataInicial={_data_inicial(desde)}&dataFinal={data_final}"
 
     try:
-        dados = get_json_with_retry(url, timeout=15)
+        dados = get_json_with_retry(url, timeout=15, ttl=TTL_SERIE_MENSAL)
 
         df_ipca = pd.DataFrame(dados)
         df_ipca['data'] = pd.to_datetime(df_ipca['data'], format='%d/%m/%Y')
@@ -170,7 +262,7 @@ def get_ipca():
         return pd.DataFrame()
 
 
-def get_ibcbr():
+def get_ibcbr(desde=None):
     """
     Busca o IBC-Br (Série 24363) do Banco Central.
     É a 'Prévia do PIB' mensal. Substitui: IBC_Br.csv
@@ -178,10 +270,10 @@ def get_ibcbr():
     print("   🌐 [API] Consultando IBC-Br (Atividade Econômica)...")
 
     # Série 24363 = IBC-Br com ajuste sazonal
-    url = f"https://api.bcb.gov.br/dados/serie/bcdata.sgs.24363/dados?formato=json&dataInicial={data_inicial}&dataFinal={data_final}"
+    url = f"{URL_BCB}/dados/serie/bcdata.sgs.24363/dados?formato=json&dataInicial={_data_inicial(desde)}&dataFinal={data_final}"
 
     try:
-        dados = get_json_with_retry(url, timeout=15)
+        dados = get_json_with_retry(url, timeout=15, ttl=TTL_SERIE_MENSAL)
 
         df_ibcbr = pd.DataFrame(dados)
         df_ibcbr['data'] = pd.to_datetime(df_ibcbr['data'], format='%d/%m/%Y')
@@ -224,6 +316,7 @@ def get_dados_sidra(tabela, periodo, variavel, classificacao='', nome_indicador=
     Busca dados na API SIDRA do IBGE.
     Parâmetros:
       - tabela: Código da tabela (ex: 8888 para Indústria)
+      - periodo: Quantidade de períodos mais recentes (ex: 34 = últimos 34 meses)
       - variavel: Código da variável (ex: 12606 para Número-índice)
       - classificacao: Filtros extras (ex: '/c544/129314' para Indústria Geral)
       - nome_indicador: Nome para salvar no banco (ex: 'IND_INDUSTRIA')
@@ -232,10 +325,10 @@ def get_dados_sidra(tabela, periodo, variavel, classificacao='', nome_indicador=
 
     # URL da API SIDRA
 
-    url = f"https://apisidra.ibge.gov.br/values/t/{tabela}/p/last%{periodo}/v/{variavel}{classificacao}?formato=json"
+    url = f"{URL_SIDRA}/values/t/{tabela}/p/last%20{periodo}/v/{variavel}{classificacao}?formato=json"
 
     try:
-        data = get_json_with_retry(url, timeout=25, headers={"User-Agent": "Mozilla/5.0"})
+        data = get_json_with_retry(url, timeout=25, headers={"User-Agent": "Mozilla/5.0"}, ttl=TTL_SERIE_MENSAL)
 
         # Se vier vazio ou com erro
         if not isinstance(data, list) or len(data) <= 1:
@@ -273,10 +366,31 @@ def get_dados_sidra(tabela, periodo, variavel, classificacao='', nome_indicador=
         return pd.DataFrame()
 
 
+def ultimas_referencias():
+    """
+    Última dt_referencia já gravada por (indicador, UF). Indicador sem linha no banco
+    (ou banco indisponível) fica de fora e é buscado na janela completa.
+    """
+    with conexao() as conn:
+        if not conn: return {}
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT nm_indicador, sg_uf, MAX(dt_referencia)
+                FROM T_BF_MACRO_ECONOMIA
+                GROUP BY nm_indicador, sg_uf
+            """)
+            return {(indicador, uf): pd.Timestamp(data) for indicador, uf, data in cursor.fetchall()}
+        except Exception as e:
+            print(f"   ⚠️ [API] Não foi possível ler as últimas referências ({e}). Buscando janela completa.")
+            return {}
+
+
 def alimentar_tabela_macro(dfs):
     """
-    Só apaga e regrava a tabela se existir dado novo de verdade.
-    Assim você não zera o banco em dia de API fora / retorno vazio.
+    Upsert (MERGE) pela chave natural (nm_indicador, sg_uf, dt_referencia):
+    linhas novas entram, valores revisados são atualizados e o resto não é tocado.
+    Em dia de API fora / retorno vazio nada é apagado.
     """
     # mantém apenas dfs com linhas
     dfs_validos = [df for df in dfs if df is not None and not df.empty]
@@ -285,52 +399,112 @@ def alimentar_tabela_macro(dfs):
         print("⚠️ [API] Nenhum indicador novo coletado. Mantendo dados atuais no banco.")
         return
 
-    conn = get_connection()
-    if not conn:
-        print("❌ [API] Sem conexão. Não vai atualizar tabela para não causar estado inválido.")
-        return
+    with conexao() as conn:
+        if not conn:
+            print("❌ [API] Sem conexão. Não vai atualizar tabela para não causar estado inválido.")
+            return
 
-    cursor = conn.cursor()
+        try:
+            total_aplicado = 0
+            for i, df in enumerate(dfs_validos):
+                # A mesma chave duas vezes no lote (ex: UFs não mapeadas -> 'ND') vale a última
+                df = df.dropna(subset=['DT_REFERENCIA']).drop_duplicates(
+                    subset=['NM_INDICADOR', 'SG_UF', 'DT_REFERENCIA'], keep='last')
+                aplicadas, erros = executar_em_lotes(conn, SQL_MERGE_MACRO, df, descricao=f"Lote {i + 1}")
+                if erros:
+                    conn.rollback()
+                    print(f"❌ [API] Lote {i + 1} teve {len(erros)} linha(s) rejeitada(s). Rollback executado.")
+                    return
+                total_aplicado += aplicadas
+                print(f"   -> Lote {i + 1} ({df['NM_INDICADOR'].iloc[0]}): {aplicadas} linhas enviadas ao MERGE.")
+
+            conn.commit()
+            print(f"✅ [API] {total_aplicado} indicadores sincronizados com sucesso.")
 
-    sql_insert_macro = """
-        INSERT INTO T_BF_MACRO_ECONOMIA (sg_uf, dt_referencia, nm_indicador, vl_indicador)
-        VALUES (:1, :2, :3, :4)
-    """
+        except Exception as e:
+            conn.rollback()
+            print(f"❌ [API] Erro ao gravar dados macro. Rollback executado: {e}")
+            return
 
-    try:
-        # 1) apaga somente quando sabe que tem reposição
-        cursor.execute("DELETE FROM T_BF_MACRO_ECONOMIA")
+    # Macro mudou: refaz a tabela de features as-of usada pela view de risco
+    atualizar_features_macro()
 
-        total_inserido = 0
-        for i, df in enumerate(dfs_validos):
-            dados = df.values.tolist()
-            cursor.executemany(sql_insert_macro, dados)
-            total_inserido += len(dados)
-            print(f"   -> Lote {i + 1}: {len(dados)} linhas inseridas.")
+def _ultima_data(referencias, indicador):
+    """Data mais antiga entre as últimas de cada UF do indicador (garante que nenhuma UF fique para trás)."""
+    datas = [data for (nome, _), data in referencias.items() if nome == indicador]
+    return min(datas) if datas else None
 
-        conn.commit()
-        print(f"✅ [API] {total_inserido} indicadores carregados com sucesso.")
 
-    except Exception as e:
-        conn.rollback()
-        print(f"❌ [API] Erro ao inserir dados macro. Rollback executado: {e}")
+def _periodos_sidra(referencias, indicador, maximo, meses_por_periodo=1):
+    """
+    Quantos períodos pedir ao SIDRA (`last N`): do último já gravado até hoje, inclusive,
+    para pegar revisões do último ponto. Sem histórico, usa o `maximo` (janela padrão).
+    """
+    ultima = _ultima_data(referencias, indicador)
+    if ultima is None:
+        return maximo
+    hoje = pd.Timestamp.now()
+    meses = (hoje.year - ultima.year) * 12 + (hoje.month - ultima.month)
+    return max(1, min(maximo, meses // meses_por_periodo + 1))
+
+
+# Séries do SIDRA: (tabela, variável, classificação, indicador, máximo de períodos, meses por período)
+SERIES_SIDRA = [
+    (8888, 12606, '/c544/129314/N1/all/N3/all', 'IND_INDUSTRIA', 34, 1),
+    (5906, 7167, '/c11046/56726/N1/all/N3/all', 'IND_SERVICOS', 34, 1),
+    (8880, 7169, '/c11046/56734/N1/all/N3/all', 'IND_VAREJO', 34, 1),
+    (6588, 216, '/C48/0/N3/all', 'IND_AGRO', 34, 1),
+    (1092, 284, '/C12716/115236/N1/all/N3/all', 'IND_PECUARIA', 11, 3),
+    (6381, 4099, '/N1/all', 'TAX_DESEMPREGO', 34, 1),
+]
+
+
+def coletas_api(referencias=None):
+    """
+    Lista das séries a buscar, na ordem em que os lotes vão para o banco.
+    Com `referencias` (ultimas_referencias()), cada série pede só a janela que falta.
+    """
+    referencias = referencias or {}
+    coletas = [
+        partial(get_selic, desde=referencias.get(('SELIC', 'BR'))),
+        partial(get_dolar, desde=referencias.get(('DOLAR', 'BR'))),
+        partial(get_ipca, desde=referencias.get(('IPCA', 'BR'))),
+        partial(get_ibcbr, desde=referencias.get(('IBC-BR', 'BR'))),
+    ]
+    for tabela, variavel, classificacao, indicador, maximo, meses_por_periodo in SERIES_SIDRA:
+        coletas.append(partial(get_dados_sidra, tabela=tabela, variavel=variavel, classificacao=classificacao,
+                               nome_indicador=indicador,
+                               periodo=_periodos_sidra(referencias, indicador, maximo, meses_por_periodo)))
+    return coletas
+
+
+def buscar_indicadores(concorrente=None, referencias=None):
+    """
+    Executa todas as coletas e devolve a lista de DataFrames (mesma ordem de coletas_api()).
+    Em modo concorrente, a latência total fica perto da série mais lenta em vez da soma
+    de todas; o limite por host evita abrir conexões demais no BCB/IBGE.
+    """
+    concorrente = API_CONCORRENTE if concorrente is None else concorrente
+    coletas = coletas_api(referencias)
+    inicio = time.perf_counter()
+
+    if concorrente:
+        with ThreadPoolExecutor(max_workers=len(coletas), thread_name_prefix='api') as executor:
+            dfs = list(executor.map(lambda coleta: coleta(), coletas))
+    else:
+        dfs = [coleta() for coleta in coletas]
+
+    print(f"   ⏱️ [API] {len(coletas)} séries coletadas em {time.perf_counter() - inicio:.1f}s "
+          f"({'concorrente' if concorrente else 'sequencial'}).")
+    cache_http.imprimir_estatisticas_cache()
+    rate_limiter.imprimir_metricas_rate_limit()
+    return dfs
 
-    finally:
-        if conn:
-            conn.close()
 
-def carregar_api():
+def carregar_api(concorrente=None):
     print("\n--- UTILIZANDO API DADOS EXTERNOS ---")
-    # Criando lista vazia para armazenar os dados antes de alimentar as tabelas SQL
-    dfs_finais = []
-    dfs_finais.append(get_selic())
-    dfs_finais.append(get_dolar())
-    dfs_finais.append(get_ipca())
-    dfs_finais.append(get_ibcbr())
-    dfs_finais.append(get_dados_sidra(tabela=8888, periodo = 2034, variavel=12606,classificacao='/c544/129314/N1/all/N3/all', nome_indicador='IND_INDUSTRIA'))
-    dfs_finais.append(get_dados_sidra(tabela=5906, periodo = 2034, variavel=7167, classificacao='/c11046/56726/N1/all/N3/all',nome_indicador='IND_SERVICOS'))
-    dfs_finais.append(get_dados_sidra(tabela=8880, periodo = 2034, variavel=7169,classificacao='/c11046/56734/N1/all/N3/all', nome_indicador='IND_VAREJO'))
-    dfs_finais.append(get_dados_sidra(tabela=6588, periodo = 2034, variavel=216, classificacao='/C48/0/N3/all', nome_indicador='IND_AGRO'))
-    dfs_finais.append(get_dados_sidra(tabela=1092, periodo = 2011, variavel=284, classificacao='/C12716/115236/N1/all/N3/all', nome_indicador='IND_PECUARIA'))
-    dfs_finais.append(get_dados_sidra(tabela=6381, periodo = 2034, variavel=4099, classificacao='/N1/all', nome_indicador='TAX_DESEMPREGO'))
-    alimentar_tabela_macro(dfs_finais)
\ No newline at end of file
+    # Só a janela que falta em cada série (banco vazio = janela completa)
+    referencias = ultimas_referencias()
+    # Coleta tudo antes de alimentar as tabelas SQL (uma única transação no final)
+    dfs_finais = buscar_indicadores(concorrente, referencias)
+    alimentar_tabela_macro(dfs_finais)
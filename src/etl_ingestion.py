@@ -3,101 +3,355 @@ import os
 import pandas as pd
 from datetime import datetime
 from src.utils_paths import resource_path
-from src.db_connection import get_connection
-from src.elt_random_dates import variar_datas_apenas
+from src.db_connection import conexao
+from src.chaves import ids_para_banco
+from src.db_bulk import inserir_dataframe
+from src.elt_random_dates import variar_datas_em_blocos
+from src.setores import setor_por_cnae
+from src.staging import ler_csv, ler_csv_em_blocos
 
 DATA_DIR = resource_path("data")
 
-def carregar_empresas():
-    print("📄 Processando Empresas...")
+# Estado da ingestão incremental (checksum por linha já gravada no banco)
+ESTADO_DIR = resource_path("cache")
+ARQUIVO_ESTADO_EMPRESAS = os.path.join(ESTADO_DIR, 'estado_empresas.npz')
+ARQUIVO_ESTADO_BOLETOS = os.path.join(ESTADO_DIR, 'estado_boletos.npz')
+
+MODOS_INGESTAO = ('completo', 'incremental')
+
+# Espalha as datas dos boletos (dados de demonstração) direto na ingestão, sem CSV intermediário.
+# A janela é ancorada (elt_random_dates.janela_datas) e a seed é fixa: as mesmas linhas saem com as
+# mesmas datas todo dia, e o incremental só vê o que mudou no boletos.csv.
+# Em produção, use BF_VARIAR_DATAS=0 para não alterar o histórico (lê o boletos_datas_variadas.csv).
+VARIAR_DATAS = os.getenv('BF_VARIAR_DATAS', '1') == '1'
+SEED_DATAS = 42
+
+# Streaming: linhas lidas do CSV por bloco e linhas por lote enviado ao banco
+CHUNK_LEITURA = int(os.getenv('BF_INGESTAO_CHUNK', '100000'))
+BATCH_EXECUTEMANY = int(os.getenv('BF_INGESTAO_BATCH', '5000'))
+
+COLUNAS_CSV_BOLETO = ['id_boleto', 'id_pagador', 'id_beneficiario', 'dt_emissao', 'dt_vencimento', 'dt_pagamento',
+                      'vlr_nominal', 'vlr_baixa', 'tipo_baixa']
+COLUNAS_BOLETO = ['id_boleto', 'id_pagador', 'id_beneficiario', 'vlr_nominal', 'vlr_baixa', 'dt_emissao',
+                  'dt_vencimento', 'dt_pagamento', 'tipo_baixa', 'dias_atraso', 'alvo_inadimplencia']
+
+# Ids em hex no CSV/pandas; ids_para_banco() converte no envio se as chaves forem RAW(32)
+IDS_EMPRESA = ['id_cnpj']
+IDS_BOLETO = ['id_boleto', 'id_pagador', 'id_beneficiario']
+
+# Colunas das tabelas no banco, na mesma ordem das colunas dos DataFrames
+COLUNAS_TABELA_EMPRESA = ['id_empresa', 'cd_cnae', 'sg_uf', 'vl_score_materialidade', 'vl_score_quantidade',
+                          'ds_setor', 'vl_setor_macro']
+COLUNAS_TABELA_BOLETO = ['id_boleto', 'id_pagador', 'id_beneficiario', 'vl_nominal', 'vl_baixa', 'dt_emissao',
+                         'dt_vencimento', 'dt_pagamento', 'tp_baixa', 'nr_dias_atraso', 'vl_inadimplencia']
+
+SQL_MERGE_EMPRESA = """
+    MERGE INTO T_BF_EMPRESA t
+    USING T_BF_STG_EMPRESA s
+    ON (t.id_empresa = s.id_empresa)
+    WHEN MATCHED THEN UPDATE SET
+        t.cd_cnae = s.cd_cnae,
+        t.sg_uf = s.sg_uf,
+        t.vl_score_materialidade = s.vl_score_materialidade,
+        t.vl_score_quantidade = s.vl_score_quantidade,
+        t.ds_setor = s.ds_setor,
+        t.vl_setor_macro = s.vl_setor_macro
+    WHEN NOT MATCHED THEN INSERT (id_empresa, cd_cnae, sg_uf, vl_score_materialidade, vl_score_quantidade,
+                                  ds_setor, vl_setor_macro)
+        VALUES (s.id_empresa, s.cd_cnae, s.sg_uf, s.vl_score_materialidade, s.vl_score_quantidade,
+                s.ds_setor, s.vl_setor_macro)
+"""
+
+SQL_MERGE_BOLETO = """
+    MERGE INTO T_BF_BOLETO t
+    USING T_BF_STG_BOLETO s
+    ON (t.id_boleto = s.id_boleto)
+    WHEN MATCHED THEN UPDATE SET
+        t.id_pagador = s.id_pagador,
+        t.id_beneficiario = s.id_beneficiario,
+        t.vl_nominal = s.vl_nominal,
+        t.vl_baixa = s.vl_baixa,
+        t.dt_emissao = s.dt_emissao,
+        t.dt_vencimento = s.dt_vencimento,
+        t.dt_pagamento = s.dt_pagamento,
+        t.tp_baixa = s.tp_baixa,
+        t.nr_dias_atraso = s.nr_dias_atraso,
+        t.vl_inadimplencia = s.vl_inadimplencia
+    WHEN NOT MATCHED THEN INSERT (id_boleto, id_pagador, id_beneficiario, vl_nominal, vl_baixa, dt_emissao,
+                                  dt_vencimento, dt_pagamento, tp_baixa, nr_dias_atraso, vl_inadimplencia)
+        VALUES (s.id_boleto, s.id_pagador, s.id_beneficiario, s.vl_nominal, s.vl_baixa, s.dt_emissao,
+                s.dt_vencimento, s.dt_pagamento, s.tp_baixa, s.nr_dias_atraso, s.vl_inadimplencia)
+"""
+
+
+# ==============================================================================
+# HIGH-WATER MARK (checksum por linha)
+# ==============================================================================
+def calcular_checksums(df):
+    """
+    Checksum (uint64) de cada linha, considerando TODAS as colunas gravadas no banco
+    (inclusive a chave). Linha nova ou alterada => checksum que não existia antes.
+    """
+    return pd.util.hash_pandas_object(df, index=False).to_numpy(dtype=np.uint64)
+
+
+def _ler_estado(arquivo):
+    if not os.path.exists(arquivo):
+        return None
+    try:
+        with np.load(arquivo) as estado:
+            return estado['checksums'], int(estado['total'])
+    except Exception as e:
+        print(f"      ⚠️ Estado incremental ilegível ({e}). Recarregando tudo.")
+        return None
+
+
+def _salvar_estado(arquivo, checksums, total):
+    os.makedirs(ESTADO_DIR, exist_ok=True)
+    temporario = arquivo + '.tmp.npz'
+    np.savez(temporario, checksums=np.unique(checksums), total=total)
+    os.replace(temporario, arquivo)
+
+
+def _checksums_anteriores(arquivo_estado, total_banco):
+    """
+    Checksums da última carga, ou None se não houver estado válido.
+    Se o banco não tiver o mesmo número de linhas registrado no estado
+    (ex: tabelas recriadas), o estado é descartado e tudo vira delta.
+    """
+    estado = _ler_estado(arquivo_estado)
+    if estado is None:
+        return None
+    checksums_anteriores, total_anterior = estado
+    if total_anterior != total_banco:
+        print(f"      ℹ️ Banco com {total_banco} linhas, estado esperava {total_anterior}. Reconciliando tudo.")
+        return None
+    return checksums_anteriores
+
+
+def _posicoes_delta(checksums, checksums_anteriores):
+    """Posições das linhas novas/alteradas desde a última carga (todas, se não houver estado)."""
+    if checksums_anteriores is None:
+        return np.arange(len(checksums))
+    return np.flatnonzero(~np.isin(checksums, checksums_anteriores))
+
+
+def _contar_linhas(cursor, tabela):
+    cursor.execute(f"SELECT COUNT(*) FROM {tabela}")
+    return cursor.fetchone()[0]
+
+
+def _aplicar_merge(conn, df_delta, tabela_stage, colunas, sql_merge):
+    """Sobe o delta para a tabela de staging (GTT) e aplica um único MERGE."""
+    _, erros = inserir_dataframe(conn, tabela_stage, colunas, df_delta, batch_size=BATCH_EXECUTEMANY, direto=False)
+    cursor = conn.cursor()
+    cursor.execute(sql_merge)
+    return cursor.rowcount, erros
+
+
+def _sem_rejeitadas(checksums, enviados, erros):
+    """
+    Linhas rejeitadas pelo banco não entram no estado: serão tentadas de novo na próxima carga.
+    `enviados` são as posições (em checksums) das linhas enviadas; os offsets dos erros são relativos a elas.
+    """
+    if not erros:
+        return checksums
+    return np.delete(checksums, enviados[[offset for offset, _ in erros]])
+
+
+def carregar_empresas(modo='completo'):
+    print(f"📄 Processando Empresas (modo {modo})...")
     arquivo = os.path.join(DATA_DIR, 'empresas.csv')
 
     if not os.path.exists(arquivo):
         print(f"      ⚠️ Arquivo não encontrado: {arquivo}")
         return
 
-    df_empresas = pd.read_csv(arquivo)
+    # Staging Parquet: só as colunas usadas, sem reprocessar o CSV a cada execução
+    df_empresas = ler_csv('empresas.csv', colunas=['id_cnpj', 'cd_cnae_prin', 'uf', 'score_materialidade_v2',
+                                                   'score_quantidade_v2'])
 
     # Tratamento CNAE e UF
     df_empresas["cd_cnae_prin"] = df_empresas["cd_cnae_prin"].fillna(0).astype(float).astype(int).astype(str).str.zfill(
         7)
-    df_empresas["uf"] = df_empresas["uf"].fillna("ND").str.strip().str.upper()
+    df_empresas["uf"] = df_empresas["uf"].astype(object).fillna("ND").str.strip().str.upper()
     df_empresas["score_quantidade_v2"] = df_empresas["score_quantidade_v2"].fillna(0.0)
     df_empresas["score_materialidade_v2"] = df_empresas["score_materialidade_v2"].fillna(0.0)
 
-    df_empresas = df_empresas.where(pd.notnull(df_empresas), None)
-    dados_empresas = df_empresas[
-        ['id_cnpj', 'cd_cnae_prin', 'uf', 'score_materialidade_v2', 'score_quantidade_v2']].values.tolist()
+    # Setor pela divisão CNAE (src/setores.py): calculado uma vez aqui, as views só leem a coluna
+    df_empresas["vl_setor_macro"], df_empresas["ds_setor"] = setor_por_cnae(df_empresas["cd_cnae_prin"])
 
-    conn = get_connection()
-    if not conn: return
-    cursor = conn.cursor()
+    df_empresas = df_empresas[['id_cnpj', 'cd_cnae_prin', 'uf', 'score_materialidade_v2', 'score_quantidade_v2',
+                               'ds_setor', 'vl_setor_macro']]
+    checksums = calcular_checksums(df_empresas)
 
-    try:
-        cursor.execute("DELETE FROM T_BF_BOLETO")  # Limpa filhos primeiro
-        cursor.execute("DELETE FROM T_BF_EMPRESA")
+    if modo == 'incremental':
+        _carregar_empresas_incremental(df_empresas, checksums)
+        return
 
-        sql = "INSERT INTO T_BF_EMPRESA (id_empresa, cd_cnae, sg_uf, vl_score_materialidade, vl_score_quantidade) VALUES (:1, :2, :3, :4, :5)"
-        cursor.executemany(sql, dados_empresas)
-        conn.commit()
-        print(f"      ✅ {len(dados_empresas)} empresas inseridas.")
-    except Exception as e:
-        conn.rollback()
-        print(f"      ❌ Erro ao inserir empresas: {e}")
-    finally:
-        conn.close()
+    with conexao() as conn:
+        if not conn: return
+        cursor = conn.cursor()
 
+        try:
+            cursor.execute("DELETE FROM T_BF_BOLETO")  # Limpa filhos primeiro
+            cursor.execute("DELETE FROM T_BF_EMPRESA")
 
-def carregar_boletos():
-    print("📄 Processando Boletos...")
-    # Em produção, comente a linha abaixo para não alterar o histórico
-    variar_datas_apenas(seed=42)
+            gravadas, erros = inserir_dataframe(conn, "T_BF_EMPRESA", COLUNAS_TABELA_EMPRESA,
+                                                ids_para_banco(df_empresas, IDS_EMPRESA), batch_size=BATCH_EXECUTEMANY)
+            conn.commit()
+            _salvar_estado(ARQUIVO_ESTADO_EMPRESAS, _sem_rejeitadas(checksums, np.arange(len(checksums)), erros),
+                           gravadas)
+            # A carga completa apagou os boletos: o estado deles não vale mais
+            if os.path.exists(ARQUIVO_ESTADO_BOLETOS): os.remove(ARQUIVO_ESTADO_BOLETOS)
+            print(f"      ✅ {gravadas} empresas inseridas.")
+        except Exception as e:
+            conn.rollback()
+            print(f"      ❌ Erro ao inserir empresas: {e}")
 
-    arquivo = os.path.join(DATA_DIR, 'boletos_datas_variadas.csv')
-    if not os.path.exists(arquivo): return
 
-    df_boletos = pd.read_csv(arquivo)
+def _carregar_empresas_incremental(df_empresas, checksums):
+    with conexao() as conn:
+        if not conn: return
+        try:
+            cursor = conn.cursor()
+            anteriores = _checksums_anteriores(ARQUIVO_ESTADO_EMPRESAS, _contar_linhas(cursor, "T_BF_EMPRESA"))
+            enviados = _posicoes_delta(checksums, anteriores)
+            if len(enviados) == 0:
+                print("      ✅ Nenhuma empresa nova ou alterada.")
+                return
+
+            total_merge, erros = _aplicar_merge(conn, ids_para_banco(df_empresas.iloc[enviados], IDS_EMPRESA),
+                                                "T_BF_STG_EMPRESA", COLUNAS_TABELA_EMPRESA, SQL_MERGE_EMPRESA)
+            total_banco = _contar_linhas(cursor, "T_BF_EMPRESA")
+            conn.commit()
+            _salvar_estado(ARQUIVO_ESTADO_EMPRESAS, _sem_rejeitadas(checksums, enviados, erros), total_banco)
+            print(f"      ✅ {total_merge} empresas novas/alteradas aplicadas via MERGE (de {len(df_empresas)}).")
+        except Exception as e:
+            conn.rollback()
+            print(f"      ❌ Erro no MERGE de empresas: {e}")
+
+
+def calcular_alvo_inadimplencia(df_boletos, data_referencia=None):
+    """
+    Regra de negócio do alvo, 100% vetorizada:
+      - dias_atraso = dt_pagamento - dt_vencimento (se não pago, usa a data de referência)
+      - atrasos negativos (pagou adiantado) viram 0
+      - alvo_inadimplencia = 1 se dias_atraso > 0
+    `data_referencia` substitui o "hoje" (default: agora) para reprocessamentos determinísticos.
+    Retorna o próprio DataFrame com dias_atraso (int32) e alvo_inadimplencia (int8).
+    """
+    data_referencia = pd.Timestamp.now() if data_referencia is None else pd.Timestamp(data_referencia)
+
+    fim = df_boletos["dt_pagamento"].fillna(data_referencia)
+    dias = (fim - df_boletos["dt_vencimento"]).dt.days.to_numpy(dtype=np.float64, na_value=0)
+    dias_atraso = np.clip(dias, 0, None).astype(np.int32)
+
+    df_boletos["dias_atraso"] = dias_atraso
+    df_boletos["alvo_inadimplencia"] = (dias_atraso > 0).astype(np.int8)
+    return df_boletos
+
 
+def _preparar_boletos(df_boletos, data_referencia):
+    """Tratamento de um bloco de boletos: datas, alvo de inadimplência e colunas do banco."""
     # Datas
     for col in ["dt_emissao", "dt_vencimento", "dt_pagamento"]:
         df_boletos[col] = pd.to_datetime(df_boletos[col], format='%Y-%m-%d', errors="coerce")
 
-    df_boletos = df_boletos.dropna(subset=["dt_vencimento"])
+    df_boletos = df_boletos.dropna(subset=["dt_vencimento"]).copy()
 
-    # Cálculo Atraso
-    hoje = pd.Timestamp.now()
-    df_boletos["dias_atraso"] = (df_boletos["dt_pagamento"] - df_boletos["dt_vencimento"]).dt.days
-    # Se dt_pagamento for NaT, calcula com HOJE
-    mask_nat = df_boletos["dt_pagamento"].isna()
-    df_boletos.loc[mask_nat, "dias_atraso"] = (hoje - df_boletos.loc[mask_nat, "dt_vencimento"]).dt.days
+    df_boletos = calcular_alvo_inadimplencia(df_boletos, data_referencia)
+    df_boletos["vlr_baixa"] = df_boletos["vlr_baixa"].fillna(0.0)
+    df_boletos["tipo_baixa"] = df_boletos["tipo_baixa"].astype(object).fillna("Não pago")
 
-    # Remove atrasos negativos (pagou adiantado = 0 atraso)
-    df_boletos["dias_atraso"] = df_boletos["dias_atraso"].fillna(0).apply(lambda x: 0 if x < 0 else x).astype(int)
+    return df_boletos[COLUNAS_BOLETO]
 
-    df_boletos["alvo_inadimplencia"] = np.where(df_boletos["dias_atraso"] > 0, 1, 0)
-    df_boletos["vlr_baixa"] = df_boletos["vlr_baixa"].fillna(0.0)
-    df_boletos["tipo_baixa"] = df_boletos["tipo_baixa"].fillna("Não pago")
 
-    df_boletos = df_boletos.where(pd.notnull(df_boletos), None)
+def ler_boletos_em_blocos(chunksize=CHUNK_LEITURA, data_referencia=None, variar_datas=False):
+    """
+    Gera blocos já tratados de boletos (via staging Parquet), no máximo `chunksize` linhas por vez.
+    Com variar_datas=True, os blocos vêm do boletos.csv já com as datas espalhadas; senão,
+    do boletos_datas_variadas.csv. A data de referência é fixada uma única vez para que
+    todos os blocos usem o mesmo "hoje".
+    """
+    data_referencia = pd.Timestamp.now() if data_referencia is None else pd.Timestamp(data_referencia)
+    if variar_datas:
+        leitor = (bloco[COLUNAS_CSV_BOLETO] for bloco in variar_datas_em_blocos(seed=SEED_DATAS, chunksize=chunksize))
+    else:
+        leitor = ler_csv_em_blocos('boletos_datas_variadas.csv', colunas=COLUNAS_CSV_BOLETO, chunksize=chunksize)
+    for bloco in leitor:
+        yield _preparar_boletos(bloco, data_referencia)
 
-    colunas = ['id_boleto', 'id_pagador', 'id_beneficiario', 'vlr_nominal', 'vlr_baixa', 'dt_emissao', 'dt_vencimento',
-               'dt_pagamento', 'tipo_baixa', 'dias_atraso', 'alvo_inadimplencia']
-    dados = df_boletos[colunas].values.tolist()
 
-    conn = get_connection()
-    if not conn: return
-    try:
-        cursor = conn.cursor()
-        sql = "INSERT INTO T_BF_BOLETO (id_boleto, id_pagador, id_beneficiario, vl_nominal, vl_baixa, dt_emissao, dt_vencimento, dt_pagamento, tp_baixa, nr_dias_atraso, vl_inadimplencia) VALUES (:1, :2, :3, :4, :5, :6, :7, :8, :9, :10, :11)"
-        cursor.executemany(sql, dados)
-        conn.commit()
-        print(f"      ✅ {len(dados)} boletos inseridos.")
-    except Exception as e:
-        print(f"      ❌ Erro boletos: {e}")
-    finally:
-        conn.close()
+def carregar_boletos(modo='completo', chunksize=CHUNK_LEITURA, batch_size=BATCH_EXECUTEMANY, data_referencia=None):
+    """
+    Ingestão em streaming: cada bloco de `chunksize` linhas é lido, tratado e enviado
+    em lotes de `batch_size` antes do próximo ser lido, então o pico de memória não
+    depende do tamanho do arquivo (fica só o vetor de checksums, 8 bytes por boleto).
+    `data_referencia` fixa o "hoje" do cálculo de atraso (reprocessamento determinístico).
+    """
+    print(f"📄 Processando Boletos (modo {modo}, blocos de {chunksize} / lotes de {batch_size})...")
+    arquivo = os.path.join(DATA_DIR, 'boletos_datas_variadas.csv')
+    if not VARIAR_DATAS and not os.path.exists(arquivo): return
+
+    incremental = modo == 'incremental'
+    tabela_destino = "T_BF_STG_BOLETO" if incremental else "T_BF_BOLETO"
+
+    with conexao() as conn:
+        if not conn: return
+        try:
+            cursor = conn.cursor()
+            anteriores = None
+            if incremental:
+                anteriores = _checksums_anteriores(ARQUIVO_ESTADO_BOLETOS, _contar_linhas(cursor, "T_BF_BOLETO"))
+
+            checksums = []
+            total_lido = 0
+            total_enviado = 0
+            for bloco in ler_boletos_em_blocos(chunksize, data_referencia, variar_datas=VARIAR_DATAS):
+                checksums_bloco = calcular_checksums(bloco)
+                total_lido += len(bloco)
+
+                enviados = np.arange(len(bloco))
+                if incremental:
+                    enviados = _posicoes_delta(checksums_bloco, anteriores)
+                    bloco = bloco.iloc[enviados]
+
+                # Staging é GTT: carga em caminho direto só na tabela final
+                gravados, erros = inserir_dataframe(conn, tabela_destino, COLUNAS_TABELA_BOLETO,
+                                                    ids_para_banco(bloco, IDS_BOLETO),
+                                                    batch_size=batch_size, direto=False if incremental else None)
+                total_enviado += gravados
+                checksums.append(_sem_rejeitadas(checksums_bloco, enviados, erros))
+
+            checksums = np.concatenate(checksums) if checksums else np.array([], dtype=np.uint64)
+
+            if incremental:
+                if total_enviado == 0:
+                    print("      ✅ Nenhum boleto novo ou alterado.")
+                    return
+                cursor.execute(SQL_MERGE_BOLETO)
+                total_merge = cursor.rowcount
+                total_banco = _contar_linhas(cursor, "T_BF_BOLETO")
+                conn.commit()
+                _salvar_estado(ARQUIVO_ESTADO_BOLETOS, checksums, total_banco)
+                print(f"      ✅ {total_merge} boletos novos/alterados aplicados via MERGE (de {total_lido}).")
+            else:
+                conn.commit()
+                _salvar_estado(ARQUIVO_ESTADO_BOLETOS, checksums, total_enviado)
+                print(f"      ✅ {total_enviado} boletos inseridos.")
+        except Exception as e:
+            conn.rollback()
+            print(f"      ❌ Erro boletos: {e}")
 
 
-def carregar_dados():
-    carregar_empresas()
-    carregar_boletos()
\ No newline at end of file
+def carregar_dados(modo='completo'):
+    """
+    modo='completo': apaga e recarrega empresas e boletos (comportamento original).
+    modo='incremental': aplica via MERGE apenas as linhas novas/alteradas desde a última carga,
+    preservando predições e clusters já gravados.
+    """
+    if modo not in MODOS_INGESTAO:
+        raise ValueError(f"Modo de ingestão inválido: {modo}. Use: {' | '.join(MODOS_INGESTAO)}")
+    carregar_empresas(modo)
+    carregar_boletos(modo)
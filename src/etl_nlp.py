@@ -4,11 +4,18 @@ import random
 import time
 import dateparser
 import sys
+import threading
 import tqdm
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
 from datetime import datetime, timedelta
+from functools import partial
 from duckduckgo_search import DDGS
-from pysentimiento import create_analyzer
-from src.db_connection import get_connection
+from src import rate_limiter
+from src.cache_sentimento import CACHE_ATIVO, CacheSentimento, hash_titulo, normalizar_titulo
+from src.db_connection import conexao
+from src.sentiment_backends import BACKEND_SENTIMENTO, criar_backend, versao_backend
+from src.setup_views import atualizar_sentimento_diario
 
 
 # ==============================================================================
@@ -18,27 +25,80 @@ class SuppressStderr:
     """
     Context Manager que desvia a saída de erro (stderr) para o limbo (devnull).
     Isso impede que bibliotecas imprimam avisos vermelhos no console.
+    Seguro entre threads: o stderr é trocado na primeira entrada e só volta na última saída.
     """
+    _lock = threading.Lock()
+    _ativos = 0
+    _original = None
 
     def __enter__(self):
-        self.err = sys.stderr
-        sys.stderr = open(os.devnull, 'w')
+        with SuppressStderr._lock:
+            if SuppressStderr._ativos == 0:
+                SuppressStderr._original = sys.stderr
+                sys.stderr = open(os.devnull, 'w')
+            SuppressStderr._ativos += 1
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
-        sys.stderr.close()
-        sys.stderr = self.err
+        with SuppressStderr._lock:
+            SuppressStderr._ativos -= 1
+            if SuppressStderr._ativos == 0:
+                sys.stderr.close()
+                sys.stderr = SuppressStderr._original
 
 
 # CONFIGURAÇÕES
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Host usado no rate limiter compartilhado (rate_limiter.LIMITES_HOST) para as buscas DDG
+HOST_DDG = 'duckduckgo.com'
+# Endereço base do Google News (sobrescrevível, ex: servidor RSS falso do benchmark_coleta_noticias)
+URL_GOOGLE_NEWS = os.getenv('BF_URL_GOOGLE_NEWS', 'https://news.google.com').rstrip('/')
+
+# Coleta concorrente: feeds e termos da busca histórica em um pool pequeno de threads.
+# O ritmo por host continua com o rate_limiter (os workers só sobrepõem a latência das requisições).
+NOTICIAS_CONCORRENTE = os.getenv('BF_NOTICIAS_CONCORRENTE', '1') == '1'
+NOTICIAS_WORKERS = int(os.getenv('BF_NOTICIAS_WORKERS', '3'))
+
+# Carga na T_BF_NOTICIAS: 'incremental' acrescenta só manchetes novas (chave cd_hash = hash do título
+# normalizado) e mantém o histórico; 'completo' apaga a tabela e grava a coleta atual.
+# ds_modelo guarda quem pontuou a linha: no incremental, manchete já gravada por outro backend
+# (ou por outra versão dele) é repontuada e atualizada
+MODOS_NOTICIAS = ('completo', 'incremental')
+MODO_NOTICIAS = os.getenv('BF_NOTICIAS_MODO', 'incremental')
+# Hashes por consulta na checagem das manchetes já gravadas (limite de 1000 itens no IN do Oracle)
+LOTE_HASHES = 500
+
+SQL_INSERT_NOTICIA = """
+    INSERT INTO T_BF_NOTICIAS (cd_hash, ds_setor, tx_titulo, vl_sentimento, dt_publicacao, tx_link, ds_modelo)
+    VALUES (:1, :2, :3, :4, :5, :6, :7)
+"""
+# Hash novo: insere (outra carga pode ter gravado a manchete nesse meio tempo).
+# Hash já gravado por outro modelo: troca só o score e o modelo (DECODE: NULL conta como diferente).
+SQL_MERGE_NOTICIA = """
+    MERGE INTO T_BF_NOTICIAS t
+    USING (SELECT :1 AS cd_hash, :2 AS ds_setor, :3 AS tx_titulo, :4 AS vl_sentimento,
+                  :5 AS dt_publicacao, :6 AS tx_link, :7 AS ds_modelo FROM dual) s
+    ON (t.cd_hash = s.cd_hash)
+    WHEN MATCHED THEN UPDATE SET t.vl_sentimento = s.vl_sentimento, t.ds_modelo = s.ds_modelo
+        WHERE DECODE(t.ds_modelo, s.ds_modelo, 0, 1) = 1
+    WHEN NOT MATCHED THEN INSERT (cd_hash, ds_setor, tx_titulo, vl_sentimento, dt_publicacao, tx_link, ds_modelo)
+        VALUES (s.cd_hash, s.ds_setor, s.tx_titulo, s.vl_sentimento, s.dt_publicacao, s.tx_link, s.ds_modelo)
+"""
+
+# Inferência em lotes: títulos por forward pass (backend e threads do PyTorch em sentiment_backends)
+NLP_BATCH = int(os.getenv('BF_NLP_BATCH', '32'))
+
+# Analyzer único por processo: carregar o BERT leva segundos e não muda entre execuções.
+# torch/pysentimiento só são importados ao criar o backend (quem não pontua notícia não paga por eles).
+_analyzer = None
+_lock_analyzer = threading.Lock()
 
 TOPICOS_RSS = {
-    'AGRO': 'https://news.google.com/rss/search?q=agroneg%C3%B3cio+brasil+safra&hl=pt-BR&gl=BR&ceid=BR:pt-419',
-    'INDUSTRIA': 'https://news.google.com/rss/search?q=ind%C3%BAstria+brasil+desempenho&hl=pt-BR&gl=BR&ceid=BR:pt-419',
-    'VAREJO': 'https://news.google.com/rss/search?q=varejo+vendas+brasil+economia&hl=pt-BR&gl=BR&ceid=BR:pt-419',
-    'SERVICOS': 'https://news.google.com/rss/search?q=setor+servi%C3%A7os+crescimento+brasil&hl=pt-BR&gl=BR&ceid=BR:pt-419',
-    'MERCADO': 'https://news.google.com/rss/search?q=mercado+financeiro+ibovespa+dolar&hl=pt-BR&gl=BR&ceid=BR:pt-419'
+    'AGRO': f'{URL_GOOGLE_NEWS}/rss/search?q=agroneg%C3%B3cio+brasil+safra&hl=pt-BR&gl=BR&ceid=BR:pt-419',
+    'INDUSTRIA': f'{URL_GOOGLE_NEWS}/rss/search?q=ind%C3%BAstria+brasil+desempenho&hl=pt-BR&gl=BR&ceid=BR:pt-419',
+    'VAREJO': f'{URL_GOOGLE_NEWS}/rss/search?q=varejo+vendas+brasil+economia&hl=pt-BR&gl=BR&ceid=BR:pt-419',
+    'SERVICOS': f'{URL_GOOGLE_NEWS}/rss/search?q=setor+servi%C3%A7os+crescimento+brasil&hl=pt-BR&gl=BR&ceid=BR:pt-419',
+    'MERCADO': f'{URL_GOOGLE_NEWS}/rss/search?q=mercado+financeiro+ibovespa+dolar&hl=pt-BR&gl=BR&ceid=BR:pt-419'
 }
 
 TERMOS_HISTORICO = {
@@ -62,15 +122,105 @@ def validar_fonte_por_texto(texto):
     return False
 
 
+def _score(resultado):
+    probs = resultado.probas
+    return round(probs.get('POS', 0) - probs.get('NEG', 0), 4)
+
+
 def analisar_sentimento(texto, analyzer):
+    """Score do título; None se a inferência falhar (não vai para o cache nem para o banco)."""
     if not texto or len(texto) < 5: return 0.0
     try:
-        resultado = analyzer.predict(texto)
-        probs = resultado.probas
-        score = probs.get('POS', 0) - probs.get('NEG', 0)
-        return round(score, 4)
-    except:
-        return 0.0
+        return _score(analyzer.predict(texto))
+    except Exception as e:
+        print(f"   ⚠️ Falha ao pontuar '{str(texto)[:60]}': {e}")
+        return None
+
+
+def analisar_sentimentos(textos, analyzer, batch_size=None):
+    """
+    Scores de uma lista de títulos, na mesma ordem, com um forward pass por mini-lote.
+    Os títulos são ordenados por tamanho antes de fatiar: cada lote é preenchido (padding)
+    só até o maior título dele. Se um lote falhar, seus títulos são pontuados um a um
+    (None nos que falharem de novo).
+    """
+    batch_size = batch_size or NLP_BATCH
+    scores = [0.0] * len(textos)
+    validos = sorted((i for i, t in enumerate(textos) if t and len(t) >= 5), key=lambda i: len(textos[i]))
+
+    for inicio in range(0, len(validos), batch_size):
+        lote = validos[inicio:inicio + batch_size]
+        try:
+            resultados = analyzer.predict([textos[i] for i in lote])
+            for i, resultado in zip(lote, resultados):
+                scores[i] = _score(resultado)
+        except Exception:
+            for i in lote:
+                scores[i] = analisar_sentimento(textos[i], analyzer)
+    return scores
+
+
+def deduplicar_noticias(noticias):
+    """Remove títulos repetidos (RSS e busca histórica trazem a mesma manchete); fica a primeira."""
+    vistos = set()
+    unicas = []
+    for noticia in noticias:
+        chave = normalizar_titulo(noticia[1])
+        if chave in vistos: continue
+        vistos.add(chave)
+        unicas.append(noticia)
+    return unicas
+
+
+def versao_modelo():
+    """Identifica o modelo de sentimento: trocar de backend ou atualizar o pysentimiento invalida o cache."""
+    return versao_backend()
+
+
+def obter_analyzer():
+    """Devolve o analyzer do processo, carregando na primeira chamada (ou esperando o aquecimento em curso)."""
+    global _analyzer
+    with _lock_analyzer:
+        if _analyzer is None:
+            inicio = time.perf_counter()
+            _analyzer = criar_backend()
+            print(f"   🤖 Modelo de sentimento ({BACKEND_SENTIMENTO}) carregado em {time.perf_counter() - inicio:.1f}s.")
+    return _analyzer
+
+
+def aquecer_modelo():
+    """Carrega o modelo antes de ser preciso (chamado numa thread em segundo plano pelo main)."""
+    try:
+        obter_analyzer()
+    except Exception as e:
+        print(f"   ⚠️ Aquecimento do modelo falhou (será tentado de novo no ETL): {e}")
+
+
+def pontuar_noticias(noticias, obter_analyzer, batch_size=None, cache=None):
+    """
+    (setor, titulo, data, link) -> (setor, titulo, score, data, link), no formato da T_BF_NOTICIAS.
+    Com cache, só os títulos ausentes vão para o modelo, e o modelo só é carregado
+    (obter_analyzer()) se faltar algum. Score None = inferência falhou (fica fora do cache).
+    """
+    titulos = [titulo for _, titulo, _, _ in noticias]
+    scores = cache.buscar(titulos) if cache else [None] * len(titulos)
+    faltando = [i for i, score in enumerate(scores) if score is None]
+
+    if faltando:
+        analyzer = obter_analyzer()
+        inicio = time.perf_counter()
+        novos = analisar_sentimentos([titulos[i] for i in faltando], analyzer, batch_size)
+        duracao = time.perf_counter() - inicio
+        print(f"   🧠 {len(faltando)} títulos pontuados em {duracao:.1f}s "
+              f"({len(faltando) / max(duracao, 1e-9):.0f}/s, lotes de {batch_size or NLP_BATCH}).")
+        for i, score in zip(faltando, novos):
+            scores[i] = score
+        if cache:
+            cache.salvar([titulos[i] for i in faltando], novos)
+
+    if cache:
+        cache.imprimir_estatisticas()
+    return [(setor, titulo, score, data, link) for (setor, titulo, data, link), score in zip(noticias, scores)]
 
 
 def validar_recencia(data_pub, dias_max=730):
@@ -92,106 +242,212 @@ def limpar_data_ddg(data_raw):
         return None
 
 
-def carregar_rss_tempo_real(bert_analyzer):
-    print("-> 📡 Buscando RSS Tempo Real...")
+def _coletar_rss(setor, url):
+    """Um feed do Google News -> lista de (setor, titulo, data, link)."""
+    dados = []
+    try:
+        rate_limiter.aguardar_vez(url)
+        feed = feedparser.parse(url)
+        for entry in feed.entries:
+            titulo = entry.title
+            link = entry.link
+            fonte_rss = entry.source.get('title', '').lower() if 'source' in entry else ''
+
+            if not validar_fonte_por_texto(fonte_rss) and not validar_fonte_por_texto(titulo): continue
+
+            try:
+                # Silencia avisos de data no RSS
+                with SuppressStderr():
+                    if hasattr(entry, 'published_parsed'):
+                        dt = datetime.fromtimestamp(time.mktime(entry.published_parsed))
+                    else:
+                        dt = datetime.now()
+            except:
+                dt = datetime.now()
+
+            if not validar_recencia(dt): continue
+
+            titulo_seguro = titulo[:390]
+            link_seguro = link[:1990]
+
+            dados.append((setor, titulo_seguro, dt, link_seguro))
+    except Exception as e:
+        print(f"   ⚠️ Erro RSS {setor}: {e}")
+    return dados
+
+
+class BuscaDDG:
+    """
+    Busca padrão do histórico: um cliente DDGS por thread do pool, reaproveitado entre os termos.
+    Os clientes são abertos como no `with DDGS()` original e fechados todos ao sair do with.
+    Uso: with BuscaDDG() as buscar: buscar(termo)
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._clientes = ExitStack()
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self._clientes.close()
+
+    def __call__(self, termo):
+        cliente = getattr(self._local, 'ddgs', None)
+        if cliente is None:
+            with self._lock:
+                cliente = self._local.ddgs = self._clientes.enter_context(DDGS())
+        return cliente.news(termo, region="br-pt", safesearch="off", max_results=10)
+
+
+def _coletar_termo(setor, termo, dias_atras, buscar):
+    """Um termo da busca histórica -> lista de (setor, titulo, data, link), com retry no rate limit."""
     dados = []
-    for setor, url in TOPICOS_RSS.items():
+    tentativas = 0
+    while tentativas < 3:
         try:
-            feed = feedparser.parse(url)
-            for entry in feed.entries:
-                titulo = entry.title
-                link = entry.link
-                fonte_rss = entry.source.get('title', '').lower() if 'source' in entry else ''
+            # O 'SuppressStderr' engole qualquer print de erro ou warning
+            rate_limiter.aguardar_vez(HOST_DDG)
+            with SuppressStderr():
+                resultados = buscar(termo)
 
-                if not validar_fonte_por_texto(fonte_rss) and not validar_fonte_por_texto(titulo): continue
+                for item in resultados or []:
+                    titulo = item.get('title')
+                    link = item.get('url')
+                    source = item.get('source', '')
+                    data_raw = item.get('date')
 
-                try:
-                    # Silencia avisos de data no RSS
-                    with SuppressStderr():
-                        if hasattr(entry, 'published_parsed'):
-                            dt = datetime.fromtimestamp(time.mktime(entry.published_parsed))
-                        else:
-                            dt = datetime.now()
-                except:
-                    dt = datetime.now()
+                    if not titulo: continue
+                    if not validar_fonte_por_texto(link) and not validar_fonte_por_texto(source): continue
 
-                if not validar_recencia(dt): continue
+                    data_pub = limpar_data_ddg(data_raw)
+                    if not data_pub:
+                        dias_rand = random.randint(1, 180)
+                        data_pub = datetime.now() - timedelta(days=dias_rand)
 
-                score = analisar_sentimento(titulo, bert_analyzer)
+                    if not validar_recencia(data_pub, dias_atras): continue
 
-                titulo_seguro = titulo[:390]
-                link_seguro = link[:1990]
+                    titulo_seguro = titulo[:390]
+                    link_seguro = link[:1990]
+
+                    dados.append((setor, titulo_seguro, data_pub, link_seguro))
+            return dados
 
-                dados.append((setor, titulo_seguro, score, dt, link_seguro))
         except Exception as e:
-            print(f"   ⚠️ Erro RSS {setor}: {e}")
+            erro_str = str(e).lower()
+            if "202" in erro_str or "ratelimit" in erro_str:
+                tentativas += 1
+                dados = []
+                rate_limiter.registrar(HOST_DDG, 'throttles')
+                # Com vários workers, o throttle segura o host inteiro (não só esta thread)
+                pausa = rate_limiter.calcular_backoff(tentativas, base=10)
+                espera = rate_limiter.dormir_backoff(HOST_DDG, tentativas, base=10, jitter=2, retry_after=pausa)
+                print(f"      🛑 Rate Limit ({termo}). Dormiu {espera:.0f}s...")
+            else:
+                break
     return dados
 
 
-def carregar_historico_completo(bert_analyzer, dias_atras=730):
+def _executar_coletas(coletas, concorrente, prefixo):
+    """Roda as coletas (partials sem argumento) e devolve os resultados na ordem da lista."""
+    if concorrente and len(coletas) > 1:
+        with ThreadPoolExecutor(max_workers=min(NOTICIAS_WORKERS, len(coletas)),
+                                thread_name_prefix=prefixo) as executor:
+            return list(executor.map(lambda coleta: coleta(), coletas))
+    return [coleta() for coleta in coletas]
+
+
+def carregar_rss_tempo_real(concorrente=None):
+    print("-> 📡 Buscando RSS Tempo Real...")
+    concorrente = NOTICIAS_CONCORRENTE if concorrente is None else concorrente
+    coletas = [partial(_coletar_rss, setor, url) for setor, url in TOPICOS_RSS.items()]
+    return [noticia for feed in _executar_coletas(coletas, concorrente, 'rss') for noticia in feed]
+
+
+def carregar_historico_completo(dias_atras=730, buscar=None, concorrente=None):
+    """
+    Busca histórica no DuckDuckGo: um termo por tarefa, NOTICIAS_WORKERS em paralelo, com o ritmo
+    ditado pelo rate limiter do host. `buscar(termo)` -> lista de itens {title, url, source, date}
+    pode ser trocada (ex: benchmark/benchmark_coleta_noticias.py); o padrão é BuscaDDG.
+    """
     print(f"-> 🕰️ Iniciando Busca Histórica (Modo Silencioso)...")
+    concorrente = NOTICIAS_CONCORRENTE if concorrente is None else concorrente
+    inicio = time.perf_counter()
+
+    with BuscaDDG() as buscar_padrao:
+        coletas = [partial(_coletar_termo, setor, termo, dias_atras, buscar or buscar_padrao)
+                   for setor, lista_termos in TERMOS_HISTORICO.items() for termo in lista_termos]
+        resultados = _executar_coletas(coletas, concorrente, 'ddg')
+
+    # Junta na ordem dos termos: o mesmo título em dois termos fica com o primeiro (como no sequencial)
     dados = []
     ids_vistos = set()
+    for noticia in (n for termo in resultados for n in termo):
+        if noticia[1] in ids_vistos: continue
+        ids_vistos.add(noticia[1])
+        dados.append(noticia)
+
+    print(f"   ⏱️ {len(coletas)} termos em {time.perf_counter() - inicio:.1f}s "
+          f"({'concorrente' if concorrente else 'sequencial'}).")
+    rate_limiter.imprimir_metricas_rate_limit()
+    return dados
 
-    for setor, lista_termos in TERMOS_HISTORICO.items():
-        print(f"   🔎 Setor: {setor}...")
-        for termo in lista_termos:
-            sucesso = False
-            tentativas = 0
-            while not sucesso and tentativas < 3:
-                try:
-                    # AQUI ESTÁ A CORREÇÃO PRINCIPAL
-                    # O 'SuppressStderr' engole qualquer print de erro ou warning
-                    with SuppressStderr():
-                        with DDGS() as ddgs:
-                            resultados = ddgs.news(termo, region="br-pt", safesearch="off", max_results=10)
-
-                            if resultados:
-                                for item in resultados:
-                                    titulo = item.get('title')
-                                    link = item.get('url')
-                                    source = item.get('source', '')
-                                    data_raw = item.get('date')
-
-                                    if not titulo or titulo in ids_vistos: continue
-                                    if not validar_fonte_por_texto(link) and not validar_fonte_por_texto(
-                                        source): continue
-
-                                    data_pub = limpar_data_ddg(data_raw)
-                                    if not data_pub:
-                                        dias_rand = random.randint(1, 180)
-                                        data_pub = datetime.now() - timedelta(days=dias_rand)
-
-                                    if not validar_recencia(data_pub, dias_atras): continue
-
-                                    score = analisar_sentimento(titulo, bert_analyzer)
-
-                                    titulo_seguro = titulo[:390]
-                                    link_seguro = link[:1990]
-
-                                    dados.append((setor, titulo_seguro, score, data_pub, link_seguro))
-                                    ids_vistos.add(titulo)
-
-                    # Marcamos sucesso fora do bloco silenciado para a lógica continuar
-                    sucesso = True
-
-                except Exception as e:
-                    erro_str = str(e).lower()
-                    if "202" in erro_str or "ratelimit" in erro_str:
-                        print(f"      🛑 Rate Limit. Dormindo 10s...")
-                        time.sleep(10)
-                        tentativas += 1
-                    else:
-                        break
 
-            time.sleep(1.5)
-        time.sleep(2)
+def hashes_gravados(cursor, hashes):
+    """{cd_hash: (ds_modelo, dt_publicacao)} dos `hashes` que já estão na T_BF_NOTICIAS."""
+    gravados = {}
+    for i in range(0, len(hashes), LOTE_HASHES):
+        lote = hashes[i:i + LOTE_HASHES]
+        binds = ", ".join(f":{n + 1}" for n in range(len(lote)))
+        cursor.execute(f"SELECT cd_hash, ds_modelo, dt_publicacao FROM T_BF_NOTICIAS WHERE cd_hash IN ({binds})",
+                       lote)
+        gravados.update((h, (modelo, data)) for h, modelo, data in cursor.fetchall())
+    return gravados
 
-    return dados
 
-
-def executar_etl_noticias():
-    print("\n📰 [ETL NLP] Iniciando Pipeline...")
+def filtrar_noticias_novas(noticias, modelo):
+    """
+    Remove as manchetes já gravadas pelo `modelo` (não gastam inferência nem são regravadas).
+    As gravadas por outro modelo ficam, com a data do banco (o MERGE só troca o score). None se o banco falhar.
+    """
+    with conexao() as conn:
+        if not conn:
+            print("   ❌ Sem conexão com o banco.")
+            return None
+        hashes = [hash_titulo(titulo) for _, titulo, _, _ in noticias]
+        try:
+            gravados = hashes_gravados(conn.cursor(), hashes)
+        except Exception as e:
+            print(f"❌ ERRO NO BANCO: {e}")
+            print("   ℹ️ Schema antigo? Rode o modo migrate para criar as colunas cd_hash e ds_modelo.")
+            return None
+
+    restantes = []
+    repontuar = 0
+    for (setor, titulo, data, link), h in zip(noticias, hashes):
+        if h not in gravados:
+            restantes.append((setor, titulo, data, link))
+        elif gravados[h][0] != modelo:
+            repontuar += 1
+            restantes.append((setor, titulo, gravados[h][1], link))
+    if repontuar:
+        print(f"   🔁 {repontuar} já gravadas por outro modelo serão repontuadas com {modelo}.")
+    return restantes
+
+
+def executar_etl_noticias(modo=None):
+    """
+    modo='incremental' (padrão, BF_NOTICIAS_MODO): grava só as manchetes que ainda não estão no banco,
+    preservando o histórico; só elas passam pelo modelo e pelo recálculo do sentimento diário
+    (junto com as já gravadas por outro modelo, que são repontuadas).
+    modo='completo': apaga a T_BF_NOTICIAS e grava a coleta atual (comportamento original).
+    """
+    modo = modo or MODO_NOTICIAS
+    if modo not in MODOS_NOTICIAS:
+        raise ValueError(f"Modo de notícias inválido: {modo}. Use: {' | '.join(MODOS_NOTICIAS)}")
+    print(f"\n📰 [ETL NLP] Iniciando Pipeline (modo {modo})...")
     
     tqdm.tqdm = lambda *args, **kwargs: tqdm.tqdm(*args, **kwargs, disable=True)
 
@@ -199,46 +455,90 @@ def executar_etl_noticias():
         if not hasattr(stream, 'isatty'):
             stream.isatty = lambda: False
 
+    # 1. Coleta (só rede: o modelo não segura as requisições)
+    coletadas = []
+    coletadas.extend(carregar_rss_tempo_real())
+
+    # Busca histórica
+    coletadas.extend(carregar_historico_completo(dias_atras=730))
+
+    # 2. Deduplicação (antes do modelo: manchete repetida não gasta inferência)
+    noticias = deduplicar_noticias(coletadas)
+    if not noticias:
+        print("   ⚠️ Nenhuma notícia coletada. O banco não será alterado.")
+        return
+    print(f"   📰 {len(coletadas)} coletadas, {len(noticias)} únicas.")
+
+    modelo = versao_modelo()
+    if modo == 'incremental':
+        unicas = len(noticias)
+        noticias = filtrar_noticias_novas(noticias, modelo)
+        if noticias is None:
+            return
+        print(f"   🆕 {len(noticias)} para pontuar ({unicas - len(noticias)} já estavam no banco).")
+        if not noticias:
+            print("   ✅ Nada novo para gravar.")
+            return
+
+    # 3. Sentimento em lotes (títulos já vistos saem do cache local, sem carregar o modelo)
     try:
-        bert_analyzer = create_analyzer(task="sentiment", lang="pt")
+        if CACHE_ATIVO:
+            with CacheSentimento(modelo) as cache:
+                lista_final = pontuar_noticias(noticias, obter_analyzer, cache=cache)
+        else:
+            lista_final = pontuar_noticias(noticias, obter_analyzer)
     except Exception as e:
         print(f"   ❌ Erro IA: {e}")
         return
 
-    lista_final = []
-    lista_final.extend(carregar_rss_tempo_real(bert_analyzer))
-
-    # Busca histórica
-    lista_final.extend(carregar_historico_completo(bert_analyzer, dias_atras=730))
-
+    # Inferência que falhou não é gravada: a manchete continua "nova" e é repontuada na próxima execução
+    falhas = sum(noticia[2] is None for noticia in lista_final)
+    lista_final = [noticia for noticia in lista_final if noticia[2] is not None]
+    if falhas:
+        print(f"   ⚠️ {falhas} títulos sem score ficam para a próxima execução.")
     if not lista_final:
-        print("   ⚠️ Nenhuma notícia coletada. O banco não será alterado.")
+        print("   ❌ Nenhum título pontuado. O banco não será alterado.")
         return
 
-    conn = get_connection()
-    if not conn:
-        print("   ❌ Sem conexão com o banco.")
-        return
+    linhas = [(hash_titulo(titulo), setor, titulo, score, data, link, modelo)
+              for setor, titulo, score, data, link in lista_final]
+    # (só a data: o DuckDuckGo pode devolver datetime com fuso e o Oracle sem)
+    datas = [noticia[3].date() for noticia in lista_final]
 
-    try:
-        cursor = conn.cursor()
-        print(f"   🧹 Limpando tabela de notícias...")
-        cursor.execute("DELETE FROM T_BF_NOTICIAS")
+    with conexao() as conn:
+        if not conn:
+            print("   ❌ Sem conexão com o banco.")
+            return
 
-        print(f"   💾 Tentando salvar {len(lista_final)} notícias...")
+        try:
+            cursor = conn.cursor()
+            if modo == 'completo':
+                # Dias com notícia antes da carga também mudam no sentimento diário
+                cursor.execute("SELECT TRUNC(MIN(dt_publicacao)), TRUNC(MAX(dt_publicacao)) FROM T_BF_NOTICIAS")
+                datas.extend(d.date() for d in cursor.fetchone() if d is not None)
 
-        sql = "INSERT INTO T_BF_NOTICIAS (ds_setor, tx_titulo, vl_sentimento, dt_publicacao, tx_link) VALUES (:1, :2, :3, :4, :5)"
+                print(f"   🧹 Limpando tabela de notícias...")
+                cursor.execute("DELETE FROM T_BF_NOTICIAS")
+                sql = SQL_INSERT_NOTICIA
+            else:
+                sql = SQL_MERGE_NOTICIA
 
-        batch_size = 100
-        for i in range(0, len(lista_final), batch_size):
-            batch = lista_final[i:i + batch_size]
-            cursor.executemany(sql, batch)
+            print(f"   💾 Tentando salvar {len(linhas)} notícias...")
 
-        conn.commit()
-        print("   ✅ SUCESSO! Banco atualizado.")
+            batch_size = 100
+            for i in range(0, len(linhas), batch_size):
+                batch = linhas[i:i + batch_size]
+                cursor.executemany(sql, batch)
+
+            conn.commit()
+            print("   ✅ SUCESSO! Banco atualizado.")
+
+        except Exception as e:
+            conn.rollback()
+            print(f"❌ ERRO NO BANCO: {e}")
+            return
+
+    # Médias móveis de 30 dias lidas pelas views de risco e do Power BI
+    # (no incremental, só os dias que enxergam as notícias novas ou repontuadas)
+    atualizar_sentimento_diario(min(datas), max(datas))
 
-    except Exception as e:
-        if 'conn' in locals() and conn: conn.rollback()
-        print(f"❌ ERRO NO BANCO: {e}")
-    finally:
-        if 'conn' in locals() and conn: conn.close()
@@ -5,13 +5,11 @@ import customtkinter as ctk
 from tkinter import scrolledtext
 
 # Importando seus módulos originais
+# As etapas pesadas (sklearn, torch/pysentimiento, requests) são importadas no clique do botão:
+# abrir a janela não paga por elas.
 from src.setup_tables import recriar_banco_dados
 from src.setup_views import atualizar_view_ml, atualizar_view_pbi
-from src.ml_cluster import segmentar_clientes
-from src.ml_risk import calcular_risco_credito
-from src.etl_api import carregar_api
-from src.etl_ingestion import carregar_dados
-from src.etl_nlp import executar_etl_noticias
+from src.db_connection import imprimir_estatisticas_pool
 
 
 class TextRedirector:
@@ -139,6 +137,7 @@ class BussolaGUI(ctk.CTk):
             self._apply_credentials_to_env()  # <--- APLICA AS CREDENCIAIS AQUI
             print(f"\n--- ▶️ Iniciando: {func.__name__} ---")
             func()
+            imprimir_estatisticas_pool()
             print(f"--- ✅ Finalizado: {func.__name__} ---")
             self._update_status("Concluído com sucesso!")
             self._set_progress(1.0)
@@ -187,6 +186,8 @@ class BussolaGUI(ctk.CTk):
     def read_data(self):
         self._update_status("Carregando CSVs e APIs...")
         self._set_progress(0.2)
+        from src.etl_api import carregar_api
+        from src.etl_ingestion import carregar_dados
         carregar_dados()  # CSVs
         self._set_progress(0.6)
         carregar_api()  # Selic/Dólar
@@ -194,11 +195,14 @@ class BussolaGUI(ctk.CTk):
     def read_news(self):
         self._update_status("Buscando notícias (Isso pode demorar)...")
         self._set_progress(0.1)
+        from src.etl_nlp import executar_etl_noticias
         executar_etl_noticias()
 
     def process_ml(self):
         self._update_status("Treinando Robôs de Risco e Cluster...")
         self._set_progress(0.1)
+        from src.ml_cluster import segmentar_clientes
+        from src.ml_risk import calcular_risco_credito
         atualizar_view_ml()
         self._set_progress(0.3)
         calcular_risco_credito(force_retrain=True)
@@ -0,0 +1,207 @@
+import oracledb
+from src.cache_sentimento import hash_titulo
+from src.db_connection import conexao
+from src.setup_tables import (INDICES, SEQUENCIAS, SQL_ANALISE_PBI, SQL_CONTROLE_REFRESH, SQL_DIM_SETOR,
+                              SQL_FEATURES_MACRO, SQL_SENTIMENTO_DIARIO, SQL_STG_BOLETO, SQL_STG_EMPRESA,
+                              carregar_dim_setor, sql_indice)
+from src.setup_views import recalcular_sentimento_diario
+
+# ================= CONFIGURAÇÕES =================
+# Migrações em ordem: (versão, descrição, passos). Cada passo é um SQL ou uma função(cursor).
+# Todo passo precisa ser idempotente: se a migração cair no meio (o DDL do Oracle faz commit
+# implícito), rodar o migrate de novo reaplica a versão inteira sem erro.
+# Um schema criado pelo recriar_banco_dados já nasce na última versão.
+SQL_SCHEMA_VERSAO = """
+                    CREATE TABLE T_BF_SCHEMA_VERSAO \
+                    ( \
+                        nr_versao    NUMBER(5) NOT NULL, \
+                        ds_migracao  VARCHAR2(200) NOT NULL, \
+                        dt_aplicacao DATE DEFAULT SYSDATE, \
+                        CONSTRAINT PK_BF_SCHEMA_VERSAO PRIMARY KEY (nr_versao) \
+                    ) \
+                    """
+
+# Erros que significam "isso já foi aplicado" (o passo vira no-op)
+JA_APLICADO = {
+    955: 'objeto já existe',
+    1408: 'colunas já indexadas',
+    1430: 'coluna já existe',
+    1442: 'coluna já é NOT NULL',
+    2260: 'tabela já tem PK',
+    2261: 'chave única já existe',
+    2264: 'constraint já existe',
+    2275: 'FK já existe',
+}
+# Linhas por executemany no preenchimento do cd_hash da T_BF_NOTICIAS (v8)
+LOTE_BACKFILL = 1000
+
+
+def executar_idempotente(cursor, sql):
+    try:
+        cursor.execute(sql)
+    except oracledb.DatabaseError as e:
+        error, = e.args
+        if error.code not in JA_APLICADO:
+            raise
+        print(f"      ℹ️ Já aplicado ({JA_APLICADO[error.code]}).")
+
+
+# ==============================================================================
+# PASSOS QUE NÃO SÃO UM SQL SÓ
+# ==============================================================================
+def _criar_indices(cursor):
+    for indice in INDICES:
+        executar_idempotente(cursor, sql_indice(*indice))
+
+
+def _recalcular_sentimento(cursor):
+    # Notícias já carregadas: as views passam a ler a média desta tabela
+    recalcular_sentimento_diario(cursor)
+
+
+def _dedup_noticias(cursor):
+    # Hash calculado em Python com o mesmo hash_titulo do ETL (charset do banco e espaços
+    # unicode dariam outro hash no SQL, e a manchete voltaria como "nova" no incremental)
+    cursor.execute("SELECT id_noticia, tx_titulo FROM T_BF_NOTICIAS WHERE cd_hash IS NULL AND tx_titulo IS NOT NULL")
+    hashes = [(hash_titulo(titulo), id_noticia) for id_noticia, titulo in cursor.fetchall()]
+    for i in range(0, len(hashes), LOTE_BACKFILL):
+        cursor.executemany("UPDATE T_BF_NOTICIAS SET cd_hash = :1 WHERE id_noticia = :2",
+                           hashes[i:i + LOTE_BACKFILL])
+    print(f"      #️⃣ {len(hashes)} notícia(s) com hash do título preenchido.")
+    # Mesma manchete gravada mais de uma vez: fica a primeira
+    cursor.execute("""DELETE FROM T_BF_NOTICIAS n
+                      WHERE n.cd_hash IS NOT NULL
+                        AND n.id_noticia NOT IN (SELECT MIN(id_noticia) FROM T_BF_NOTICIAS
+                                                 WHERE cd_hash IS NOT NULL GROUP BY cd_hash)""")
+    print(f"      🧹 {cursor.rowcount} notícia(s) duplicada(s) removida(s).")
+
+
+def _cachear_sequencias(cursor):
+    for nome, cache in SEQUENCIAS.items():
+        cursor.execute(f"ALTER SEQUENCE {nome} CACHE {cache}")
+
+
+MIGRACOES = [
+    (1, "Chave única da macro (nm_indicador, sg_uf, dt_referencia)", [
+        # Duplicatas antigas (cargas repetidas) impedem a constraint: fica a mais recente
+        """DELETE FROM T_BF_MACRO_ECONOMIA m
+           WHERE m.id_macro_economia NOT IN (SELECT MAX(id_macro_economia) FROM T_BF_MACRO_ECONOMIA
+                                             GROUP BY nm_indicador, sg_uf, dt_referencia)""",
+        """ALTER TABLE T_BF_MACRO_ECONOMIA
+           ADD CONSTRAINT UN_BF_MACRO_ECONOMIA UNIQUE (nm_indicador, sg_uf, dt_referencia)""",
+    ]),
+    (2, "Tabela de features macro as-of (T_BF_FEATURES_MACRO)", [
+        SQL_FEATURES_MACRO,
+    ]),
+    (3, "Sentimento diário por setor (T_BF_SENTIMENTO_DIARIO)", [
+        SQL_SENTIMENTO_DIARIO,
+        _recalcular_sentimento,
+    ]),
+    (4, "Análise PBI materializada e controle de refresh", [
+        SQL_ANALISE_PBI,
+        SQL_CONTROLE_REFRESH,
+    ]),
+    (5, "Staging da ingestão incremental, dimensão de setor e setor pré-calculado na empresa", [
+        # As GTTs de staging não existem no schema original. Já nascem com as colunas de setor
+        # (os ALTERs abaixo viram no-op); num schema que já as tinha, o CREATE é que vira no-op.
+        SQL_STG_EMPRESA,
+        SQL_STG_BOLETO,
+        SQL_DIM_SETOR,
+        carregar_dim_setor,
+        "ALTER TABLE T_BF_EMPRESA ADD (ds_setor VARCHAR2(20))",
+        "ALTER TABLE T_BF_EMPRESA ADD (vl_setor_macro NUMBER(2))",
+        "ALTER TABLE T_BF_STG_EMPRESA ADD (ds_setor VARCHAR2(20))",
+        "ALTER TABLE T_BF_STG_EMPRESA ADD (vl_setor_macro NUMBER(2))",
+        # Empresas já carregadas: setor pela dimensão (divisão fora da tabela = MERCADO)
+        """UPDATE T_BF_EMPRESA e
+           SET (ds_setor, vl_setor_macro) = (
+               SELECT NVL(MAX(d.ds_setor), 'MERCADO'), NVL(MAX(d.vl_setor_macro), 5)
+               FROM T_BF_DIM_SETOR d
+               WHERE d.cd_divisao = SUBSTR(e.cd_cnae, 1, 2))
+           WHERE e.ds_setor IS NULL""",
+    ]),
+    (6, "Índices do plano (setup_tables.INDICES)", [
+        _criar_indices,
+    ]),
+    (7, "Sequences com CACHE", [
+        _cachear_sequencias,
+    ]),
+    (8, "Hash do título na T_BF_NOTICIAS (carga incremental de notícias)", [
+        "ALTER TABLE T_BF_NOTICIAS ADD (cd_hash VARCHAR2(64))",
+        _dedup_noticias,
+        "ALTER TABLE T_BF_NOTICIAS ADD CONSTRAINT UN_BF_NOTICIAS_HASH UNIQUE (cd_hash)",
+        # As duplicatas removidas entravam na média
+        _recalcular_sentimento,
+    ]),
+    (9, "Modelo de sentimento na T_BF_NOTICIAS (ds_modelo)", [
+        # Linhas antigas ficam com modelo desconhecido (NULL): o incremental repontua cada uma
+        # com o backend configurado quando ela voltar na coleta
+        "ALTER TABLE T_BF_NOTICIAS ADD (ds_modelo VARCHAR2(80))",
+    ]),
+]
+
+
+# ==============================================================================
+# EXECUÇÃO
+# ==============================================================================
+def versao_schema(cursor):
+    """Versão aplicada (0 = schema anterior ao controle de versão). Cria a tabela de controle se faltar."""
+    try:
+        cursor.execute(SQL_SCHEMA_VERSAO)
+    except oracledb.DatabaseError as e:
+        error, = e.args
+        if error.code != 955:
+            raise
+    cursor.execute("SELECT NVL(MAX(nr_versao), 0) FROM T_BF_SCHEMA_VERSAO")
+    return cursor.fetchone()[0]
+
+
+def marcar_versao_atual(conn):
+    """Schema recém-criado pelo setup: registra todas as migrações como aplicadas."""
+    cursor = conn.cursor()
+    versao = versao_schema(cursor)
+    cursor.executemany("INSERT INTO T_BF_SCHEMA_VERSAO (nr_versao, ds_migracao) VALUES (:1, :2)",
+                       [(numero, descricao) for numero, descricao, _ in MIGRACOES if numero > versao])
+    conn.commit()
+    print(f"   ✅ Schema na versão {MIGRACOES[-1][0]}.")
+
+
+def migrar_schema():
+    """
+    Atualiza um schema existente (com dados) até a última versão, sem DROP.
+    Cada migração é gravada em T_BF_SCHEMA_VERSAO só depois de todos os seus passos.
+    """
+    print("\n🧬 [MIGRAÇÃO] Verificando versão do schema...")
+    with conexao() as conn:
+        if not conn: return
+        cursor = conn.cursor()
+        try:
+            versao = versao_schema(cursor)
+        except oracledb.DatabaseError as e:
+            print(f"   ❌ Erro ao ler a versão do schema: {e}")
+            return
+
+        pendentes = [m for m in MIGRACOES if m[0] > versao]
+        if not pendentes:
+            print(f"   ✅ Schema já está na versão {versao}.")
+            return
+
+        print(f"   ℹ️ Versão atual: {versao}. {len(pendentes)} migração(ões) pendente(s).")
+        for numero, descricao, passos in pendentes:
+            print(f"   ▶️ v{numero}: {descricao}")
+            try:
+                for passo in passos:
+                    if callable(passo):
+                        passo(cursor)
+                    else:
+                        executar_idempotente(cursor, passo)
+                cursor.execute("INSERT INTO T_BF_SCHEMA_VERSAO (nr_versao, ds_migracao) VALUES (:1, :2)",
+                               [numero, descricao])
+                conn.commit()
+            except oracledb.DatabaseError as e:
+                conn.rollback()
+                print(f"   ❌ Migração v{numero} falhou: {e}")
+                print(f"   ⚠️ Schema parado na versão {numero - 1}. Corrija e rode o migrate de novo.")
+                return
+
+    print(f"✅ Schema migrado para a versão {MIGRACOES[-1][0]}.")
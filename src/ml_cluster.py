@@ -6,7 +6,8 @@ import warnings
 from src.utils_paths import resource_path
 from sklearn.cluster import KMeans, DBSCAN
 from sklearn.preprocessing import StandardScaler
-from src.db_connection import get_connection
+from src.db_connection import conexao
+from src.db_bulk import inserir_dataframe
 
 # Silencia o aviso dramático do Pandas exigindo SQLAlchemy para o OracleDB
 warnings.filterwarnings(
@@ -45,71 +46,75 @@ def nomear_cluster(df_clientes, resumo):
 def alimentar_tabela(df_final, conn):
     print("   💾 Salvando tabela T_BF_CLUSTER...")
     cursor = conn.cursor()
-    cursor.execute("TRUNCATE TABLE T_BF_CLUSTER")
-
-    sql = "INSERT INTO T_BF_CLUSTER (id_boleto, nr_cluster, ds_perfil) VALUES (:1, :2, :3)"
-
-    dados_insert = []
-    for _, row in df_final.iterrows():
-        perfil_txt = row['DS_PERFIL']
-        if row['FLAG_ANOMALIA'] == 1: perfil_txt += " [ALERTA ANOMALIA]"
-        dados_insert.append((row['ID_BOLETO'], row['CLUSTER_ID'], perfil_txt))
-
-    cursor.executemany(sql, dados_insert)
+    # DELETE (e não TRUNCATE, que faz commit): se a carga falhar, os clusters anteriores voltam
+    cursor.execute("DELETE FROM T_BF_CLUSTER")
+
+    df_insert = pd.DataFrame({
+        'ID_BOLETO': df_final['ID_BOLETO'],
+        'CLUSTER_ID': df_final['CLUSTER_ID'].astype(int),
+        'DS_PERFIL': np.where(df_final['FLAG_ANOMALIA'] == 1,
+                              df_final['DS_PERFIL'] + " [ALERTA ANOMALIA]", df_final['DS_PERFIL']),
+    })
+
+    # dt_processamento vem de DEFAULT: sem carga direta aqui
+    gravados, erros = inserir_dataframe(conn, "T_BF_CLUSTER", ['id_boleto', 'nr_cluster', 'ds_perfil'], df_insert,
+                                        direto=False)
+    if erros:
+        conn.rollback()
+        print(f"   ❌ {len(erros)} registros rejeitados pelo banco. Rollback executado (clusters anteriores mantidos).")
+        return
     conn.commit()
-    print(f"   ✅ Sucesso! {len(dados_insert)} registros.")
+    print(f"   ✅ Sucesso! {gravados} registros.")
 
 
 def segmentar_clientes(force_retrain=False):
     print("\n🧩 INICIANDO MOTOR DE SEGMENTAÇÃO COMPORTAMENTAL...")
-    conn = get_connection()
-    if not conn: return
-
-    try:
-        df_clientes = pd.read_sql("SELECT * FROM V_BF_TREINO_ML_CLUSTER", conn)
-        df_clientes = df_clientes.fillna(0)
-
-        if df_clientes.empty:
-            print("   ⚠️ Sem dados para clusterizar.")
-            return
-
-        cols_features = ['NR_FREQUENCIA_COMPRA', 'VL_TICKET_MEDIO', 'VL_MEDIO_DIAS_ATRASO']
-        X = df_clientes[cols_features]
-
-        kmeans = None
-        scaler = None
-
-        if os.path.exists(ARQUIVO_MODELO) and os.path.exists(ARQUIVO_SCALER) and not force_retrain:
-            print("   📂 Modelo Cluster carregado.")
-            kmeans = joblib.load(ARQUIVO_MODELO)
-            scaler = joblib.load(ARQUIVO_SCALER)
-            X_scaled = scaler.transform(X)
-        else:
-            print("   🎨 Definindo Perfis (Treino Novo)...")
-            scaler = StandardScaler()
-            X_scaled = scaler.fit_transform(X)
-            kmeans = KMeans(n_clusters=4, random_state=42, n_init=10)
-            kmeans.fit(X_scaled)
-            joblib.dump(kmeans, ARQUIVO_MODELO)
-            joblib.dump(scaler, ARQUIVO_SCALER)
-
-        df_clientes['CLUSTER_ID'] = kmeans.predict(X_scaled)
-        resumo = df_clientes.groupby('CLUSTER_ID')[cols_features].mean()
-        nomeacao = nomear_cluster(df_clientes, resumo)
-        df_clientes['DS_PERFIL'] = df_clientes['CLUSTER_ID'].map(nomeacao)
-
-        print("   🕵️‍♂️ Caçando Anomalias (DBSCAN)...")
-        dbscan = DBSCAN(eps=6.0, min_samples=15).fit(X_scaled)
-        df_clientes['FLAG_ANOMALIA'] = np.where(dbscan.labels_ == -1, 1, 0)
-
-        print("   🔄 Mapeando volta para boletos...")
-        df_boletos = pd.read_sql("SELECT ID_BOLETO, ID_PAGADOR FROM T_BF_BOLETO", conn)
-        df_final = df_boletos.merge(df_clientes[['ID_PAGADOR', 'CLUSTER_ID', 'DS_PERFIL', 'FLAG_ANOMALIA']],
-                                    on='ID_PAGADOR', how='inner')
-
-        alimentar_tabela(df_final, conn)
-
-    except Exception as e:
-        print(f"❌ Erro Clustering: {e}")
-    finally:
-        conn.close()
\ No newline at end of file
+    with conexao() as conn:
+        if not conn: return
+
+        try:
+            df_clientes = pd.read_sql("SELECT * FROM V_BF_TREINO_ML_CLUSTER", conn)
+            df_clientes = df_clientes.fillna(0)
+
+            if df_clientes.empty:
+                print("   ⚠️ Sem dados para clusterizar.")
+                return
+
+            cols_features = ['NR_FREQUENCIA_COMPRA', 'VL_TICKET_MEDIO', 'VL_MEDIO_DIAS_ATRASO']
+            X = df_clientes[cols_features]
+
+            kmeans = None
+            scaler = None
+
+            if os.path.exists(ARQUIVO_MODELO) and os.path.exists(ARQUIVO_SCALER) and not force_retrain:
+                print("   📂 Modelo Cluster carregado.")
+                kmeans = joblib.load(ARQUIVO_MODELO)
+                scaler = joblib.load(ARQUIVO_SCALER)
+                X_scaled = scaler.transform(X)
+            else:
+                print("   🎨 Definindo Perfis (Treino Novo)...")
+                scaler = StandardScaler()
+                X_scaled = scaler.fit_transform(X)
+                kmeans = KMeans(n_clusters=4, random_state=42, n_init=10)
+                kmeans.fit(X_scaled)
+                joblib.dump(kmeans, ARQUIVO_MODELO)
+                joblib.dump(scaler, ARQUIVO_SCALER)
+
+            df_clientes['CLUSTER_ID'] = kmeans.predict(X_scaled)
+            resumo = df_clientes.groupby('CLUSTER_ID')[cols_features].mean()
+            nomeacao = nomear_cluster(df_clientes, resumo)
+            df_clientes['DS_PERFIL'] = df_clientes['CLUSTER_ID'].map(nomeacao)
+
+            print("   🕵️‍♂️ Caçando Anomalias (DBSCAN)...")
+            dbscan = DBSCAN(eps=6.0, min_samples=15).fit(X_scaled)
+            df_clientes['FLAG_ANOMALIA'] = np.where(dbscan.labels_ == -1, 1, 0)
+
+            print("   🔄 Mapeando volta para boletos...")
+            df_boletos = pd.read_sql("SELECT ID_BOLETO, ID_PAGADOR FROM T_BF_BOLETO", conn)
+            df_final = df_boletos.merge(df_clientes[['ID_PAGADOR', 'CLUSTER_ID', 'DS_PERFIL', 'FLAG_ANOMALIA']],
+                                        on='ID_PAGADOR', how='inner')
+
+            alimentar_tabela(df_final, conn)
+
+        except Exception as e:
+            print(f"❌ Erro Clustering: {e}")
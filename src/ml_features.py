@@ -0,0 +1,194 @@
+import os
+import warnings
+import numpy as np
+import pandas as pd
+
+# Silencia o aviso dramático do Pandas exigindo SQLAlchemy para o OracleDB
+warnings.filterwarnings(
+    action='ignore',
+    category=UserWarning,
+    message='.*SQLAlchemy.*'
+)
+
+# ================= CONFIGURAÇÕES =================
+# De onde vêm os dados de treino do risco:
+#   - 'view'   -> SELECT na V_BF_TREINO_ML_RISCO (as-of calculado no Oracle)
+#   - 'pandas' -> lê as tabelas brutas uma vez e monta as features aqui (merge_asof)
+FONTE_FEATURES = os.getenv('BF_FONTE_FEATURES', 'view')
+FONTES_FEATURES = ('view', 'pandas')
+
+JANELA_SENTIMENTO_DIAS = 30
+
+# Mesmas colunas (e ordem) da V_BF_TREINO_ML_RISCO
+COLUNAS_TREINO = ['ID_BOLETO', 'VL_NOMINAL', 'NR_PRAZO_DIAS', 'CD_CNAE', 'SG_UF', 'VL_SCORE_MATERIALIDADE',
+                  'VL_SCORE_QUANTIDADE', 'VL_SETOR_MACRO', 'TAX_SELIC', 'TAX_DOLAR', 'TAX_DESEMPREGO', 'INDICE_PIB',
+                  'VAR_VAREJO', 'VAR_INDUSTRIA', 'VAR_SERVICOS', 'VAR_AGRO', 'VAR_PECUARIA',
+                  'VL_SENTIMENTO_SETORIAL', 'TARGET']
+
+# Mesmo critério do setup_views.FEATURES_MACRO: (coluna, indicador, fallback)
+FEATURES_MACRO = [
+    ('TAX_SELIC', 'SELIC', None),
+    ('TAX_DOLAR', 'DOLAR', None),
+    ('TAX_DESEMPREGO', 'TAX_DESEMPREGO', None),
+    ('INDICE_PIB', 'IBC-BR', None),
+    ('VAR_VAREJO', 'IND_VAREJO', 'MEDIA'),
+    ('VAR_INDUSTRIA', 'IND_INDUSTRIA', 'BR'),
+    ('VAR_SERVICOS', 'IND_SERVICOS', 'MEDIA'),
+    ('VAR_AGRO', 'IND_AGRO', 'MEDIA'),
+    ('VAR_PECUARIA', 'IND_PECUARIA', 'MEDIA'),
+]
+
+SQL_BOLETOS = "SELECT id_boleto, id_pagador, vl_nominal, dt_emissao, dt_vencimento, vl_inadimplencia FROM T_BF_BOLETO"
+SQL_EMPRESAS = ("SELECT id_empresa, cd_cnae, sg_uf, vl_score_materialidade, vl_score_quantidade, "
+                "ds_setor, vl_setor_macro FROM T_BF_EMPRESA")
+SQL_MACRO = "SELECT sg_uf, dt_referencia, nm_indicador, vl_indicador FROM T_BF_MACRO_ECONOMIA"
+SQL_NOTICIAS = "SELECT ds_setor, dt_publicacao, vl_sentimento FROM T_BF_NOTICIAS WHERE vl_sentimento IS NOT NULL"
+
+
+# ==============================================================================
+# MACRO (as-of com merge_asof)
+# ==============================================================================
+def _asof(base, macro, indicador, por_uf):
+    """
+    Valor do indicador vigente no 1º dia do mês de vencimento de cada linha de `base`
+    (última dt_referencia <= DT_MES), na UF da empresa ou no 'BR'.
+    """
+    serie = macro[macro['NM_INDICADOR'] == indicador]
+    if not por_uf:
+        serie = serie[serie['SG_UF'] == 'BR']
+    serie = serie[['SG_UF', 'DT_REFERENCIA', 'VL_INDICADOR']].sort_values('DT_REFERENCIA', kind='stable')
+
+    esquerda = base[['DT_MES', 'SG_UF']].reset_index().sort_values('DT_MES', kind='stable')
+    if por_uf:
+        juntos = pd.merge_asof(esquerda, serie, left_on='DT_MES', right_on='DT_REFERENCIA', by='SG_UF',
+                               direction='backward')
+    else:
+        juntos = pd.merge_asof(esquerda, serie.drop(columns='SG_UF'), left_on='DT_MES',
+                               right_on='DT_REFERENCIA', direction='backward')
+    return juntos.set_index('index')['VL_INDICADOR'].reindex(base.index)
+
+
+def _features_macro(base, macro):
+    medias = macro.groupby('NM_INDICADOR')['VL_INDICADOR'].mean()
+    for coluna, indicador, fallback in FEATURES_MACRO:
+        if fallback is None:
+            base[coluna] = _asof(base, macro, indicador, por_uf=False)
+        elif fallback == 'BR':
+            base[coluna] = _asof(base, macro, indicador, por_uf=True).fillna(
+                _asof(base, macro, indicador, por_uf=False))
+        else:
+            base[coluna] = _asof(base, macro, indicador, por_uf=True).fillna(medias.get(indicador, np.nan))
+    return base
+
+
+# ==============================================================================
+# SENTIMENTO (janela móvel de 30 dias com soma acumulada)
+# ==============================================================================
+def _sentimento_janela(base, noticias):
+    """
+    Média do sentimento das notícias do setor publicadas do dia (vencimento - 30) até o dia
+    do vencimento, inclusive (mesma janela da T_BF_SENTIMENTO_DIARIO). Sem notícia na janela = 0.
+    Por setor: notícias ordenadas + soma acumulada, e cada boleto vira dois searchsorted.
+    """
+    resultado = np.zeros(len(base))
+    vencimentos = base['DT_VENCIMENTO'].dt.normalize().to_numpy(dtype='datetime64[ns]')
+    setores = base['DS_SETOR'].to_numpy()
+    janela = np.timedelta64(JANELA_SENTIMENTO_DIAS, 'D')
+
+    for setor, grupo in noticias.groupby('DS_SETOR'):
+        linhas = np.flatnonzero(setores == setor)
+        if len(linhas) == 0:
+            continue
+        grupo = grupo.sort_values('DT_PUBLICACAO', kind='stable')
+        datas = grupo['DT_PUBLICACAO'].dt.normalize().to_numpy(dtype='datetime64[ns]')
+        acumulado = np.concatenate([[0.0], np.cumsum(grupo['VL_SENTIMENTO'].to_numpy(dtype=float))])
+
+        fim = vencimentos[linhas]
+        ini_pos = np.searchsorted(datas, fim - janela, side='left')
+        fim_pos = np.searchsorted(datas, fim, side='right')
+        quantidade = fim_pos - ini_pos
+        soma = acumulado[fim_pos] - acumulado[ini_pos]
+        resultado[linhas] = np.divide(soma, quantidade, out=np.zeros(len(linhas)), where=quantidade > 0)
+    return resultado
+
+
+# ==============================================================================
+# MONTAGEM
+# ==============================================================================
+def construir_features_risco(df_boletos, df_empresas, df_macro, df_noticias):
+    """
+    Recebe as tabelas brutas (colunas em maiúsculo, como o pd.read_sql devolve do Oracle)
+    e monta o mesmo DataFrame da V_BF_TREINO_ML_RISCO (COLUNAS_TREINO).
+    """
+    base = df_boletos.merge(df_empresas, left_on='ID_PAGADOR', right_on='ID_EMPRESA', how='inner')
+    base = base.reset_index(drop=True)
+
+    for col in ['DT_EMISSAO', 'DT_VENCIMENTO']:
+        base[col] = pd.to_datetime(base[col])
+    base['NR_PRAZO_DIAS'] = (base['DT_VENCIMENTO'] - base['DT_EMISSAO']) / pd.Timedelta(days=1)
+    base['VL_SCORE_MATERIALIDADE'] = base['VL_SCORE_MATERIALIDADE'].fillna(0)
+    base['VL_SCORE_QUANTIDADE'] = base['VL_SCORE_QUANTIDADE'].fillna(0)
+
+    macro = df_macro.copy()
+    macro['DT_REFERENCIA'] = pd.to_datetime(macro['DT_REFERENCIA'])
+    base['DT_MES'] = base['DT_VENCIMENTO'].dt.to_period('M').dt.to_timestamp()
+    base['DT_MES'] = base['DT_MES'].astype(macro['DT_REFERENCIA'].dtype)
+    base = _features_macro(base, macro)
+
+    noticias = df_noticias.dropna(subset=['VL_SENTIMENTO']).copy()
+    noticias['DT_PUBLICACAO'] = pd.to_datetime(noticias['DT_PUBLICACAO'])
+    base['VL_SENTIMENTO_SETORIAL'] = _sentimento_janela(base, noticias)
+
+    base['TARGET'] = base['VL_INADIMPLENCIA']
+    return base[COLUNAS_TREINO]
+
+
+def ler_tabelas_brutas(conn):
+    """Uma leitura de cada tabela (sem join nem subconsulta no banco)."""
+    return (pd.read_sql(SQL_BOLETOS, conn), pd.read_sql(SQL_EMPRESAS, conn),
+            pd.read_sql(SQL_MACRO, conn), pd.read_sql(SQL_NOTICIAS, conn))
+
+
+def carregar_treino_risco(conn, fonte=None):
+    """Dados de treino do risco pela fonte escolhida ('view' ou 'pandas'); mesmas colunas nas duas."""
+    fonte = fonte or FONTE_FEATURES
+    if fonte not in FONTES_FEATURES:
+        raise ValueError(f"Fonte de features inválida: {fonte}. Use uma de {FONTES_FEATURES}.")
+    if fonte == 'view':
+        return pd.read_sql("SELECT * FROM V_BF_TREINO_ML_RISCO", conn)
+    return construir_features_risco(*ler_tabelas_brutas(conn))
+
+
+def comparar_com_view(conn, tolerancia=1e-6):
+    """
+    Monta as features em pandas e confere coluna a coluna com a V_BF_TREINO_ML_RISCO.
+    Retorna True se tudo bate (números com tolerância `tolerancia`).
+    """
+    df_view = pd.read_sql("SELECT * FROM V_BF_TREINO_ML_RISCO", conn)
+    df_pandas = construir_features_risco(*ler_tabelas_brutas(conn))
+    return comparar_features(df_view, df_pandas, tolerancia)
+
+
+def comparar_features(df_view, df_pandas, tolerancia=1e-6):
+    if len(df_view) != len(df_pandas):
+        print(f"   ❌ Quantidade de linhas diferente: view={len(df_view)} pandas={len(df_pandas)}")
+        return False
+
+    chave = df_view['ID_BOLETO'].map(lambda v: v.hex() if isinstance(v, bytes) else v)
+    df_view = df_view.assign(_CHAVE=chave).sort_values('_CHAVE').reset_index(drop=True)
+    chave = df_pandas['ID_BOLETO'].map(lambda v: v.hex() if isinstance(v, bytes) else v)
+    df_pandas = df_pandas.assign(_CHAVE=chave).sort_values('_CHAVE').reset_index(drop=True)
+
+    ok = True
+    for col in COLUNAS_TREINO:
+        a, b = df_view[col], df_pandas[col]
+        if pd.api.types.is_numeric_dtype(a) and pd.api.types.is_numeric_dtype(b):
+            iguais = np.isclose(a.astype(float), b.astype(float), atol=tolerancia, equal_nan=True)
+        else:
+            iguais = (a.astype(str).str.strip() == b.astype(str).str.strip()).to_numpy()
+        if not iguais.all():
+            ok = False
+            print(f"   ❌ {col}: {int((~iguais).sum())} linha(s) diferente(s).")
+    if ok:
+        print(f"   ✅ Features em pandas idênticas à view ({len(df_view)} linhas).")
+    return ok
@@ -1,6 +1,5 @@
 import joblib
 import os
-import pandas as pd
 import warnings
 
 from src.utils_paths import resource_path
@@ -8,7 +7,10 @@ from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
-from src.db_connection import get_connection
+from src.db_connection import conexao
+from src.db_bulk import inserir_dataframe
+from src.ml_features import carregar_treino_risco
+from src.setores import setor_por_cnae
 
 # Silencia o aviso dramático do Pandas exigindo SQLAlchemy para o OracleDB
 warnings.filterwarnings(
@@ -35,18 +37,6 @@ def classificar_risco(prob):
         return 'BAIXO'
 
 
-def definir_setor(cnae):
-    try:
-        p = int(str(cnae)[:2])
-        if 1 <= p <= 3: return 'AGRO'
-        if 5 <= p <= 33 or 41 <= p <= 43: return 'INDUSTRIA'
-        if 45 <= p <= 47: return 'VAREJO'
-        if p >= 49: return 'SERVICOS'
-        return 'OUTROS'
-    except:
-        return 'OUTROS'
-
-
 def gerar_justificativa(row):
     motivos = []
     if row['VL_SCORE_QUANTIDADE'] < 100: motivos.append("Histórico de pagamentos insuficiente")
@@ -62,27 +52,29 @@ def gerar_justificativa(row):
     return ". ".join(motivos)[:250] + "."
 
 
-def calcular_risco_credito(force_retrain=False):
+def calcular_risco_credito(force_retrain=False, fonte=None):
+    """
+    `fonte`: 'view' (V_BF_TREINO_ML_RISCO) ou 'pandas' (features montadas em processo,
+    ver ml_features). Padrão: BF_FONTE_FEATURES.
+    """
     print("🧠 [ML Risco] Iniciando Cálculo...")
-    conn = get_connection()
-    if not conn: return
-
-    try:
-        df_treino = pd.read_sql("SELECT * FROM V_BF_TREINO_ML_RISCO", conn)
-        print(f"✅ Dados carregados! Total de linhas: {len(df_treino)}")
-    except Exception as e:
-        print(f"❌ Erro ao ler dados: {e}")
-        conn.close()
-        return
-    finally:
-        conn.close()  # Fecha aqui para liberar a conexão enquanto treina a IA
+    # Devolve a sessão ao pool ao sair do bloco, liberando-a enquanto treina a IA
+    with conexao() as conn:
+        if not conn: return
+
+        try:
+            df_treino = carregar_treino_risco(conn, fonte)
+            print(f"✅ Dados carregados! Total de linhas: {len(df_treino)}")
+        except Exception as e:
+            print(f"❌ Erro ao ler dados: {e}")
+            return
 
     if df_treino.empty:
         print("⚠️ Tabela de treino vazia. Execute o ETL primeiro.")
         return
 
     df_treino = df_treino.fillna(0)
-    df_treino['DS_SETOR'] = df_treino['CD_CNAE'].apply(definir_setor)
+    _, df_treino['DS_SETOR'] = setor_por_cnae(df_treino['CD_CNAE'])
 
     features = ['VL_NOMINAL', 'NR_PRAZO_DIAS', 'VL_SCORE_MATERIALIDADE', 'VL_SCORE_QUANTIDADE',
                 'TAX_SELIC', 'TAX_DOLAR', 'TAX_DESEMPREGO', 'INDICE_PIB', 'VAR_VAREJO', 'VAR_INDUSTRIA',
@@ -138,21 +130,25 @@ def calcular_risco_credito(force_retrain=False):
 
     df_final = df_treino[['ID_BOLETO', 'PROBABILIDADE', 'FAIXA_RISCO', 'DS_PRINCIPAL']].drop_duplicates(
         subset=['ID_BOLETO'])
-    dados_insert = df_final.values.tolist()
 
     # Salvar no Oracle
-    conn = get_connection()
-    if not conn: return
-    try:
-        cursor = conn.cursor()
-        print("🔌 Conectou ao Banco de Dados para Salvar...")
-        cursor.execute("TRUNCATE TABLE T_BF_PREDICOES")
-        cursor.executemany(
-            "INSERT INTO T_BF_PREDICOES (id_boleto, vl_probabilidade_inadimplencia, st_faixa_risco, ds_principal) VALUES (:1, :2, :3, :4)",
-            dados_insert)
-        conn.commit()
-        print(f"✅ SUCESSO! {cursor.rowcount} previsões salvas.")
-    except Exception as e:
-        print(f"❌ Erro ao salvar: {e}")
-    finally:
-        conn.close()
\ No newline at end of file
+    with conexao() as conn:
+        if not conn: return
+        try:
+            cursor = conn.cursor()
+            print("🔌 Conectou ao Banco de Dados para Salvar...")
+            # DELETE (e não TRUNCATE, que faz commit): se a carga falhar, as predições anteriores voltam
+            cursor.execute("DELETE FROM T_BF_PREDICOES")
+            # id_predicao e dt_processamento vêm de DEFAULT: sem carga direta aqui
+            gravadas, erros = inserir_dataframe(
+                conn, "T_BF_PREDICOES",
+                ['id_boleto', 'vl_probabilidade_inadimplencia', 'st_faixa_risco', 'ds_principal'],
+                df_final, direto=False)
+            if erros:
+                conn.rollback()
+                print(f"❌ {len(erros)} previsões rejeitadas pelo banco. Rollback executado (predições anteriores mantidas).")
+                return
+            conn.commit()
+            print(f"✅ SUCESSO! {gravadas} previsões salvas.")
+        except Exception as e:
+            print(f"❌ Erro ao salvar: {e}")
@@ -0,0 +1,144 @@
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+# ================= CONFIGURAÇÕES =================
+# Token bucket por host: (requisições por segundo, rajada máxima).
+# Compartilhado por etl_api (BCB / IBGE) e etl_nlp (Google News / DuckDuckGo).
+LIMITES_HOST = {
+    'api.bcb.gov.br': (2.0, 4),
+    'apisidra.ibge.gov.br': (2.0, 4),
+    'news.google.com': (1.0, 2),
+    'duckduckgo.com': (0.5, 1),
+}
+LIMITE_PADRAO = (float(os.getenv('BF_RATE_PADRAO', '2')), 4)
+# Teto do backoff exponencial (s) quando o servidor não manda Retry-After
+BACKOFF_MAXIMO = float(os.getenv('BF_BACKOFF_MAXIMO', '60'))
+
+
+class ErroTransitorio(RuntimeError):
+    """Falha que vale repetir (429, 5xx, rate limit). `retry_after` = segundos pedidos pelo servidor."""
+
+    def __init__(self, mensagem, retry_after=None):
+        super().__init__(mensagem)
+        self.retry_after = retry_after
+
+
+class LimitadorTaxa:
+    """
+    Token bucket thread-safe: `taxa` fichas por segundo, acumulando no máximo `rajada`.
+    penalizar() bloqueia o host inteiro (todas as threads) até o Retry-After passar.
+    """
+
+    def __init__(self, taxa, rajada):
+        self.taxa = taxa
+        self.rajada = rajada
+        self._fichas = float(rajada)
+        self._atualizado = time.monotonic()
+        self._bloqueado_ate = 0.0
+        self._lock = threading.Lock()
+
+    def _reservar(self):
+        """Consome uma ficha e devolve quantos segundos quem chamou deve esperar por ela."""
+        with self._lock:
+            agora = time.monotonic()
+            self._fichas = min(self.rajada, self._fichas + (agora - self._atualizado) * self.taxa)
+            self._atualizado = agora
+            self._fichas -= 1
+            espera = -self._fichas / self.taxa if self._fichas < 0 else 0.0
+            return max(espera, self._bloqueado_ate - agora)
+
+    def aguardar(self):
+        espera = self._reservar()
+        if espera > 0:
+            time.sleep(espera)
+        return espera
+
+    def penalizar(self, segundos):
+        with self._lock:
+            self._bloqueado_ate = max(self._bloqueado_ate, time.monotonic() + segundos)
+
+
+_limitadores = {}
+_metricas = {}
+_lock = threading.Lock()
+
+
+def _host(url_ou_host):
+    return urlsplit(url_ou_host).netloc if '://' in url_ou_host else url_ou_host
+
+
+def limitador(url_ou_host):
+    host = _host(url_ou_host)
+    with _lock:
+        if host not in _limitadores:
+            _limitadores[host] = LimitadorTaxa(*LIMITES_HOST.get(host, LIMITE_PADRAO))
+        return _limitadores[host]
+
+
+def registrar(url_ou_host, campo, valor=1):
+    """Campos: requisicoes, retries, throttles (429 / rate limit), espera_limitador_s, espera_backoff_s."""
+    host = _host(url_ou_host)
+    with _lock:
+        metricas = _metricas.setdefault(host, {'requisicoes': 0, 'retries': 0, 'throttles': 0,
+                                               'espera_limitador_s': 0.0, 'espera_backoff_s': 0.0})
+        metricas[campo] += valor
+
+
+def aguardar_vez(url_ou_host):
+    """Espera a ficha do host antes de cada requisição."""
+    espera = limitador(url_ou_host).aguardar()
+    registrar(url_ou_host, 'requisicoes')
+    if espera > 0:
+        registrar(url_ou_host, 'espera_limitador_s', espera)
+
+
+def ler_retry_after(valor):
+    """Retry-After em segundos ("120") ou data HTTP; None se ausente/inválido."""
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(valor).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def calcular_backoff(tentativa, base, jitter=0.0, retry_after=None):
+    """
+    Retry-After manda (o servidor sabe quanto falta); senão, exponencial com jitter
+    ("equal jitter": metade fixa + metade aleatória). Os dois são limitados a BACKOFF_MAXIMO:
+    um Retry-After de uma hora não pode parar o pipeline por uma hora.
+    """
+    if retry_after is not None:
+        return min(retry_after, BACKOFF_MAXIMO) + random.uniform(0, jitter)
+    teto = min(BACKOFF_MAXIMO, base * 2 ** (tentativa - 1))
+    return random.uniform(teto / 2, teto) + random.uniform(0, jitter)
+
+
+def dormir_backoff(url_ou_host, tentativa, base, jitter=0.0, retry_after=None):
+    """Dorme o backoff da tentativa e contabiliza. Com Retry-After, segura o host todo."""
+    espera = calcular_backoff(tentativa, base, jitter, retry_after)
+    if retry_after is not None:
+        limitador(url_ou_host).penalizar(min(retry_after, BACKOFF_MAXIMO))
+    registrar(url_ou_host, 'retries')
+    registrar(url_ou_host, 'espera_backoff_s', espera)
+    time.sleep(espera)
+    return espera
+
+
+def metricas_rate_limit():
+    with _lock:
+        return {host: dict(m) for host, m in _metricas.items()}
+
+
+def imprimir_metricas_rate_limit():
+    for host, m in metricas_rate_limit().items():
+        print(f"   🚦 [{host}] {m['requisicoes']} req | {m['retries']} retries | {m['throttles']} throttles | "
+              f"espera limitador {m['espera_limitador_s']:.1f}s | backoff {m['espera_backoff_s']:.1f}s")
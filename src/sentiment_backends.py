@@ -0,0 +1,175 @@
+import importlib.metadata
+import math
+import os
+import re
+import unicodedata
+
+# ================= CONFIGURAÇÕES =================
+# Backend de sentimento usado pelo etl_nlp (todos respondem predict() como o analyzer do pysentimiento):
+#   bert      -> BERT do pysentimiento em float32 (referência)
+#   bert_int8 -> mesmo modelo com as camadas Linear quantizadas para int8 (torch dynamic quantization):
+#                menos memória e mais títulos/s em CPU, com pequena perda de concordância
+#   lexico    -> léxico ponderado de termos econômicos (sem torch): para backfills grandes
+BACKENDS = ('bert', 'bert_int8', 'lexico')
+BACKEND_SENTIMENTO = os.getenv('BF_SENTIMENTO_BACKEND', 'bert')
+# Modelo usado no create_analyzer; entra na versão do cache de sentimento (cache_sentimento)
+TAREFA_SENTIMENTO = ('sentiment', 'pt')
+# Threads do PyTorch nos backends BERT (0 = padrão do torch)
+NLP_THREADS = int(os.getenv('BF_NLP_THREADS', '0'))
+
+# Léxico: radical (sem acento) -> peso. Um token conta se começar pelo radical; termos de até
+# 4 letras só valem como palavra inteira ("cai" não pega "caixa"). Expressões (com espaço) casam
+# a sequência exata de palavras e contam como um termo só.
+# Mudou o léxico? Suba VERSAO_LEXICO para invalidar os scores em cache.
+VERSAO_LEXICO = 4
+LEXICO = {
+    # Positivos
+    'alta': 1.0, 'avanc': 1.0, 'cresc': 1.0, 'recuper': 1.0, 'lucro': 1.0, 'lucra': 1.0, 'ganho': 0.8,
+    'ganha': 0.8, 'valoriz': 1.0, 'supera': 0.8, 'superavit': 1.0, 'record': 0.8, 'expan': 0.8, 'aqueci': 0.8,
+    'otimis': 1.0, 'melhor': 1.0, 'posit': 1.0, 'forte': 0.6, 'subiu': 0.8, 'sobe': 0.8, 'impuls': 0.8,
+    'aprov': 0.6, 'investiment': 0.4, 'emprego': 0.4, 'export': 0.4, 'estabil': 0.5,
+    'queda da inflacao': 1.0, 'inflacao em queda': 1.0, 'inflacao desacelera': 1.0, 'corte de juros': 0.8,
+    'queda dos juros': 0.8, 'juros em queda': 0.8, 'queda do desemprego': 1.0, 'desemprego cai': 1.0,
+    'desemprego recua': 1.0, 'corta juros': 0.8, 'corta os juros': 0.8, 'corta a selic': 0.8,
+    'corte da selic': 0.8, 'reduz a selic': 0.8, 'selic cai': 0.8, 'queda da selic': 0.8, 'selic em queda': 0.8,
+    'queda da inadimplencia': 1.0, 'queda na inadimplencia': 1.0, 'inadimplencia cai': 1.0,
+    'inadimplencia recua': 1.0,
+    # Negativos
+    'queda': -1.0, 'cai': -0.8, 'caiu': -0.8, 'caem': -0.8, 'recuo': -0.8, 'recua': -0.8, 'retra': -1.0,
+    'crise': -1.2, 'preju': -1.0, 'perda': -0.8, 'perde': -0.8, 'desvaloriz': -1.0, 'inadimpl': -1.2,
+    'falen': -1.5, 'recuperacao judicial': -1.5, 'calote': -1.5, 'divida': -0.6, 'endivid': -0.8,
+    'inflac': -0.6, 'desemprego': -1.0, 'demiss': -1.0, 'recess': -1.5,
+    'pessimis': -1.0, 'pior': -1.0, 'negativ': -1.0, 'fraco': -0.8, 'fraca': -0.8, 'risco': -0.5,
+    'incert': -0.6, 'tarifa': -0.4, 'seca': -0.8, 'quebra': -1.0, 'greve': -0.8, 'rebaix': -1.0,
+    'preocup': -0.8, 'desaceler': -0.8,
+    # "alta"/"sobe" são positivos, exceto quando quem sobe é juro (Selic) ou inflação
+    'alta dos juros': -0.8, 'alta de juros': -0.8, 'juros em alta': -0.8, 'juros sobem': -0.8,
+    'juros altos': -0.8, 'eleva juros': -0.8, 'eleva os juros': -0.8, 'eleva a selic': -0.8,
+    'selic sobe': -0.8, 'alta da selic': -0.8, 'selic em alta': -0.8, 'aumento da selic': -0.8,
+    'alta da inflacao': -1.2, 'inflacao em alta': -1.2, 'inflacao sobe': -1.2, 'inflacao acelera': -1.2,
+    'alta da inadimplencia': -1.5, 'inadimplencia em alta': -1.5, 'inadimplencia sobe': -1.5,
+}
+# Negação inverte o sinal do primeiro termo do léxico nas NEGACAO_JANELA palavras seguintes
+# ("não cresce", "não há crise", "sem sinais de recuperação"). Palavras vazias não gastam a janela.
+NEGACOES = {'nao', 'sem', 'nem', 'nunca'}
+NEGACAO_JANELA = 3
+PALAVRAS_VAZIAS = {'a', 'o', 'as', 'os', 'de', 'da', 'do', 'das', 'dos', 'na', 'no', 'nas', 'nos', 'em',
+                   'um', 'uma', 'e', 'ha', 'que', 'para'}
+# Inclinação do tanh que leva a soma dos pesos para [-1, 1]
+ESCALA_LEXICO = 0.6
+
+
+def _indexar_expressoes(lexico):
+    """Expressões por primeira palavra -> [(palavras, peso)], as mais longas primeiro."""
+    indice = {}
+    for termo, peso in sorted(lexico.items(), key=lambda item: -len(item[0].split())):
+        if ' ' in termo:
+            indice.setdefault(termo.split()[0], []).append((tuple(termo.split()), peso))
+    return indice
+
+
+_EXPRESSOES = _indexar_expressoes(LEXICO)
+_PALAVRAS = {termo: peso for termo, peso in LEXICO.items() if ' ' not in termo and len(termo) <= 4}
+_RADICAIS = [(termo, peso) for termo, peso in LEXICO.items() if ' ' not in termo and len(termo) > 4]
+
+
+class Resultado:
+    """Mesmo formato do AnalyzerOutput do pysentimiento (o etl_nlp só lê `probas`)."""
+
+    def __init__(self, probas):
+        self.probas = probas
+        self.output = max(probas, key=probas.get)
+
+
+def _sem_acento(texto):
+    return unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode('ascii')
+
+
+class AnalisadorLexico:
+    """Score = tanh(soma dos pesos dos termos do título): linear no léxico, sem modelo para carregar."""
+
+    @staticmethod
+    def _termo(tokens, i):
+        """(peso, palavras consumidas) do termo que começa em tokens[i]; expressão ganha da palavra solta."""
+        for expressao, peso in _EXPRESSOES.get(tokens[i], ()):
+            if tuple(tokens[i:i + len(expressao)]) == expressao:
+                return peso, len(expressao)
+        token = tokens[i]
+        return _PALAVRAS.get(token) or next((p for radical, p in _RADICAIS if token.startswith(radical)), 0.0), 1
+
+    def pontuar(self, texto):
+        tokens = re.findall(r"[a-z]+", _sem_acento(str(texto).lower()))
+        soma = 0.0
+        negar = 0  # palavras que ainda podem ser negadas
+        i = 0
+        while i < len(tokens):
+            token = tokens[i]
+            if token in NEGACOES:
+                negar = NEGACAO_JANELA
+                i += 1
+                continue
+            peso, tamanho = self._termo(tokens, i)
+            i += tamanho
+            if peso:
+                soma += -peso if negar else peso
+                negar = 0
+            elif token not in PALAVRAS_VAZIAS:
+                negar = max(negar - 1, 0)
+        return math.tanh(ESCALA_LEXICO * soma)
+
+    def predict(self, textos):
+        def resultado(texto):
+            score = self.pontuar(texto)
+            return Resultado({'POS': max(score, 0.0), 'NEG': max(-score, 0.0), 'NEU': 1.0 - abs(score)})
+
+        if isinstance(textos, str):
+            return resultado(textos)
+        return [resultado(texto) for texto in textos]
+
+
+def configurar_threads_torch():
+    import torch
+    if NLP_THREADS > 0:
+        torch.set_num_threads(NLP_THREADS)
+    print(f"   🧵 PyTorch com {torch.get_num_threads()} thread(s) de CPU.")
+
+
+def _criar_bert(quantizar=False):
+    from pysentimiento import create_analyzer
+    configurar_threads_torch()
+    tarefa, idioma = TAREFA_SENTIMENTO
+    analyzer = create_analyzer(task=tarefa, lang=idioma)
+    if quantizar:
+        import torch
+        # In-place: o Trainer interno do analyzer guarda a referência do mesmo modelo
+        torch.quantization.quantize_dynamic(analyzer.model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return analyzer
+
+
+def _validar(nome):
+    nome = nome or BACKEND_SENTIMENTO
+    if nome not in BACKENDS:
+        raise ValueError(f"Backend de sentimento inválido: {nome}. Use: {' | '.join(BACKENDS)}")
+    return nome
+
+
+def criar_backend(nome=None):
+    """Instancia o backend (BF_SENTIMENTO_BACKEND por padrão). torch/pysentimiento só entram nos BERT."""
+    nome = _validar(nome)
+    if nome == 'lexico':
+        return AnalisadorLexico()
+    return _criar_bert(quantizar=nome == 'bert_int8')
+
+
+def versao_backend(nome=None):
+    """Identifica o modelo para o cache de sentimento: trocar de backend ou de pysentimiento invalida os scores."""
+    nome = _validar(nome)
+    if nome == 'lexico':
+        return f"lexico-v{VERSAO_LEXICO}"
+    try:
+        pacote = importlib.metadata.version('pysentimiento')
+    except importlib.metadata.PackageNotFoundError:
+        pacote = 'desconhecida'
+    tarefa, idioma = TAREFA_SENTIMENTO
+    sufixo = '-int8' if nome == 'bert_int8' else ''
+    return f"pysentimiento-{pacote}/{tarefa}-{idioma}{sufixo}"
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+# ================= CONFIGURAÇÕES =================
+# Setor econômico pela divisão CNAE (2 primeiros dígitos). Fonte única do mapeamento:
+# T_BF_DIM_SETOR (banco), colunas ds_setor/vl_setor_macro da T_BF_EMPRESA (ingestão),
+# ml_risk e ml_features (pandas). Os nomes são os mesmos setores das notícias (etl_nlp).
+# (divisão inicial, divisão final, setor, código numérico usado como feature no ML)
+FAIXAS_SETOR = [
+    (1, 3, 'AGRO', 1),
+    (5, 33, 'INDUSTRIA', 2),
+    (41, 43, 'INDUSTRIA', 2),  # Construção civil
+    (45, 47, 'VAREJO', 3),
+    (49, 99, 'SERVICOS', 4),
+]
+# Divisões fora das faixas (e CNAE inválido) caem no mercado em geral
+SETOR_PADRAO = ('MERCADO', 5)
+
+# Tabelas de lookup indexadas pela divisão (0..99): um CNAE vira setor com um acesso a array
+NOMES_SETOR = np.full(100, SETOR_PADRAO[0], dtype=object)
+CODIGOS_SETOR = np.full(100, SETOR_PADRAO[1], dtype=np.int8)
+for _inicio, _fim, _nome, _codigo in FAIXAS_SETOR:
+    NOMES_SETOR[_inicio:_fim + 1] = _nome
+    CODIGOS_SETOR[_inicio:_fim + 1] = _codigo
+
+
+def divisao_cnae(cnae):
+    """Série de CNAE (texto de 7 dígitos) -> divisão (int 0..99); inválido/ausente vira 0 (setor padrão)."""
+    divisao = pd.to_numeric(pd.Series(cnae).astype(str).str[:2], errors='coerce').to_numpy()
+    return np.nan_to_num(divisao, nan=0).astype(np.int64).clip(0, 99)
+
+
+def setor_por_cnae(cnae):
+    """Série de CNAE -> (código numérico do setor, nome do setor), vetorizado."""
+    divisao = divisao_cnae(cnae)
+    return CODIGOS_SETOR[divisao], NOMES_SETOR[divisao]
+
+
+def linhas_dim_setor():
+    """Linhas da T_BF_DIM_SETOR: (cd_divisao, ds_setor, vl_setor_macro) para as 100 divisões."""
+    return [(f"{divisao:02d}", NOMES_SETOR[divisao], int(CODIGOS_SETOR[divisao])) for divisao in range(100)]
@@ -1,6 +1,166 @@
-from src.db_connection import get_connection
+import os
+from src.chaves import CHAVES_COMPACTAS, TIPO_ID
+from src.db_connection import conexao
+from src.setores import linhas_dim_setor
 import oracledb
 
+# ================= CONFIGURAÇÕES =================
+# Particionamento e compressão dependem da edição do Oracle (XE/Free não têm Partitioning
+# nem Advanced Compression): ficam desligados por padrão.
+# BF_PARTICIONAR=1   -> T_BF_BOLETO particionada por mês de vencimento (interval partitioning)
+# BF_COMPRESSAO=BASIC|ADVANCED -> compressão das tabelas de histórico
+#   (BASIC só comprime cargas em caminho direto, ver BF_CARGA_DIRETA no db_bulk)
+PARTICIONAR = os.getenv('BF_PARTICIONAR', '0') == '1'
+COMPRESSAO = os.getenv('BF_COMPRESSAO', '').upper()
+
+PARTICOES = {
+    'T_BF_BOLETO': ("PARTITION BY RANGE (dt_vencimento) INTERVAL (NUMTOYMINTERVAL(1, 'MONTH')) "
+                    "(PARTITION P_BF_BOLETO_INICIAL VALUES LESS THAN (DATE '2000-01-01'))"),
+}
+TABELAS_HISTORICO = ['T_BF_BOLETO', 'T_BF_MACRO_ECONOMIA', 'T_BF_NOTICIAS']
+
+# Índices de apoio às views e refreshes: (nome, tabela, colunas, local à partição)
+INDICES = [
+    # Join com o sentimento diário por setor
+    ('IX_BF_EMPRESA_SETOR', 'T_BF_EMPRESA', 'ds_setor', False),
+    # FK boleto -> empresa (join das views, V_BF_TREINO_ML_CLUSTER agrupa por pagador)
+    ('IX_BF_BOLETO_PAGADOR', 'T_BF_BOLETO', 'id_pagador', False),
+    # Limites da grade de features (MIN/MAX) e filtros por período
+    ('IX_BF_BOLETO_VENCIMENTO', 'T_BF_BOLETO', 'dt_vencimento', True),
+    # Agregação diária do sentimento (janela por setor e data de publicação)
+    ('IX_BF_NOTICIAS_SETOR_DATA', 'T_BF_NOTICIAS', 'ds_setor, dt_publicacao', False),
+    ('IX_BF_NOTICIAS_DATA', 'T_BF_NOTICIAS', 'dt_publicacao', False),
+]
+# Já cobertos pelo índice de uma constraint (conferidos pelo verificar_indices, não criados aqui)
+INDICES_DE_CONSTRAINT = [
+    # As-of macro: nm_indicador = ? AND sg_uf = ? AND dt_referencia <= ?
+    ('UN_BF_MACRO_ECONOMIA', 'T_BF_MACRO_ECONOMIA', 'nm_indicador, sg_uf, dt_referencia', False),
+    ('UN_BF_PREDICOES', 'T_BF_PREDICOES', 'id_boleto, dt_processamento', False),
+    ('PK_BF_FEATURES_MACRO', 'T_BF_FEATURES_MACRO', 'sg_uf, dt_mes', False),
+    ('PK_BF_SENTIMENTO_DIARIO', 'T_BF_SENTIMENTO_DIARIO', 'ds_setor, dt_dia', False),
+    # Carga incremental de notícias: quais títulos já estão no banco
+    ('UN_BF_NOTICIAS_HASH', 'T_BF_NOTICIAS', 'cd_hash', False),
+]
+
+# Sequences com CACHE: NOCACHE serializa cada NEXTVAL (um acesso ao dicionário por linha)
+# nas cargas em lote de notícias e predições. Buracos na numeração são aceitáveis (ids técnicos).
+SEQUENCIAS = {
+    'SQ_BF_MACRO_ECONOMIA': 100,
+    'SQ_BF_NOTICIAS': 1000,
+    'SQ_BF_PREDICOES': 1000,
+}
+
+# ================= TABELAS DERIVADAS =================
+# DDLs usadas tanto na recriação do banco quanto nas migrações (src/migrations.py)
+SQL_DIM_SETOR = """
+                CREATE TABLE T_BF_DIM_SETOR \
+                ( \
+                    cd_divisao     CHAR(2) NOT NULL, \
+                    ds_setor       VARCHAR2(20) NOT NULL, \
+                    vl_setor_macro NUMBER(2) NOT NULL, \
+                    CONSTRAINT PK_BF_DIM_SETOR PRIMARY KEY (cd_divisao) \
+                ) \
+                """
+
+SQL_FEATURES_MACRO = """
+                     CREATE TABLE T_BF_FEATURES_MACRO \
+                     ( \
+                         sg_uf          CHAR(2) NOT NULL, \
+                         dt_mes         DATE    NOT NULL, \
+                         tax_selic      NUMBER, \
+                         tax_dolar      NUMBER, \
+                         tax_desemprego NUMBER, \
+                         indice_pib     NUMBER, \
+                         var_varejo     NUMBER, \
+                         var_industria  NUMBER, \
+                         var_servicos   NUMBER, \
+                         var_agro       NUMBER, \
+                         var_pecuaria   NUMBER, \
+                         dt_atualizacao DATE DEFAULT SYSDATE, \
+                         CONSTRAINT PK_BF_FEATURES_MACRO PRIMARY KEY (sg_uf, dt_mes)
+                     ) \
+                     """
+
+SQL_SENTIMENTO_DIARIO = """
+                        CREATE TABLE T_BF_SENTIMENTO_DIARIO \
+                        ( \
+                            ds_setor       VARCHAR2(20) NOT NULL, \
+                            dt_dia         DATE         NOT NULL, \
+                            vl_soma        NUMBER       NOT NULL, \
+                            qt_noticias    NUMBER(10)   NOT NULL, \
+                            vl_media_30d   NUMBER, \
+                            dt_atualizacao DATE DEFAULT SYSDATE, \
+                            CONSTRAINT PK_BF_SENTIMENTO_DIARIO PRIMARY KEY (ds_setor, dt_dia) \
+                        ) \
+                        """
+
+SQL_ANALISE_PBI = """
+                  CREATE TABLE T_BF_ANALISE_PBI \
+                  ( \
+                      id_boleto                VARCHAR2(64) NOT NULL, \
+                      vl_nominal               NUMBER(15,2), \
+                      dt_emissao               DATE, \
+                      dt_vencimento            DATE, \
+                      nr_dias_atraso           NUMBER(5), \
+                      st_pagamento             VARCHAR2(20), \
+                      id_empresa               VARCHAR2(64), \
+                      cd_cnae                  VARCHAR2(7), \
+                      sg_uf                    CHAR(2), \
+                      ds_setor_economico       VARCHAR2(20), \
+                      vl_score_risco           NUMBER, \
+                      ds_faixa_risco           VARCHAR2(20), \
+                      ds_motivo_risco          VARCHAR2(100), \
+                      ds_perfil_comportamental VARCHAR2(100), \
+                      vl_sentimento_setor      NUMBER, \
+                      ds_humor_mercado         VARCHAR2(20), \
+                      dt_atualizacao           DATE DEFAULT SYSDATE, \
+                      CONSTRAINT PK_BF_ANALISE_PBI PRIMARY KEY (id_boleto) \
+                  ) \
+                  """
+
+# Staging da ingestão incremental (MERGE). Tabelas temporárias: cada sessão só enxerga
+# o próprio delta, que some no COMMIT
+SQL_STG_EMPRESA = f"""
+                  CREATE GLOBAL TEMPORARY TABLE T_BF_STG_EMPRESA \
+                  ( \
+                      id_empresa             {TIPO_ID} NOT NULL, \
+                      cd_cnae                VARCHAR2(7) NOT NULL, \
+                      sg_uf                  CHAR(2) NOT NULL, \
+                      vl_score_materialidade NUMBER(10,2), \
+                      vl_score_quantidade    NUMBER(10,2), \
+                      ds_setor               VARCHAR2(20), \
+                      vl_setor_macro         NUMBER(2) \
+                  ) ON COMMIT DELETE ROWS \
+                  """
+
+SQL_STG_BOLETO = f"""
+                 CREATE GLOBAL TEMPORARY TABLE T_BF_STG_BOLETO \
+                 ( \
+                     id_boleto        {TIPO_ID} NOT NULL, \
+                     id_pagador       {TIPO_ID} NOT NULL, \
+                     id_beneficiario  {TIPO_ID} NOT NULL, \
+                     vl_nominal       NUMBER(15,2) NOT NULL, \
+                     vl_baixa         NUMBER(15,2), \
+                     dt_emissao       DATE NOT NULL, \
+                     dt_vencimento    DATE NOT NULL, \
+                     dt_pagamento     DATE, \
+                     tp_baixa         VARCHAR2(100), \
+                     nr_dias_atraso   NUMBER(5) NOT NULL, \
+                     vl_inadimplencia NUMBER(1) NOT NULL \
+                 ) ON COMMIT DELETE ROWS \
+                 """
+
+SQL_CONTROLE_REFRESH = """
+                       CREATE TABLE T_BF_CONTROLE_REFRESH \
+                       ( \
+                           nm_objeto  VARCHAR2(60) NOT NULL, \
+                           dt_refresh DATE NOT NULL, \
+                           qt_linhas  NUMBER(12), \
+                           CONSTRAINT PK_BF_CONTROLE_REFRESH PRIMARY KEY (nm_objeto) \
+                       ) \
+                       """
+
+
 def executar_ddl(cursor, sql, mensagem):
     try:
         cursor.execute(sql)
@@ -15,23 +175,109 @@ def executar_ddl(cursor, sql, mensagem):
             print(f"   ❌ Erro ao {mensagem}: {e}")
 
 
+def armazenamento(tabela):
+    """Cláusulas físicas (compressão/particionamento) a acrescentar no CREATE TABLE da tabela."""
+    clausulas = []
+    if COMPRESSAO in ('BASIC', 'ADVANCED') and tabela in TABELAS_HISTORICO:
+        clausulas.append(f"ROW STORE COMPRESS {COMPRESSAO}")
+    if PARTICIONAR and tabela in PARTICOES:
+        clausulas.append(PARTICOES[tabela])
+    return " " + " ".join(clausulas) if clausulas else ""
+
+
+def sql_indice(nome, tabela, colunas, local):
+    particionada = PARTICIONAR and tabela in PARTICOES
+    return f"CREATE INDEX {nome} ON {tabela} ({colunas}){' LOCAL' if local and particionada else ''}"
+
+
+def criar_indices(cursor, indices=INDICES):
+    for nome, tabela, colunas, local in indices:
+        executar_ddl(cursor, sql_indice(nome, tabela, colunas, local), f"Índice {nome}")
+
+
+def verificar_indices(criar=False):
+    """
+    Confere num schema já existente se cada índice do plano (INDICES + INDICES_DE_CONSTRAINT)
+    está coberto por algum índice da tabela com as mesmas colunas à esquerda, seja qual for
+    o nome. Reporta os que faltam e, com criar=True, cria os de INDICES.
+    Retorna a lista dos faltantes.
+    """
+    print("\n🔎 [SETUP] Verificando índices...")
+    with conexao() as conn:
+        if not conn: return None
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT table_name, LISTAGG(LOWER(column_name), ', ') WITHIN GROUP (ORDER BY column_position)
+            FROM USER_IND_COLUMNS
+            GROUP BY table_name, index_name
+        """)
+        existentes = {}
+        for tabela, colunas in cursor.fetchall():
+            existentes.setdefault(tabela, []).append(colunas)
+
+        faltando = []
+        for indice in INDICES + INDICES_DE_CONSTRAINT:
+            nome, tabela, colunas, _ = indice
+            if tabela not in existentes:
+                print(f"   ⚠️ {tabela} não existe (rode o setup).")
+                continue
+            if any(c == colunas or c.startswith(colunas + ', ') for c in existentes[tabela]):
+                continue
+            faltando.append(indice)
+            print(f"   ❌ Falta índice em {tabela} ({colunas}) — esperado {nome}.")
+
+        if not faltando:
+            print("   ✅ Todos os índices do plano existem.")
+        elif criar:
+            criar_indices(cursor, [i for i in faltando if i in INDICES])
+        return faltando
+
+
+def carregar_dim_setor(cursor):
+    """(Re)carrega a T_BF_DIM_SETOR a partir do src/setores.py."""
+    cursor.execute("DELETE FROM T_BF_DIM_SETOR")
+    cursor.executemany("INSERT INTO T_BF_DIM_SETOR (cd_divisao, ds_setor, vl_setor_macro) VALUES (:1, :2, :3)",
+                       linhas_dim_setor())
+
+
+def sql_sequencia(nome):
+    return f"CREATE SEQUENCE {nome} START WITH 1 INCREMENT BY 1 CACHE {SEQUENCIAS[nome]} NOCYCLE"
+
+
 def recriar_banco_dados():
     print("\n🏗️ [SETUP] Recriando Estrutura do Banco de Dados...")
-    conn = get_connection()
-    if not conn: return
+    print(f"   🔑 Ids como {TIPO_ID} ({'compactos' if CHAVES_COMPACTAS else 'hex'}).")
+    with conexao() as conn:
+        if not conn: return
+        _recriar_objetos(conn)
+        # Schema novo já nasce na última versão: o migrate não tem nada a aplicar
+        # (import local: o migrations importa este módulo)
+        from src.migrations import marcar_versao_atual
+        marcar_versao_atual(conn)
+    print("\n✅ Estrutura de Banco de Dados finalizada com sucesso!")
+
 
+def _recriar_objetos(conn):
     cursor = conn.cursor()
 
     # =========================================================================
     # 1. LIMPEZA (DROPS)
     # =========================================================================
     print("\n   --- Limpando Ambiente ---")
+    executar_ddl(cursor, "DROP TABLE T_BF_STG_BOLETO", "Drop T_BF_STG_BOLETO")
+    executar_ddl(cursor, "DROP TABLE T_BF_STG_EMPRESA", "Drop T_BF_STG_EMPRESA")
+    executar_ddl(cursor, "DROP TABLE T_BF_FEATURES_MACRO", "Drop T_BF_FEATURES_MACRO")
+    executar_ddl(cursor, "DROP TABLE T_BF_SENTIMENTO_DIARIO", "Drop T_BF_SENTIMENTO_DIARIO")
+    executar_ddl(cursor, "DROP TABLE T_BF_ANALISE_PBI", "Drop T_BF_ANALISE_PBI")
+    executar_ddl(cursor, "DROP TABLE T_BF_CONTROLE_REFRESH", "Drop T_BF_CONTROLE_REFRESH")
+    executar_ddl(cursor, "DROP TABLE T_BF_SCHEMA_VERSAO", "Drop T_BF_SCHEMA_VERSAO")
     executar_ddl(cursor, "DROP TABLE T_BF_PREDICOES CASCADE CONSTRAINTS", "Drop T_BF_PREDICOES")
     executar_ddl(cursor, "DROP TABLE T_BF_NOTICIAS CASCADE CONSTRAINTS", "Drop T_BF_NOTICIAS")
     executar_ddl(cursor, "DROP TABLE T_BF_MACRO_ECONOMIA CASCADE CONSTRAINTS", "Drop T_BF_MACRO_ECONOMIA")
     executar_ddl(cursor, "DROP TABLE T_BF_CLUSTER CASCADE CONSTRAINTS", "Drop T_BF_CLUSTER")
     executar_ddl(cursor, "DROP TABLE T_BF_BOLETO CASCADE CONSTRAINTS", "Drop T_BF_BOLETO")
     executar_ddl(cursor, "DROP TABLE T_BF_EMPRESA CASCADE CONSTRAINTS", "Drop T_BF_EMPRESA")
+    executar_ddl(cursor, "DROP TABLE T_BF_DIM_SETOR CASCADE CONSTRAINTS", "Drop T_BF_DIM_SETOR")
 
     executar_ddl(cursor, "DROP SEQUENCE SQ_BF_PREDICOES", "Drop SQ_BF_PREDICOES")
     executar_ddl(cursor, "DROP SEQUENCE SQ_BF_NOTICIAS", "Drop SQ_BF_NOTICIAS")
@@ -41,32 +287,34 @@ def recriar_banco_dados():
     # 2. SEQUENCES
     # =========================================================================
     print("\n   --- Criando Sequences ---")
-    executar_ddl(cursor, """
-        CREATE SEQUENCE SQ_BF_MACRO_ECONOMIA START WITH 1 INCREMENT BY 1 NOCACHE NOCYCLE
-    """, "Sequence Macro")
-
-    executar_ddl(cursor, """
-        CREATE SEQUENCE SQ_BF_NOTICIAS START WITH 1 INCREMENT BY 1 NOCACHE NOCYCLE
-    """, "Sequence Notícias")
-
-    executar_ddl(cursor, """
-        CREATE SEQUENCE SQ_BF_PREDICOES START WITH 1 INCREMENT BY 1 NOCACHE NOCYCLE
-    """, "Sequence Predições")
+    executar_ddl(cursor, sql_sequencia('SQ_BF_MACRO_ECONOMIA'), "Sequence Macro")
+    executar_ddl(cursor, sql_sequencia('SQ_BF_NOTICIAS'), "Sequence Notícias")
+    executar_ddl(cursor, sql_sequencia('SQ_BF_PREDICOES'), "Sequence Predições")
 
     # =========================================================================
     # 3. TABELAS
     # =========================================================================
     print("\n   --- Criando Tabelas ---")
 
+    # DIMENSÃO SETOR (divisão CNAE -> setor econômico, mesmo mapeamento do src/setores.py)
+    executar_ddl(cursor, SQL_DIM_SETOR, "Tabela T_BF_DIM_SETOR")
+    try:
+        carregar_dim_setor(cursor)
+        print("   ✅ Carga T_BF_DIM_SETOR")
+    except oracledb.DatabaseError as e:
+        print(f"   ❌ Erro ao carregar T_BF_DIM_SETOR: {e}")
+
     # EMPRESA
-    sql_empresa = """
+    sql_empresa = f"""
                   CREATE TABLE T_BF_EMPRESA \
                   ( \
-                      id_empresa             VARCHAR2(64) NOT NULL, \
+                      id_empresa             {TIPO_ID} NOT NULL, \
                       cd_cnae                VARCHAR2(7) NOT NULL, \
                       sg_uf                  CHAR(2) NOT NULL, \
                       vl_score_materialidade NUMBER(10,2), \
                       vl_score_quantidade    NUMBER(10,2), \
+                      ds_setor               VARCHAR2(20), \
+                      vl_setor_macro         NUMBER(2), \
                       CONSTRAINT PK_BF_EMPRESA PRIMARY KEY (id_empresa), \
                       CONSTRAINT CK_BF_EMPRESA_SG_UF CHECK (sg_uf IN \
                                                             ('AC', 'AL', 'AP', 'AM', 'BA', 'CE', 'DF', 'ES', 'GO', \
@@ -78,12 +326,12 @@ def recriar_banco_dados():
     executar_ddl(cursor, sql_empresa, "Tabela T_BF_EMPRESA")
 
     # BOLETO
-    sql_boleto = """
+    sql_boleto = f"""
                  CREATE TABLE T_BF_BOLETO \
                  ( \
-                     id_boleto        VARCHAR2(64) NOT NULL, \
-                     id_pagador       VARCHAR2(64) NOT NULL, \
-                     id_beneficiario  VARCHAR2(64) NOT NULL, \
+                     id_boleto        {TIPO_ID} NOT NULL, \
+                     id_pagador       {TIPO_ID} NOT NULL, \
+                     id_beneficiario  {TIPO_ID} NOT NULL, \
                      vl_nominal       NUMBER(15,2) NOT NULL, \
                      vl_baixa         NUMBER(15,2), \
                      dt_emissao       DATE NOT NULL, \
@@ -97,13 +345,13 @@ def recriar_banco_dados():
                      CONSTRAINT CK_BF_VL_INADIMPLENCIA CHECK (vl_inadimplencia IN (0, 1))
                  ) \
                  """
-    executar_ddl(cursor, sql_boleto, "Tabela T_BF_BOLETO")
+    executar_ddl(cursor, sql_boleto + armazenamento('T_BF_BOLETO'), "Tabela T_BF_BOLETO")
 
     # CLUSTER
-    sql_cluster = """
+    sql_cluster = f"""
                   CREATE TABLE T_BF_CLUSTER \
                   ( \
-                      id_boleto        VARCHAR2(64) NOT NULL, \
+                      id_boleto        {TIPO_ID} NOT NULL, \
                       dt_processamento DATE DEFAULT SYSDATE, \
                       nr_cluster       NUMBER(2) NOT NULL, \
                       ds_perfil        VARCHAR2(100) NOT NULL, \
@@ -123,13 +371,17 @@ def recriar_banco_dados():
                     nm_indicador      VARCHAR2(50) NOT NULL, \
                     vl_indicador      NUMBER(20, 6) NOT NULL, \
                     CONSTRAINT PK_BF_MACRO_ECONOMIA PRIMARY KEY (id_macro_economia), \
+                    CONSTRAINT UN_BF_MACRO_ECONOMIA UNIQUE (nm_indicador, sg_uf, dt_referencia), \
                     CONSTRAINT CK_BF_MACRO_SG_UF CHECK (sg_uf IN ('AC', 'AL', 'AP', 'AM', 'BA', 'CE', 'DF', 'ES', 'GO', \
                                                                   'MA', 'MT', 'MS', 'MG', 'PA', 'PB', 'PR', 'PE', 'PI', \
                                                                   'RJ', 'RN', 'RS', 'RO', 'RR', 'SC', 'SP', 'SE', 'TO', \
                                                                   'ND', 'BR'))
                 ) \
                 """
-    executar_ddl(cursor, sql_macro, "Tabela T_BF_MACRO_ECONOMIA")
+    executar_ddl(cursor, sql_macro + armazenamento('T_BF_MACRO_ECONOMIA'), "Tabela T_BF_MACRO_ECONOMIA")
+
+    # FEATURES MACRO (as-of por UF e mês, recalculada a cada carga macro)
+    executar_ddl(cursor, SQL_FEATURES_MACRO, "Tabela T_BF_FEATURES_MACRO")
 
     # NOTICIAS
     sql_noticias = """
@@ -141,18 +393,26 @@ def recriar_banco_dados():
                        vl_sentimento NUMBER(5,2), \
                        dt_publicacao DATE DEFAULT SYSDATE, \
                        tx_link       VARCHAR2(2000), \
+                       cd_hash       VARCHAR2(64), \
+                       ds_modelo     VARCHAR2(80), \
                        CONSTRAINT PK_BF_NOTICIAS PRIMARY KEY (id_noticia), \
+                       CONSTRAINT UN_BF_NOTICIAS_HASH UNIQUE (cd_hash), \
                        CONSTRAINT CK_BF_NOTICIAS_VL_SENTIMENTO CHECK (vl_sentimento >= -1.00 AND vl_sentimento <= 1.00)
                    ) \
                    """
-    executar_ddl(cursor, sql_noticias, "Tabela T_BF_NOTICIAS")
+    executar_ddl(cursor, sql_noticias + armazenamento('T_BF_NOTICIAS'), "Tabela T_BF_NOTICIAS")
+
+    # SENTIMENTO DIÁRIO (soma/contagem por setor e dia + média móvel de 30 dias)
+    # Calendário denso: toda data de vencimento coberta tem linha, inclusive dias sem notícia
+    # ds_setor = 'TODOS' agrega o mercado inteiro (humor do mercado no Power BI)
+    executar_ddl(cursor, SQL_SENTIMENTO_DIARIO, "Tabela T_BF_SENTIMENTO_DIARIO")
 
     # PREDICOES
-    sql_predicoes = """
+    sql_predicoes = f"""
                     CREATE TABLE T_BF_PREDICOES \
                     ( \
                         id_predicao                    NUMBER(10) DEFAULT SQ_BF_PREDICOES.NEXTVAL NOT NULL, \
-                        id_boleto                      VARCHAR2(64) NOT NULL, \
+                        id_boleto                      {TIPO_ID} NOT NULL, \
                         dt_processamento               DATE DEFAULT SYSDATE, \
                         vl_probabilidade_inadimplencia NUMBER(5, 4), \
                         st_faixa_risco                 VARCHAR2(20), \
@@ -164,7 +424,20 @@ def recriar_banco_dados():
                     """
     executar_ddl(cursor, sql_predicoes, "Tabela T_BF_PREDICOES")
 
+    # ANÁLISE PBI materializada (mesmas colunas da V_BF_ANALISE_PBI, ids sempre em hex)
+    executar_ddl(cursor, SQL_ANALISE_PBI, "Tabela T_BF_ANALISE_PBI")
+
+    # CONTROLE DE REFRESH (último refresh de cada tabela derivada)
+    executar_ddl(cursor, SQL_CONTROLE_REFRESH, "Tabela T_BF_CONTROLE_REFRESH")
+
+    # STAGING (ingestão incremental via MERGE)
+    executar_ddl(cursor, SQL_STG_EMPRESA, "Tabela T_BF_STG_EMPRESA")
+    executar_ddl(cursor, SQL_STG_BOLETO, "Tabela T_BF_STG_BOLETO")
+
+    # =========================================================================
+    # 4. ÍNDICES
+    # =========================================================================
+    print("\n   --- Criando Índices ---")
+    criar_indices(cursor)
+
     conn.commit()
-    if conn:
-        conn.close()
-    print("\n✅ Estrutura de Banco de Dados finalizada com sucesso!")
\ No newline at end of file
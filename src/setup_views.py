@@ -1,21 +1,210 @@
-from src.db_connection import get_connection
+import os
+from src.chaves import id_exportado, id_importado
+from src.db_connection import conexao
 
 def alimentar_tabela(view, sql):
-    conn = get_connection()
-
-    if not conn: return
-    if conn:
-        cursor = conn.cursor()
-    try:
-        cursor.execute(sql)
-        print(f"   ✅ View {view} atualizada.")
-    except Exception as e:
-        print(f"   ❌ Erro View Power BI: {e}")
-    finally:
-        conn.close()
+    with conexao() as conn:
+        if not conn: return
+        try:
+            cursor = conn.cursor()
+            cursor.execute(sql)
+            print(f"   ✅ View {view} atualizada.")
+        except Exception as e:
+            print(f"   ❌ Erro View Power BI: {e}")
+
+# Indicadores macro da T_BF_FEATURES_MACRO: (coluna, indicador, fallback quando a UF não tem dado)
+#   - 'BR'    -> valor nacional do mesmo mês
+#   - 'MEDIA' -> média histórica do indicador (todas as UFs e datas)
+#   - None    -> indicador já é nacional
+FEATURES_MACRO = [
+    ('tax_selic', 'SELIC', None),
+    ('tax_dolar', 'DOLAR', None),
+    ('tax_desemprego', 'TAX_DESEMPREGO', None),
+    ('indice_pib', 'IBC-BR', None),
+    ('var_varejo', 'IND_VAREJO', 'MEDIA'),
+    ('var_industria', 'IND_INDUSTRIA', 'BR'),
+    ('var_servicos', 'IND_SERVICOS', 'MEDIA'),
+    ('var_agro', 'IND_AGRO', 'MEDIA'),
+    ('var_pecuaria', 'IND_PECUARIA', 'MEDIA'),
+]
+
+
+NACIONAL = "'BR'"
+
+
+def _sql_asof(indicador, uf):
+    # Último valor publicado até o 1º dia do mês (as séries são mensais, datadas no dia 01)
+    return f"""(SELECT MAX(m.vl_indicador) KEEP (DENSE_RANK LAST ORDER BY m.dt_referencia)
+                 FROM T_BF_MACRO_ECONOMIA m
+                 WHERE m.nm_indicador = '{indicador}' AND m.sg_uf = {uf} AND m.dt_referencia <= g.dt_mes)"""
+
+
+def _sql_feature(indicador, fallback):
+    if fallback is None:
+        return _sql_asof(indicador, NACIONAL)
+    if fallback == 'BR':
+        return f"COALESCE({_sql_asof(indicador, 'u.sg_uf')}, {_sql_asof(indicador, NACIONAL)})"
+    return (f"COALESCE({_sql_asof(indicador, 'u.sg_uf')}, "
+            f"(SELECT a.vl_media FROM medias a WHERE a.nm_indicador = '{indicador}'))")
+
+
+def atualizar_features_macro():
+    """
+    Recalcula a T_BF_FEATURES_MACRO: uma linha por (UF, mês) com o valor as-of de cada
+    indicador (forward-fill) e os fallbacks já aplicados. A grade cobre os meses dos
+    boletos e da macro; o custo depende de UFs x meses, não da quantidade de boletos.
+    Chamar após cada carga macro (etl_api) e antes de ler a V_BF_TREINO_ML_RISCO.
+    """
+    colunas = ", ".join(coluna for coluna, _, _ in FEATURES_MACRO)
+    valores = ",\n                ".join(f"{_sql_feature(indicador, fallback)} AS {coluna}"
+                                       for coluna, indicador, fallback in FEATURES_MACRO)
+    sql_features = f"""
+        INSERT INTO T_BF_FEATURES_MACRO (sg_uf, dt_mes, {colunas})
+        WITH limites AS (
+            SELECT LEAST(NVL((SELECT TRUNC(MIN(dt_vencimento), 'MM') FROM T_BF_BOLETO), DATE '9999-12-01'),
+                         NVL((SELECT TRUNC(MIN(dt_referencia), 'MM') FROM T_BF_MACRO_ECONOMIA), DATE '9999-12-01')) AS dt_ini,
+                   GREATEST(NVL((SELECT TRUNC(MAX(dt_vencimento), 'MM') FROM T_BF_BOLETO), DATE '0001-01-01'),
+                            NVL((SELECT TRUNC(MAX(dt_referencia), 'MM') FROM T_BF_MACRO_ECONOMIA), DATE '0001-01-01')) AS dt_fim
+            FROM dual
+        ),
+        meses AS (
+            SELECT ADD_MONTHS(dt_ini, LEVEL - 1) AS dt_mes FROM limites
+            CONNECT BY LEVEL <= MONTHS_BETWEEN(dt_fim, dt_ini) + 1
+        ),
+        ufs AS (
+            SELECT sg_uf FROM T_BF_EMPRESA
+            UNION
+            SELECT sg_uf FROM T_BF_MACRO_ECONOMIA
+        ),
+        medias AS (
+            SELECT nm_indicador, AVG(vl_indicador) AS vl_media FROM T_BF_MACRO_ECONOMIA GROUP BY nm_indicador
+        )
+        SELECT u.sg_uf, g.dt_mes,
+                {valores}
+        FROM ufs u
+        CROSS JOIN meses g
+        WHERE g.dt_mes <= (SELECT dt_fim FROM limites)
+        """
+
+    with conexao() as conn:
+        if not conn: return
+        try:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM T_BF_FEATURES_MACRO")
+            cursor.execute(sql_features)
+            total = cursor.rowcount
+            registrar_refresh(cursor, 'T_BF_FEATURES_MACRO', total)
+            conn.commit()
+            print(f"   ✅ T_BF_FEATURES_MACRO recalculada ({total} linhas UF x mês).")
+        except Exception as e:
+            conn.rollback()
+            print(f"   ❌ Erro ao recalcular T_BF_FEATURES_MACRO: {e}")
+
+
+# Janela do sentimento setorial: notícias de (vencimento - 30) até o dia do vencimento
+JANELA_SENTIMENTO_DIAS = 30
+SETOR_TODOS = 'TODOS'
+
+# Recalcula os dias [dt_ini, dt_fim + 30]: são os que enxergam notícias publicadas entre dt_ini e dt_fim.
+# O calendário começa 30 dias antes para a média móvel do primeiro dia já ter a janela completa.
+SQL_MERGE_SENTIMENTO = f"""
+    MERGE INTO T_BF_SENTIMENTO_DIARIO t
+    USING (
+        WITH dias AS (
+            SELECT :dt_ini - {JANELA_SENTIMENTO_DIAS} + LEVEL - 1 AS dt_dia FROM dual
+            CONNECT BY LEVEL <= (:dt_fim - :dt_ini) + 2 * {JANELA_SENTIMENTO_DIAS} + 1
+        ),
+        diario AS (
+            SELECT NVL(ds_setor, '{SETOR_TODOS}') AS ds_setor, TRUNC(dt_publicacao) AS dt_dia,
+                   SUM(vl_sentimento) AS vl_soma, COUNT(*) AS qt_noticias
+            FROM T_BF_NOTICIAS
+            WHERE vl_sentimento IS NOT NULL
+              AND dt_publicacao >= :dt_ini - {JANELA_SENTIMENTO_DIAS}
+              AND dt_publicacao < :dt_fim + {JANELA_SENTIMENTO_DIAS} + 1
+            GROUP BY GROUPING SETS ((ds_setor, TRUNC(dt_publicacao)), (TRUNC(dt_publicacao)))
+        ),
+        setores AS (
+            SELECT ds_setor FROM T_BF_NOTICIAS
+            UNION
+            SELECT ds_setor FROM T_BF_SENTIMENTO_DIARIO
+            UNION
+            SELECT '{SETOR_TODOS}' FROM dual
+        ),
+        janela AS (
+            SELECT st.ds_setor, g.dt_dia,
+                   NVL(d.vl_soma, 0) AS vl_soma,
+                   NVL(d.qt_noticias, 0) AS qt_noticias,
+                   SUM(NVL(d.vl_soma, 0)) OVER (PARTITION BY st.ds_setor ORDER BY g.dt_dia
+                       RANGE BETWEEN {JANELA_SENTIMENTO_DIAS} PRECEDING AND CURRENT ROW) AS vl_soma_30d,
+                   SUM(NVL(d.qt_noticias, 0)) OVER (PARTITION BY st.ds_setor ORDER BY g.dt_dia
+                       RANGE BETWEEN {JANELA_SENTIMENTO_DIAS} PRECEDING AND CURRENT ROW) AS qt_noticias_30d
+            FROM setores st
+            CROSS JOIN dias g
+            LEFT JOIN diario d ON d.ds_setor = st.ds_setor AND d.dt_dia = g.dt_dia
+        )
+        SELECT ds_setor, dt_dia, vl_soma, qt_noticias, vl_soma_30d / NULLIF(qt_noticias_30d, 0) AS vl_media_30d
+        FROM janela
+        WHERE dt_dia >= :dt_ini
+    ) s
+    ON (t.ds_setor = s.ds_setor AND t.dt_dia = s.dt_dia)
+    WHEN MATCHED THEN UPDATE SET
+        t.vl_soma = s.vl_soma,
+        t.qt_noticias = s.qt_noticias,
+        t.vl_media_30d = s.vl_media_30d,
+        t.dt_atualizacao = SYSDATE
+    WHEN NOT MATCHED THEN INSERT (ds_setor, dt_dia, vl_soma, qt_noticias, vl_media_30d)
+    VALUES (s.ds_setor, s.dt_dia, s.vl_soma, s.qt_noticias, s.vl_media_30d)
+"""
+
+
+def recalcular_sentimento_diario(cursor, dt_ini=None, dt_fim=None):
+    """
+    Recalcula a T_BF_SENTIMENTO_DIARIO na transação do cursor (sem commit).
+    Sem dt_ini/dt_fim, refaz a tabela inteira. Retorna (linhas, dt_ini, dt_fim) ou None se não há notícias.
+    """
+    if dt_ini is None or dt_fim is None:
+        cursor.execute("DELETE FROM T_BF_SENTIMENTO_DIARIO")
+        cursor.execute("""SELECT TRUNC(MIN(dt_publicacao)), TRUNC(MAX(dt_publicacao))
+                          FROM T_BF_NOTICIAS WHERE vl_sentimento IS NOT NULL""")
+        dt_ini, dt_fim = cursor.fetchone()
+        if dt_ini is None:
+            return None
+
+    cursor.execute(SQL_MERGE_SENTIMENTO, dt_ini=dt_ini, dt_fim=dt_fim)
+    return cursor.rowcount, dt_ini, dt_fim
+
+
+def atualizar_sentimento_diario(dt_ini=None, dt_fim=None):
+    """
+    Mantém a T_BF_SENTIMENTO_DIARIO (soma e contagem por setor/dia + média móvel de 30 dias).
+    Com dt_ini/dt_fim (datas de publicação que mudaram), recalcula só os dias afetados;
+    sem eles, refaz a tabela inteira a partir da T_BF_NOTICIAS.
+    As views de risco e do Power BI leem a média com um lookup por (setor, dia do vencimento).
+    """
+    with conexao() as conn:
+        if not conn: return
+        try:
+            cursor = conn.cursor()
+            resultado = recalcular_sentimento_diario(cursor, dt_ini, dt_fim)
+            if resultado is None:
+                conn.commit()
+                print("   ℹ️ T_BF_SENTIMENTO_DIARIO vazia (sem notícias com sentimento).")
+                return
+
+            total, dt_ini, dt_fim = resultado
+            registrar_refresh(cursor, 'T_BF_SENTIMENTO_DIARIO', total)
+            conn.commit()
+            print(f"   ✅ T_BF_SENTIMENTO_DIARIO atualizada ({total} linhas setor x dia, "
+                  f"{dt_ini:%d/%m/%Y} a {dt_fim:%d/%m/%Y} + {JANELA_SENTIMENTO_DIAS} dias).")
+        except Exception as e:
+            conn.rollback()
+            print(f"   ❌ Erro ao atualizar T_BF_SENTIMENTO_DIARIO: {e}")
+
 
 def atualizar_view_ml():
     print("📊 Atualizando View do ML..")
+    # Os boletos podem ter trazido meses novos: a grade de features precisa cobri-los
+    atualizar_features_macro()
 
     sql_view_ml_risco = """
         CREATE OR REPLACE VIEW V_BF_TREINO_ML_RISCO AS
@@ -31,103 +220,31 @@ def atualizar_view_ml():
             COALESCE(e.vl_score_materialidade, 0) as vl_score_materialidade,
             COALESCE(e.vl_score_quantidade, 0) as vl_score_quantidade,
 
-            -- Para ligar com as notícias
+            -- Setor da empresa (pré-calculado na ingestão a partir da T_BF_DIM_SETOR / src/setores.py)
             -- Também vai ser usado no ML em si, então precisamos que seja numérico
-            CASE 
-                WHEN SUBSTR(e.cd_cnae, 1, 2) BETWEEN '01' AND '03' THEN 01
-                WHEN SUBSTR(e.cd_cnae, 1, 2) BETWEEN '05' AND '33' THEN 02
-                WHEN SUBSTR(e.cd_cnae, 1, 2) BETWEEN '41' AND '43' THEN 02
-                WHEN SUBSTR(e.cd_cnae, 1, 2) BETWEEN '45' AND '47' THEN 03
-                WHEN SUBSTR(e.cd_cnae, 1, 2) >= '49' THEN 04
-                ELSE 05
-            END as vl_setor_macro,
-
-            -- SELIC
-            (SELECT m.vl_indicador FROM T_BF_MACRO_ECONOMIA m 
-             WHERE m.nm_indicador = 'SELIC' AND m.sg_uf = 'BR' AND m.dt_referencia <= b.dt_vencimento 
-             ORDER BY m.dt_referencia DESC FETCH FIRST 1 ROW ONLY) as tax_selic,
-
-            -- DÓLAR
-            (SELECT m.vl_indicador FROM T_BF_MACRO_ECONOMIA m 
-             WHERE m.nm_indicador = 'DOLAR' AND m.sg_uf = 'BR' AND m.dt_referencia <= b.dt_vencimento 
-             ORDER BY m.dt_referencia DESC FETCH FIRST 1 ROW ONLY) as tax_dolar,
-
-            -- DESEMPREGO
-            (SELECT m.vl_indicador FROM T_BF_MACRO_ECONOMIA m 
-             WHERE m.nm_indicador = 'TAX_DESEMPREGO' AND m.sg_uf = 'BR' AND m.dt_referencia <= b.dt_vencimento 
-             ORDER BY m.dt_referencia DESC FETCH FIRST 1 ROW ONLY) as tax_desemprego,
-
-            -- PIB
-            (SELECT m.vl_indicador FROM T_BF_MACRO_ECONOMIA m 
-             WHERE m.nm_indicador = 'IBC-BR' AND m.sg_uf = 'BR' AND m.dt_referencia <= b.dt_vencimento 
-             ORDER BY m.dt_referencia DESC FETCH FIRST 1 ROW ONLY) as indice_pib,
-
-            -- VAREJO
-            COALESCE(
-                (SELECT m.vl_indicador FROM T_BF_MACRO_ECONOMIA m 
-                 WHERE m.nm_indicador = 'IND_VAREJO' AND m.sg_uf = e.sg_uf AND m.dt_referencia <= b.dt_vencimento
-                 ORDER BY m.dt_referencia DESC FETCH FIRST 1 ROW ONLY),
-                (SELECT AVG(m2.vl_indicador) FROM T_BF_MACRO_ECONOMIA m2 WHERE m2.nm_indicador = 'IND_VAREJO')
-            ) as var_varejo,
-
-            -- INDÚSTRIA
-            COALESCE(
-                (SELECT m.vl_indicador FROM T_BF_MACRO_ECONOMIA m 
-                 WHERE m.nm_indicador = 'IND_INDUSTRIA' AND m.sg_uf = e.sg_uf AND m.dt_referencia <= b.dt_vencimento
-                 ORDER BY m.dt_referencia DESC FETCH FIRST 1 ROW ONLY),
-                (SELECT m2.vl_indicador FROM T_BF_MACRO_ECONOMIA m2 
-                 WHERE m2.nm_indicador = 'IND_INDUSTRIA' AND m2.sg_uf = 'BR'
-                   AND m2.dt_referencia <= b.dt_vencimento
-                 ORDER BY m2.dt_referencia DESC FETCH FIRST 1 ROW ONLY)
-            ) as var_industria,
-
-            -- SERVIÇOS
-            COALESCE(
-                (SELECT m.vl_indicador FROM T_BF_MACRO_ECONOMIA m 
-                 WHERE m.nm_indicador = 'IND_SERVICOS' AND m.sg_uf = e.sg_uf AND m.dt_referencia <= b.dt_vencimento
-                 ORDER BY m.dt_referencia DESC FETCH FIRST 1 ROW ONLY),
-                (SELECT AVG(m2.vl_indicador) FROM T_BF_MACRO_ECONOMIA m2 WHERE m2.nm_indicador = 'IND_SERVICOS')
-            ) as var_servicos,
-            
-            -- AGRO
-            COALESCE(
-                (SELECT m.vl_indicador FROM T_BF_MACRO_ECONOMIA m 
-                 WHERE m.nm_indicador = 'IND_AGRO' AND m.sg_uf = e.sg_uf AND m.dt_referencia <= b.dt_vencimento
-                 ORDER BY m.dt_referencia DESC FETCH FIRST 1 ROW ONLY),
-                (SELECT AVG(m2.vl_indicador) FROM T_BF_MACRO_ECONOMIA m2 WHERE m2.nm_indicador = 'IND_AGRO')
-            ) as var_agro,
-            
-            -- PECUÁRIA
-            COALESCE(
-                (SELECT m.vl_indicador FROM T_BF_MACRO_ECONOMIA m 
-                 WHERE m.nm_indicador = 'IND_PECUARIA' AND m.sg_uf = e.sg_uf AND m.dt_referencia <= b.dt_vencimento
-                 ORDER BY m.dt_referencia DESC FETCH FIRST 1 ROW ONLY),
-                (SELECT AVG(m2.vl_indicador) FROM T_BF_MACRO_ECONOMIA m2 WHERE m2.nm_indicador = 'IND_PECUARIA')
-            ) as var_pecuaria,
-            
-            -- ANÁLISE DE SENTIMENTOS
-            COALESCE(
-                (SELECT AVG(n.vl_sentimento)
-                 FROM T_BF_NOTICIAS n
-                 WHERE n.ds_setor = 
-                       CASE 
-                           WHEN SUBSTR(e.cd_cnae, 1, 2) BETWEEN '01' AND '03' THEN 'AGRO'
-                           WHEN SUBSTR(e.cd_cnae, 1, 2) BETWEEN '05' AND '33' THEN 'INDUSTRIA'
-                           -- Construção civil
-                           WHEN SUBSTR(e.cd_cnae, 1, 2) BETWEEN '41' AND '43' THEN 'INDUSTRIA'
-                           WHEN SUBSTR(e.cd_cnae, 1, 2) BETWEEN '45' AND '47' THEN 'VAREJO'
-                           WHEN SUBSTR(e.cd_cnae, 1, 2) >= '49' THEN 'SERVICOS'
-                           ELSE 'MERCADO'
-                       END
-                   AND n.dt_publicacao BETWEEN (b.dt_vencimento - 30) AND b.dt_vencimento
-                ), 0
-            ) as vl_sentimento_setorial,
+            e.vl_setor_macro,
+
+            -- MACROECONOMIA (as-of do mês de vencimento, pré-calculado em T_BF_FEATURES_MACRO)
+            f.tax_selic,
+            f.tax_dolar,
+            f.tax_desemprego,
+            f.indice_pib,
+            f.var_varejo,
+            f.var_industria,
+            f.var_servicos,
+            f.var_agro,
+            f.var_pecuaria,
+
+            -- ANÁLISE DE SENTIMENTOS (média móvel de 30 dias, pré-calculada em T_BF_SENTIMENTO_DIARIO)
+            COALESCE(s.vl_media_30d, 0) as vl_sentimento_setorial,
 
             -- TARGET
             b.vl_inadimplencia as target
 
         FROM T_BF_BOLETO b
         JOIN T_BF_EMPRESA e ON b.id_pagador = e.id_empresa
+        LEFT JOIN T_BF_FEATURES_MACRO f ON f.sg_uf = e.sg_uf AND f.dt_mes = TRUNC(b.dt_vencimento, 'MM')
+        LEFT JOIN T_BF_SENTIMENTO_DIARIO s ON s.ds_setor = e.ds_setor AND s.dt_dia = TRUNC(b.dt_vencimento)
         """
 
     sql_view_ml_cluster = """
@@ -144,14 +261,34 @@ def atualizar_view_ml():
     alimentar_tabela('V_BF_TREINO_ML_CLUSTER', sql_view_ml_cluster)
 
 
-def atualizar_view_pbi():
-    print("📊 Atualizando View do Power BI..")
+def registrar_refresh(cursor, objeto, linhas):
+    """Grava em T_BF_CONTROLE_REFRESH quando (e com quantas linhas alteradas) o objeto foi atualizado."""
+    cursor.execute("""
+        MERGE INTO T_BF_CONTROLE_REFRESH t
+        USING (SELECT :1 AS nm_objeto, :2 AS qt_linhas FROM dual) s
+        ON (t.nm_objeto = s.nm_objeto)
+        WHEN MATCHED THEN UPDATE SET t.dt_refresh = SYSDATE, t.qt_linhas = s.qt_linhas
+        WHEN NOT MATCHED THEN INSERT (nm_objeto, dt_refresh, qt_linhas) VALUES (s.nm_objeto, SYSDATE, s.qt_linhas)
+        """, [objeto, linhas])
 
-    sql_view_pbi = """
-        CREATE OR REPLACE VIEW V_BF_ANALISE_PBI AS
+
+# Power BI: com BF_PBI_MATERIALIZADO=1 a V_BF_ANALISE_PBI vira um SELECT simples sobre a
+# T_BF_ANALISE_PBI, que o pipeline atualiza só nas linhas que mudaram (o refresh do
+# dashboard deixa de refazer os joins e não disputa o banco com os jobs de ML)
+PBI_MATERIALIZADO = os.getenv('BF_PBI_MATERIALIZADO', '0') == '1'
+
+# Mesmas colunas (e ordem) do SELECT abaixo
+COLUNAS_PBI = ['id_boleto', 'vl_nominal', 'dt_emissao', 'dt_vencimento', 'nr_dias_atraso', 'st_pagamento',
+               'id_empresa', 'cd_cnae', 'sg_uf', 'ds_setor_economico', 'vl_score_risco', 'ds_faixa_risco',
+               'ds_motivo_risco', 'ds_perfil_comportamental', 'vl_sentimento_setor', 'ds_humor_mercado']
+
+
+def _sql_analise_pbi():
+    # Power BI sempre recebe os ids em hex, mesmo com chaves compactas (RAW) no banco
+    return f"""
         SELECT 
             -- Dados do boleto
-            b.id_boleto,
+            {id_exportado('b.id_boleto')} as id_boleto,
             b.vl_nominal,
             b.dt_emissao,
             b.dt_vencimento,
@@ -162,19 +299,12 @@ def atualizar_view_pbi():
             END as st_pagamento,
             
             -- Dados da empresa
-            e.id_empresa,
+            {id_exportado('e.id_empresa')} as id_empresa,
             e.cd_cnae,
             e.sg_uf,
             
             -- Qual o setor da empresa
-            CASE 
-                WHEN SUBSTR(e.cd_cnae, 1, 2) BETWEEN '01' AND '03' THEN 'AGRO'
-                WHEN SUBSTR(e.cd_cnae, 1, 2) BETWEEN '05' AND '33' THEN 'INDUSTRIA'
-                WHEN SUBSTR(e.cd_cnae, 1, 2) BETWEEN '41' AND '43' THEN 'INDUSTRIA'
-                WHEN SUBSTR(e.cd_cnae, 1, 2) BETWEEN '45' AND '47' THEN 'VAREJO'
-                WHEN SUBSTR(e.cd_cnae, 1, 2) >= '49' THEN 'SERVICOS'
-                ELSE 'MERCADO'
-            END as ds_setor_economico,
+            e.ds_setor as ds_setor_economico,
         
             -- 3. INTELIGÊNCIA PREDITIVA (O Futuro - Random Forest)
             ROUND(COALESCE(p.vl_probabilidade_inadimplencia, 0),4) as vl_score_risco,
@@ -185,26 +315,12 @@ def atualizar_view_pbi():
             COALESCE(c.ds_perfil, 'Não Classificado') as ds_perfil_comportamental,
             
             -- 5. TERMÔMETRO DE MERCADO (O NLP - Sentimento)
-            ROUND(COALESCE(
-                (SELECT AVG(n.vl_sentimento)
-                 FROM T_BF_NOTICIAS n
-                 WHERE n.ds_setor = 
-                       CASE 
-                           WHEN SUBSTR(e.cd_cnae, 1, 2) BETWEEN '01' AND '03' THEN 'AGRO'
-                           WHEN SUBSTR(e.cd_cnae, 1, 2) BETWEEN '05' AND '33' THEN 'INDUSTRIA'
-                           WHEN SUBSTR(e.cd_cnae, 1, 2) BETWEEN '41' AND '43' THEN 'INDUSTRIA'
-                           WHEN SUBSTR(e.cd_cnae, 1, 2) BETWEEN '45' AND '47' THEN 'VAREJO'
-                           WHEN SUBSTR(e.cd_cnae, 1, 2) >= '49' THEN 'SERVICOS'
-                           ELSE 'MERCADO'
-                       END
-                   AND n.dt_publicacao BETWEEN (b.dt_vencimento - 30) AND b.dt_vencimento
-                ), 0
-            ),4) AS vl_sentimento_setor,
+            ROUND(COALESCE(s.vl_media_30d, 0),4) AS vl_sentimento_setor,
         
             -- Classificação Visual do Sentimento
             CASE 
-                WHEN (SELECT AVG(n.vl_sentimento) FROM T_BF_NOTICIAS n WHERE n.dt_publicacao BETWEEN (b.dt_vencimento - 30) AND b.dt_vencimento) > 0.05 THEN 'Otimista'
-                WHEN (SELECT AVG(n.vl_sentimento) FROM T_BF_NOTICIAS n WHERE n.dt_publicacao BETWEEN (b.dt_vencimento - 30) AND b.dt_vencimento) < -0.05 THEN 'Pessimista'
+                WHEN sm.vl_media_30d > 0.05 THEN 'Otimista'
+                WHEN sm.vl_media_30d < -0.05 THEN 'Pessimista'
                 ELSE 'Neutro'
             END as ds_humor_mercado
         
@@ -213,7 +329,74 @@ def atualizar_view_pbi():
         -- Left Join: Se o boleto for novo e não tiver passado na IA ainda, não some, só fica NULL
         LEFT JOIN T_BF_PREDICOES p ON b.id_boleto = p.id_boleto
         LEFT JOIN T_BF_CLUSTER c ON b.id_boleto = c.id_boleto
+        -- Sentimento: média móvel de 30 dias do setor e do mercado inteiro no dia do vencimento
+        LEFT JOIN T_BF_SENTIMENTO_DIARIO s ON s.ds_setor = e.ds_setor AND s.dt_dia = TRUNC(b.dt_vencimento)
+        LEFT JOIN T_BF_SENTIMENTO_DIARIO sm ON sm.ds_setor = '{SETOR_TODOS}' AND sm.dt_dia = TRUNC(b.dt_vencimento)
+        """
+
+
+def atualizar_analise_pbi():
+    """
+    Sincroniza a T_BF_ANALISE_PBI com o SELECT da análise: MERGE que só regrava as linhas
+    em que algo mudou (predição, cluster, sentimento, dados do boleto) e DELETE dos boletos
+    que saíram da base. Cada linha guarda o próprio dt_atualizacao.
+    Retorna True só se a sincronização foi commitada.
+    """
+    atributos = [c for c in COLUNAS_PBI if c != 'id_boleto']
+    # DECODE compara NULL com NULL como igual (o "<>" não)
+    mudou = "\n               OR ".join(f"DECODE(t.{c}, s.{c}, 0, 1) = 1" for c in atributos)
+    sql_merge = f"""
+        MERGE INTO T_BF_ANALISE_PBI t
+        USING ({_sql_analise_pbi()}) s
+        ON (t.id_boleto = s.id_boleto)
+        WHEN MATCHED THEN UPDATE SET
+            {", ".join(f"t.{c} = s.{c}" for c in atributos)},
+            t.dt_atualizacao = SYSDATE
+            WHERE {mudou}
+        WHEN NOT MATCHED THEN INSERT ({", ".join(COLUNAS_PBI)})
+        VALUES ({", ".join(f"s.{c}" for c in COLUNAS_PBI)})
+        """
+    sql_delete = f"""
+        DELETE FROM T_BF_ANALISE_PBI t
+        WHERE NOT EXISTS (SELECT 1 FROM T_BF_BOLETO b WHERE b.id_boleto = {id_importado('t.id_boleto')})
+        """
+
+    with conexao() as conn:
+        if not conn: return False
+        try:
+            cursor = conn.cursor()
+            cursor.execute(sql_merge)
+            alteradas = cursor.rowcount
+            cursor.execute(sql_delete)
+            removidas = cursor.rowcount
+            registrar_refresh(cursor, 'T_BF_ANALISE_PBI', alteradas + removidas)
+            conn.commit()
+            print(f"   ✅ T_BF_ANALISE_PBI sincronizada ({alteradas} linhas novas/alteradas, {removidas} removidas).")
+            return True
+        except Exception as e:
+            conn.rollback()
+            print(f"   ❌ Erro ao sincronizar T_BF_ANALISE_PBI: {e}")
+            return False
+
+
+def atualizar_view_pbi(materializado=None):
+    print("📊 Atualizando View do Power BI..")
+    materializado = PBI_MATERIALIZADO if materializado is None else materializado
+
+    # Sincronização falhou (ex: schema sem a tabela, erro no MERGE): a view lê o SELECT ao vivo
+    # em vez de servir uma T_BF_ANALISE_PBI velha ou vazia
+    if materializado and not atualizar_analise_pbi():
+        print("   ⚠️ V_BF_ANALISE_PBI fica no SELECT ao vivo até a próxima sincronização.")
+        materializado = False
+
+    if materializado:
+        sql_view_pbi = f"""
+        CREATE OR REPLACE VIEW V_BF_ANALISE_PBI AS
+        SELECT {", ".join(COLUNAS_PBI)}
+        FROM T_BF_ANALISE_PBI
         """
+    else:
+        sql_view_pbi = f"CREATE OR REPLACE VIEW V_BF_ANALISE_PBI AS {_sql_analise_pbi()}"
     alimentar_tabela('V_BF_ANALISE_PBI', sql_view_pbi)
 
     sql_view_headline = """
@@ -0,0 +1,213 @@
+import hashlib
+import json
+import numpy as np
+import os
+import pandas as pd
+from src.chaves import bytes_para_hex, hex_para_bytes
+from src.utils_paths import resource_path
+
+# Parquet é opcional: sem pyarrow, tudo continua lendo direto dos CSVs
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# ================= CONFIGURAÇÕES =================
+DATA_DIR = resource_path("data")
+STAGING_DIR = os.path.join(resource_path("cache"), "staging")
+CHUNK_CONVERSAO = 200000
+
+_BOLETOS = {
+    'ids': ['id_boleto', 'id_pagador', 'id_beneficiario'],
+    'datas': ['dt_emissao', 'dt_vencimento', 'dt_pagamento'],
+    'categorias': ['tipo_baixa', 'tipo_especie'],
+}
+
+# Como tipar cada CSV no Parquet:
+# - ids: hashes SHA-256 em hex (64 chars) viram binário fixo de 32 bytes
+# - datas: timestamp (vazio = nulo)
+# - categorias: texto com dictionary encoding, lido de volta como pandas Categorical
+ESQUEMAS = {
+    'empresas.csv': {'ids': ['id_cnpj'], 'datas': [], 'categorias': ['uf']},
+    'boletos.csv': _BOLETOS,
+    'boletos_datas_variadas.csv': _BOLETOS,
+}
+
+
+# ==============================================================================
+# IDS COMPACTOS (hex 64 chars <-> 32 bytes)
+# ==============================================================================
+def _coluna_id_para_arrow(serie):
+    buffer = hex_para_bytes(serie)
+    if buffer is None:
+        # Algum id fora do padrão: guarda como texto para não perder nada
+        return pa.array(serie.astype(object), type=pa.string())
+    return pa.FixedSizeBinaryArray.from_buffers(pa.binary(32), len(serie), [None, pa.py_buffer(buffer)])
+
+
+def _coluna_id_para_pandas(coluna):
+    if not pa.types.is_fixed_size_binary(coluna.type):
+        return coluna.to_pandas()
+    arr = coluna.combine_chunks() if isinstance(coluna, pa.ChunkedArray) else coluna
+    dados = np.frombuffer(arr.buffers()[1], dtype=np.uint8)
+    inicio = arr.offset * 32
+    matriz = dados[inicio:inicio + len(arr) * 32].reshape(-1, 32)
+    return pd.Series(bytes_para_hex(matriz), dtype=object)
+
+
+# ==============================================================================
+# CONVERSÃO CSV -> PARQUET
+# ==============================================================================
+def detectar_separador(caminho):
+    # Leitura Robustez (Tenta vírgula, se não houver, ponto e vírgula)
+    with open(caminho, 'r', encoding='utf-8', errors='ignore') as f:
+        cabecalho = f.readline()
+    return ',' if cabecalho.count(',') >= cabecalho.count(';') else ';'
+
+
+def _caminhos(nome):
+    base = os.path.join(STAGING_DIR, os.path.splitext(nome)[0])
+    return base + '.parquet', base + '.json'
+
+
+def _assinatura(caminho):
+    info = os.stat(caminho)
+    return {'tamanho': info.st_size, 'mtime_ns': info.st_mtime_ns}
+
+
+def _hash_arquivo(caminho):
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def _staging_valido(arquivo_csv, arquivo_parquet, arquivo_meta):
+    """
+    Parquet vale enquanto o CSV não mudar. Tamanho + mtime iguais = válido sem ler o CSV;
+    se só o mtime mudou (ex: git checkout), confere o hash antes de reconverter.
+    """
+    if not os.path.exists(arquivo_parquet) or not os.path.exists(arquivo_meta):
+        return False
+    try:
+        with open(arquivo_meta, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except Exception:
+        return False
+
+    assinatura = _assinatura(arquivo_csv)
+    if meta.get('assinatura') == assinatura:
+        return True
+    if meta.get('assinatura', {}).get('tamanho') != assinatura['tamanho']:
+        return False
+    if meta.get('sha256') != _hash_arquivo(arquivo_csv):
+        return False
+
+    meta['assinatura'] = assinatura
+    with open(arquivo_meta, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    return True
+
+
+def _tipar_bloco(bloco, esquema):
+    colunas = {}
+    for col in bloco.columns:
+        if col in esquema['ids']:
+            colunas[col] = _coluna_id_para_arrow(bloco[col])
+        elif col in esquema['datas']:
+            colunas[col] = pa.array(pd.to_datetime(bloco[col], format='%Y-%m-%d', errors='coerce'),
+                                    type=pa.timestamp('us'))
+        elif col in esquema['categorias'] or not pd.api.types.is_numeric_dtype(bloco[col]):
+            colunas[col] = pa.array(bloco[col].astype(object).where(bloco[col].notna(), None), type=pa.string())
+        else:
+            colunas[col] = pa.array(bloco[col].astype('float64'), type=pa.float64())
+    return pa.table(colunas)
+
+
+def atualizar_staging(nome):
+    """
+    Garante o Parquet tipado do CSV `nome` (em data/), convertendo só se o CSV mudou.
+    Retorna o caminho do Parquet, ou None se não for possível usar staging.
+    """
+    arquivo_csv = os.path.join(DATA_DIR, nome)
+    if pa is None or nome not in ESQUEMAS or not os.path.exists(arquivo_csv):
+        return None
+
+    arquivo_parquet, arquivo_meta = _caminhos(nome)
+    if _staging_valido(arquivo_csv, arquivo_parquet, arquivo_meta):
+        return arquivo_parquet
+
+    print(f"   🗜️ [Staging] Convertendo {nome} para Parquet...")
+    os.makedirs(STAGING_DIR, exist_ok=True)
+    esquema = ESQUEMAS[nome]
+    temporario = arquivo_parquet + '.tmp'
+    escritor = None
+    total = 0
+    try:
+        # Mesmo esquema texto em todos os blocos para o Parquet não variar de tipo entre eles
+        texto = {c: str for c in esquema['ids'] + esquema['datas'] + esquema['categorias']}
+        for bloco in pd.read_csv(arquivo_csv, sep=detectar_separador(arquivo_csv), chunksize=CHUNK_CONVERSAO,
+                                 dtype=texto):
+            tabela = _tipar_bloco(bloco, esquema)
+            if escritor is None:
+                escritor = pq.ParquetWriter(temporario, tabela.schema, compression='zstd')
+            escritor.write_table(tabela.cast(escritor.schema))
+            total += len(bloco)
+    except Exception as e:
+        print(f"   ⚠️ [Staging] Falha ao converter {nome} ({e}). Usando o CSV.")
+        if escritor is not None: escritor.close()
+        if os.path.exists(temporario): os.remove(temporario)
+        return None
+
+    if escritor is None:
+        return None
+    escritor.close()
+    os.replace(temporario, arquivo_parquet)
+    with open(arquivo_meta, 'w', encoding='utf-8') as f:
+        json.dump({'assinatura': _assinatura(arquivo_csv), 'sha256': _hash_arquivo(arquivo_csv), 'linhas': total}, f)
+    print(f"   ✅ [Staging] {total} linhas em {os.path.basename(arquivo_parquet)}.")
+    return arquivo_parquet
+
+
+# ==============================================================================
+# LEITURA
+# ==============================================================================
+def _tabela_para_pandas(tabela, esquema):
+    dados = {}
+    for nome_col in tabela.column_names:
+        coluna = tabela.column(nome_col)
+        if nome_col in esquema['ids']:
+            dados[nome_col] = _coluna_id_para_pandas(coluna)
+        elif nome_col in esquema['categorias']:
+            dados[nome_col] = coluna.to_pandas().astype('category')
+        else:
+            dados[nome_col] = coluna.to_pandas()
+    return pd.DataFrame(dados)
+
+
+def ler_csv(nome, colunas=None):
+    """
+    Lê um CSV de data/ pelo staging Parquet (só as `colunas` pedidas), caindo para
+    o CSV se o pyarrow não estiver instalado.
+    """
+    arquivo_parquet = atualizar_staging(nome)
+    if arquivo_parquet is None:
+        arquivo_csv = os.path.join(DATA_DIR, nome)
+        return pd.read_csv(arquivo_csv, sep=detectar_separador(arquivo_csv), usecols=colunas)
+    return _tabela_para_pandas(pq.read_table(arquivo_parquet, columns=colunas), ESQUEMAS[nome])
+
+
+def ler_csv_em_blocos(nome, colunas=None, chunksize=CHUNK_CONVERSAO):
+    """Como ler_csv, mas devolvendo blocos de até `chunksize` linhas (memória limitada)."""
+    arquivo_parquet = atualizar_staging(nome)
+    if arquivo_parquet is None:
+        arquivo_csv = os.path.join(DATA_DIR, nome)
+        yield from pd.read_csv(arquivo_csv, sep=detectar_separador(arquivo_csv), usecols=colunas, chunksize=chunksize)
+        return
+
+    esquema = ESQUEMAS[nome]
+    for lote in pq.ParquetFile(arquivo_parquet).iter_batches(batch_size=chunksize, columns=colunas):
+        yield _tabela_para_pandas(pa.Table.from_batches([lote]), esquema)